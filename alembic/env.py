@@ -19,6 +19,9 @@ from src.models.payout_log import PayoutLog
 from src.models.user import User
 from src.models.user_position import UserPosition
 from src.models.reset_log import ResetLog
+from src.models.event_outbox import EventOutbox
+from src.models.webhook_subscription import WebhookSubscription
+from src.models.webhook_dead_letter import WebhookDeadLetter
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,7 +32,7 @@ load_dotenv()
 db_path_env = os.getenv("DB_PATH", "db/polymarket_playground.db")
 db_path = (BASE_DIR / db_path_env).resolve()
 db_path.parent.mkdir(parents=True, exist_ok=True)
-db_url = f"sqlite:///{str(db_path)}"
+db_url = os.getenv("DB_URL") or f"sqlite:///{str(db_path)}"
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,39 @@
+"""add hot path indexes
+
+Revision ID: 3f6d2b8c41a7
+Revises: a12cac9671e9
+Create Date: 2026-10-17 10:12:04.511203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6d2b8c41a7'
+down_revision: Union[str, Sequence[str], None] = 'a12cac9671e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_user_name_created_at', 'orders', ['user_name', 'created_at'], unique=False)
+    op.create_index('ix_user_positions_market_token', 'user_positions', ['market', 'token'], unique=False)
+    op.create_index('ix_payout_logs_market', 'payout_logs', ['market'], unique=False)
+    op.create_index('ix_market_change_logs_condition_id_timestamp', 'market_change_logs', ['condition_id', 'timestamp'], unique=False)
+    op.create_index('ix_order_fills_order_id', 'order_fills', ['order_id'], unique=False)
+    op.create_index('ix_reset_logs_user_name', 'reset_logs', ['user_name'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reset_logs_user_name', table_name='reset_logs')
+    op.drop_index('ix_order_fills_order_id', table_name='order_fills')
+    op.drop_index('ix_market_change_logs_condition_id_timestamp', table_name='market_change_logs')
+    op.drop_index('ix_payout_logs_market', table_name='payout_logs')
+    op.drop_index('ix_user_positions_market_token', table_name='user_positions')
+    op.drop_index('ix_orders_user_name_created_at', table_name='orders')
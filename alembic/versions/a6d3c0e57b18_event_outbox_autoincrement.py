@@ -0,0 +1,36 @@
+"""event outbox autoincrement
+
+Revision ID: a6d3c0e57b18
+Revises: f41c8d27a9b5
+Create Date: 2026-10-17 21:04:37.215903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3c0e57b18'
+down_revision: Union[str, Sequence[str], None] = 'f41c8d27a9b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The outbox id is the delivery sequence: SQLite must not reuse the ids of
+    # purged rows. Rebuilding the table as AUTOINCREMENT keeps the existing
+    # ids and seeds sqlite_sequence with the highest one.
+    with op.batch_alter_table('event_outbox', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('event_outbox', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -0,0 +1,41 @@
+"""add webhook dead letters
+
+Revision ID: b8e2f5a31c64
+Revises: a6d3c0e57b18
+Create Date: 2026-10-17 21:38:09.602144
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f5a31c64'
+down_revision: Union[str, Sequence[str], None] = 'a6d3c0e57b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('webhook_dead_letters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subscriber', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('sequence', sa.Integer(), nullable=False),
+    sa.Column('event', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('payload', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_dead_letters_subscriber_sequence', 'webhook_dead_letters',
+                    ['subscriber', 'sequence'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_webhook_dead_letters_subscriber_sequence', table_name='webhook_dead_letters')
+    op.drop_table('webhook_dead_letters')
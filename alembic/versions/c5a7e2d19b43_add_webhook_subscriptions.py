@@ -0,0 +1,52 @@
+"""add webhook subscriptions
+
+Revision ID: c5a7e2d19b43
+Revises: 8b1e4c7d92f0
+Create Date: 2026-10-17 16:48:12.907316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a7e2d19b43'
+down_revision: Union[str, Sequence[str], None] = '8b1e4c7d92f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('webhook_subscriptions',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('last_sequence', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('delivered', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('last_delivered_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Delivery state moves from the events to the subscribers
+    op.drop_index('ix_event_outbox_pending', table_name='event_outbox')
+    with op.batch_alter_table('event_outbox') as batch_op:
+        batch_op.drop_column('delivered_at')
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('last_error')
+        batch_op.drop_column('attempts')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('event_outbox') as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()))
+        batch_op.add_column(sa.Column('delivered_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_event_outbox_pending', 'event_outbox', ['delivered_at', 'next_attempt_at'], unique=False)
+    op.drop_table('webhook_subscriptions')
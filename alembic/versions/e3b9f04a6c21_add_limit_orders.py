@@ -0,0 +1,43 @@
+"""add limit orders
+
+Revision ID: e3b9f04a6c21
+Revises: c5a7e2d19b43
+Create Date: 2026-10-17 18:05:37.214590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9f04a6c21'
+down_revision: Union[str, Sequence[str], None] = 'c5a7e2d19b43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('limit_price', sa.Numeric(precision=6, scale=4), nullable=True))
+        batch_op.add_column(sa.Column('filled_shares', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('reserved_usdc', sa.Numeric(precision=14, scale=2), nullable=False, server_default='0'))
+        batch_op.create_check_constraint('_order_filled_shares_non_negative', 'filled_shares >= 0')
+        batch_op.create_check_constraint('_order_reserved_usdc_non_negative', 'reserved_usdc >= 0')
+        batch_op.create_index('ix_orders_order_type_status', ['order_type', 'status'], unique=False)
+    # Every existing order is a filled MARKET order
+    op.execute("UPDATE orders SET filled_shares = shares WHERE status = 'FILLED'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_index('ix_orders_order_type_status')
+        batch_op.drop_constraint('_order_reserved_usdc_non_negative', type_='check')
+        batch_op.drop_constraint('_order_filled_shares_non_negative', type_='check')
+        batch_op.drop_column('reserved_usdc')
+        batch_op.drop_column('filled_shares')
+        batch_op.drop_column('limit_price')
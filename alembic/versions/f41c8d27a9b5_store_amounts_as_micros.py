@@ -0,0 +1,67 @@
+"""store amounts as micros
+
+Revision ID: f41c8d27a9b5
+Revises: e3b9f04a6c21
+Create Date: 2026-10-17 19:22:51.480316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f41c8d27a9b5'
+down_revision: Union[str, Sequence[str], None] = 'e3b9f04a6c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, NUMERIC type it had, nullable)
+AMOUNT_COLUMNS = [
+    ('users', 'balance', sa.Numeric(precision=14, scale=2), True),
+    ('user_positions', 'shares', sa.Numeric(precision=14, scale=2), False),
+    ('orders', 'amount_usdc', sa.Numeric(precision=14, scale=2), False),
+    ('orders', 'shares', sa.Numeric(precision=14, scale=2), False),
+    ('orders', 'limit_price', sa.Numeric(precision=6, scale=4), True),
+    ('orders', 'filled_shares', sa.Numeric(precision=14, scale=2), False),
+    ('orders', 'reserved_usdc', sa.Numeric(precision=14, scale=2), False),
+    ('order_fills', 'fill_price', sa.Numeric(precision=14, scale=2), False),
+    ('order_fills', 'fill_shares', sa.Numeric(precision=14, scale=2), False),
+    ('payout_logs', 'shares_paid', sa.Numeric(precision=14, scale=2), False),
+    ('reset_logs', 'balance_reset', sa.Numeric(precision=14, scale=2), False),
+]
+
+
+def _tables() -> dict[str, list[tuple[str, sa.Numeric, bool]]]:
+    tables = {}
+    for table, column, numeric, nullable in AMOUNT_COLUMNS:
+        tables.setdefault(table, []).append((column, numeric, nullable))
+    return tables
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, columns in _tables().items():
+        # Scale while the column is still NUMERIC, then retype; SQLite keeps the integers
+        op.execute(f"UPDATE {table} SET " + ", ".join(
+            f"{column} = CAST(ROUND({column} * 1000000) AS INTEGER)" for column, _, _ in columns
+        ))
+        with op.batch_alter_table(table) as batch_op:
+            for column, numeric, nullable in columns:
+                batch_op.alter_column(column, existing_type=numeric, type_=sa.BigInteger(),
+                                      existing_nullable=nullable)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, columns in _tables().items():
+        with op.batch_alter_table(table) as batch_op:
+            for column, numeric, nullable in columns:
+                batch_op.alter_column(column, existing_type=sa.BigInteger(), type_=numeric,
+                                      existing_nullable=nullable)
+        op.execute(f"UPDATE {table} SET " + ", ".join(
+            f"{column} = {column} / 1000000.0" for column, _, _ in columns
+        ))
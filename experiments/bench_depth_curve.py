@@ -0,0 +1,49 @@
+"""
+Benchmark a slippage sweep: many buy sizes against one order book.
+
+Compares a fresh sort-and-walk per size (OrderService) with one DepthCurve
+answering every size by bisection.
+
+    python -m experiments.bench_depth_curve --levels 200 --sizes 2000
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from src.services.depth_curve import DepthCurve
+from src.services.order_service import OrderService
+
+
+def synthetic_asks(n: int, rng: random.Random) -> list[dict]:
+    return [{"price": f"0.{rng.randint(100, 999)}", "size": f"{rng.randint(1, 5000)}.{rng.randint(0, 99):02d}"}
+            for _ in range(n)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", type=int, default=200)
+    parser.add_argument("--sizes", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    asks = synthetic_asks(args.levels, rng)
+    depth = DepthCurve.for_buy(asks).depth_cost
+    sizes = [Decimal(f"{rng.uniform(1, float(depth)):.2f}") for _ in range(args.sizes)]
+
+    start = time.perf_counter()
+    walked = [OrderService.simulate_buy_transaction(size, asks) for size in sizes]
+    walk = time.perf_counter() - start
+
+    start = time.perf_counter()
+    curve = DepthCurve.for_buy(asks)
+    swept = [curve.buy(size, fills=False) for size in sizes]
+    sweep = time.perf_counter() - start
+
+    assert [{k: v for k, v in w.items() if k != "fills"} for w in walked] == swept
+    print(f"sort + walk per size: {walk:7.3f}s")
+    print(f"one curve, bisect:    {sweep:7.3f}s  ({walk / sweep:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark planning limit-order fills against a book snapshot.
+
+Rests many LIMIT buys on one token, most of them priced below the book,
+and times how long it takes to find and size the few that cross.
+
+    python -m experiments.bench_limit_matching --resting 100000 --crossing 50
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from src.models.order import Order, OrderSide, OrderStatus, OrderType
+from src.services.limit_order_service import LimitOrderService, limit_order_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resting", type=int, default=100_000)
+    parser.add_argument("--crossing", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    orders = []
+    for order_id in range(args.resting):
+        crosses = order_id < args.crossing
+        price = Decimal(rng.randint(50, 60) if crosses else rng.randint(1, 44)) / 100
+        orders.append(Order(order_id=order_id, user_name="bench", market="m", token="t",
+                            side=OrderSide.BUY, order_type=OrderType.LIMIT, status=OrderStatus.OPEN,
+                            limit_price=price, shares=Decimal(rng.randint(1, 100))))
+    rng.shuffle(orders)
+
+    start = time.perf_counter()
+    for order in orders:
+        limit_order_index.add(order)
+    print(f"indexed {args.resting} orders in {time.perf_counter() - start:.2f}s")
+
+    book = {"asks": [{"price": f"0.{p}", "size": "1000"} for p in range(45, 99)], "bids": []}
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        plan = LimitOrderService.plan_fills("t", book)
+    elapsed = (time.perf_counter() - start) / args.rounds
+    print(f"{len(plan)} crossing orders planned in {elapsed * 1000:.3f} ms per snapshot")
+
+
+if __name__ == "__main__":
+    main()
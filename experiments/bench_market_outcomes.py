@@ -0,0 +1,78 @@
+"""
+Benchmark MarketSyncService.add_stable_market_outcomes over synthetic markets.
+
+Runs a cold pass (empty market_outcomes) and a warm pass (every outcome
+already present) against a throwaway SQLite file and reports wall time and
+the number of SQL statements sent to the driver.
+
+    python -m experiments.bench_market_outcomes --markets 50000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event, func
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import src.models.market  # noqa: F401  (register tables)
+from src.models.market_outcome import MarketOutcome
+from src.services.market_sync_service import MarketSyncService
+from src.sessions import install_sqlite_pragmas
+
+
+def synthetic_markets(n: int) -> list[dict]:
+    return [
+        {
+            "condition_id": f"0xbench{i:08d}",
+            "tokens": [
+                {"token_id": f"{i}0", "outcome": "Yes"},
+                {"token_id": f"{i}1", "outcome": "No"},
+            ],
+        }
+        for i in range(n)
+    ]
+
+
+def timed_pass(engine, markets: list[dict]) -> tuple[float, int, int]:
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        with Session(engine) as db:
+            start = time.perf_counter()
+            inserted = MarketSyncService.add_stable_market_outcomes(db, markets)
+            db.commit()
+            elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return elapsed, statements, len(inserted)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--markets", type=int, default=50_000)
+    args = parser.parse_args()
+
+    markets = synthetic_markets(args.markets)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        install_sqlite_pragmas(engine)
+        SQLModel.metadata.create_all(engine)
+
+        for label in ("cold", "warm"):
+            elapsed, statements, inserted = timed_pass(engine, markets)
+            print(f"{label:>4}: {elapsed:7.3f}s  {statements:4d} statements  {inserted} outcomes inserted")
+
+        with Session(engine) as db:
+            total = db.exec(select(func.count()).select_from(MarketOutcome)).one()
+        print(f"market_outcomes rows: {total}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
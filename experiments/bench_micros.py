@@ -0,0 +1,80 @@
+"""
+Benchmark NUMERIC versus integer-micros storage for order amounts on SQLite.
+
+Runs the same per-order write and read-back (an order, its fills, the
+balance and position updates) and a resolution-style GROUP BY SUM over
+positions against two in-memory schemas: one with NUMERIC columns, the
+other with Micros (BIGINT millionths) columns.
+
+    python -m experiments.bench_micros --orders 2000 --positions 200000
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from sqlalchemy import Column, Integer, MetaData, Numeric, String, Table, create_engine, func, insert, select, update
+
+from src.models.micros import Micros
+
+
+def schema(amount_type) -> tuple[MetaData, Table, Table, Table]:
+    metadata = MetaData()
+    users = Table("users", metadata, Column("name", String, primary_key=True), Column("balance", amount_type))
+    positions = Table("positions", metadata,
+                      Column("user_name", String, primary_key=True), Column("market", String, primary_key=True),
+                      Column("shares", amount_type))
+    fills = Table("fills", metadata, Column("id", Integer, primary_key=True), Column("order_id", Integer),
+                  Column("fill_price", amount_type), Column("fill_shares", amount_type))
+    return metadata, users, positions, fills
+
+
+def run(amount_type, orders: int, n_positions: int) -> tuple[float, float, Decimal]:
+    engine = create_engine("sqlite://")
+    metadata, users, positions, fills = schema(amount_type)
+    metadata.create_all(engine)
+    rng = random.Random(0)
+
+    with engine.begin() as conn:
+        conn.execute(insert(users), [{"name": f"u{i}", "balance": Decimal("10000.00")} for i in range(100)])
+        conn.execute(insert(positions), [
+            {"user_name": f"u{i % 100}", "market": f"m{i}", "shares": Decimal(rng.randint(1, 99999)) / 100}
+            for i in range(n_positions)
+        ])
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for order_id in range(orders):
+            user = f"u{order_id % 100}"
+            order_fills = [{"order_id": order_id, "fill_price": Decimal(f"0.{rng.randint(10, 99)}"),
+                            "fill_shares": Decimal(rng.randint(1, 9999)) / 100} for _ in range(5)]
+            conn.execute(insert(fills), order_fills)
+            cost = sum(f["fill_price"] * f["fill_shares"] for f in order_fills).quantize(Decimal("0.01"))
+            balance = conn.execute(select(users.c.balance).where(users.c.name == user)).scalar_one()
+            conn.execute(update(users).where(users.c.name == user).values(balance=balance - cost))
+            conn.execute(select(fills.c.fill_price, fills.c.fill_shares).where(fills.c.order_id == order_id)).all()
+    per_order = (time.perf_counter() - start) / orders
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        totals = conn.execute(
+            select(positions.c.user_name, func.sum(positions.c.shares)).group_by(positions.c.user_name)
+        ).all()
+    aggregate = time.perf_counter() - start
+    return per_order, aggregate, sum((t for _, t in totals), Decimal("0"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2_000)
+    parser.add_argument("--positions", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for label, amount_type in (("NUMERIC", Numeric(14, 2)), ("Micros", Micros(2))):
+        per_order, aggregate, total = run(amount_type, args.orders, args.positions)
+        print(f"{label:8s} per order {per_order * 1e6:7.1f} us   "
+              f"SUM over {args.positions} positions {aggregate * 1000:6.1f} ms   total {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark webhook payload encoding for market_added batches.
+
+Compares the old jsonable_encoder walk with the direct json.dumps encoder,
+then the wire size of one batch in each subscriber encoding.
+
+    python -m experiments.bench_webhook_encoding --markets 5000
+"""
+import argparse
+import json
+import time
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from src.market_event_webhook import MarketEventType, Subscriber, _encode_data, msgpack
+
+
+def synthetic_batch(n: int) -> dict:
+    return {"markets": [
+        {
+            "condition_id": f"0xbench{i:08d}",
+            "question": f"Will benchmark market {i} resolve YES?",
+            "description": "This market resolves YES if the stated event happens before the deadline. " * 12,
+            "tokens": [{"token_id": f"{i}0", "outcome": "Yes", "price": Decimal("0.42")},
+                       {"token_id": f"{i}1", "outcome": "No", "price": Decimal("0.58")}],
+        }
+        for i in range(n)
+    ]}
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--markets", type=int, default=5_000)
+    parser.add_argument("--per-event", type=int, default=50, help="markets per market_added event")
+    args = parser.parse_args()
+
+    data = synthetic_batch(args.markets)
+    old = lambda: json.dumps(jsonable_encoder(data, custom_encoder={Decimal: lambda v: str(v)}))
+    print(f"jsonable_encoder + dumps: {timed(old):7.3f}s")
+    print(f"direct dumps:             {timed(lambda: _encode_data(data)):7.3f}s")
+
+    markets = data["markets"]
+    batch = [
+        (seq, MarketEventType.MARKET_ADDED.value, _encode_data({"markets": markets[i:i + args.per_event]}))
+        for seq, i in enumerate(range(0, len(markets), args.per_event), start=1)
+    ]
+    encodings = ["json", "ndjson"] + (["msgpack"] if msgpack is not None else [])
+    for encoding in encodings:
+        sub = Subscriber("bench", "http://localhost", encoding=encoding, max_batch_events=len(batch))
+        requests = sub._requests(batch)
+        size = sum(len(body) for _, _, body, _ in requests)
+        print(f"{encoding:>7}: {len(requests):5d} POSTs  {size / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
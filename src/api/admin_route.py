@@ -15,7 +15,9 @@ from src.models.sync_hot_market import SyncHotMarket
 from src.models.user import User
 from src.models.user_position import UserPosition
 from src.models.reset_log import ResetLog
-from src.sessions import get_session
+from src.market_event_webhook import outbox_dispatcher
+from src.services.book_cache import book_cache
+from src.sessions import AsyncDbSession, get_async_session
 from src.security import require_l2
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -27,22 +29,22 @@ router = APIRouter(prefix="/admin", tags=["admin"])
     description="Delete all users, orders, positions, and related data.",
     dependencies=[Depends(require_l2)],
 )
-async def clear_all_data(db: Session = Depends(get_session)):
+async def clear_all_data(db: AsyncDbSession = Depends(get_async_session)):
     try:
-        db.exec(delete(MarketOutcome))
-        db.exec(delete(MarketChangeLog))
-        db.exec(delete(PayoutLog))
-        db.exec(delete(ResetLog))
-        db.exec(delete(SyncHotMarket))
-        db.exec(delete(UserPosition))
-        db.exec(delete(OrderFill))
-        db.exec(delete(Order))
-        db.exec(delete(Market))
-        db.exec(delete(User))
-        db.commit()
+        await db.exec(delete(MarketOutcome))
+        await db.exec(delete(MarketChangeLog))
+        await db.exec(delete(PayoutLog))
+        await db.exec(delete(ResetLog))
+        await db.exec(delete(SyncHotMarket))
+        await db.exec(delete(UserPosition))
+        await db.exec(delete(OrderFill))
+        await db.exec(delete(Order))
+        await db.exec(delete(Market))
+        await db.exec(delete(User))
+        await db.commit()
         return {"success": True, "message": "All data cleared."}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database clear failed: {e}"
@@ -59,7 +61,7 @@ async def exec_sql(
     sql: str = Body(..., embed=True, description="SQL statement"),
     params: Optional[Dict[str, Any]] = Body(None, embed=True, description="Named parameters"),
     limit: int = Body(500, embed=True, description="Max rows to return for SELECT"),
-    db: Session = Depends(get_session),
+    db: AsyncDbSession = Depends(get_async_session),
 ):
     try:
         stmt = text(sql)
@@ -78,27 +80,51 @@ async def exec_sql(
         sql_upper = sql.lstrip().upper()
         is_select = sql_upper.startswith("SELECT") or sql_upper.startswith("WITH")
 
-        if is_select:
-            # No explicit transaction needed for a read
-            result: Result = db.exec(stmt)
-            rows = result.mappings().fetchmany(limit)
-            keys = list(rows[0].keys()) if rows else list(result.keys())
-            return {
-                "columns": keys,
-                "rows": [dict(r) for r in rows],
-                "truncated": len(rows) == limit,
-            }
-
-        # Non-SELECT (DML/DDL) — run in a transaction and commit
-        with db.begin():
-            result: Result = db.exec(stmt)
-        return {"affected_rows": result.rowcount}
+        return await db.run_sync(_run_sql, stmt, is_select, limit)
 
     except Exception as e:
         import logging
         logging.getLogger(__name__).exception("exec_sql failed")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"SQL execution failed: {e}",
-        )
\ No newline at end of file
+        )
+
+
+def _run_sql(db: Session, stmt, is_select: bool, limit: int) -> dict:
+    if is_select:
+        # No explicit transaction needed for a read
+        result: Result = db.exec(stmt)
+        rows = result.mappings().fetchmany(limit)
+        keys = list(rows[0].keys()) if rows else list(result.keys())
+        return {
+            "columns": keys,
+            "rows": [dict(r) for r in rows],
+            "truncated": len(rows) == limit,
+        }
+
+    # Non-SELECT (DML/DDL) — run in a transaction and commit
+    with db.begin():
+        result: Result = db.exec(stmt)
+    return {"affected_rows": result.rowcount}
+
+
+@router.get(
+    "/book-cache",
+    status_code=status.HTTP_200_OK,
+    description="Order-book cache size and hit/miss counters (L2 only).",
+    dependencies=[Depends(require_l2)],
+)
+async def get_book_cache_stats():
+    return book_cache.stats()
+
+
+@router.get(
+    "/webhooks",
+    status_code=status.HTTP_200_OK,
+    description="Per-subscriber webhook delivery offsets, lag and failure counters (L2 only).",
+    dependencies=[Depends(require_l2)],
+)
+async def get_webhook_stats(db: AsyncDbSession = Depends(get_async_session)):
+    return await db.run_sync(outbox_dispatcher.stats)
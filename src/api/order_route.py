@@ -1,8 +1,10 @@
+import asyncio
 import logging
 from decimal import Decimal
 
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import tuple_
 from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
@@ -10,10 +12,14 @@ from src.models.order_fill import OrderFill
 from src.models.user import User
 from src.models.user_position import UserPosition
 from src.services.clob_service import ClobService
+from src.services.depth_curve import DepthCurve
+from src.services.ledger_service import LedgerService
+from src.services.limit_order_service import LimitOrderService, RESTING_STATUSES, limit_order_index
 from src.services.order_service import OrderService
-from src.sessions import get_session
+from src.sessions import AsyncDbSession, get_async_session
 from src.models.market_outcome import MarketOutcome
-from src.models.order import OrderBuyCreate, Order, OrderSide, OrderType, OrderStatus, OrderSellCreate, OrderRead
+from src.models.order import (OrderBuyCreate, Order, OrderSide, OrderType, OrderStatus, OrderSellCreate, OrderRead,
+                              OrderQuoteRequest, OrderLimitCreate, OrderReplace, OrderBatchCreate, OrderBatchItem)
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +27,8 @@ router = APIRouter(prefix="/orders",
                    tags=["orders"])
 
 
-@router.post("/buy",
-                status_code=status.HTTP_201_CREATED,
-                description="Create a new buy order.")
-async def create_buy_order(
-        order: OrderBuyCreate,
-        db: Session = Depends(get_session),
-) -> dict:
-
+def _load_buy_user(db: Session, order: OrderBuyCreate) -> User:
+    """Steps 1-4 of a buy: validate the market/token and the user's balance."""
     # 1. Check if market and token exists in market_outcome db
     market_outcome_statement = (
         select(MarketOutcome)
@@ -68,72 +68,59 @@ async def create_buy_order(
             detail=f"Insufficient funds. Your balance is {user.balance}, but order requires {order.amount_usdc}."
         )
 
-    # 5. Simulate the order
-    asks_book = ClobService.get_book_by_token_id(order.token, side="BUY")
-    result = OrderService.simulate_buy_transaction(
-        amount=order.amount_usdc,
-        book=asks_book,
+    return user
+
+
+def _market_order(user_name: str, market: str, token: str, side: OrderSide,
+                  amount_usdc: Decimal, shares: Decimal, fills: list[dict]) -> Order:
+    """A filled MARKET order, with its OrderFills inserted alongside it on flush."""
+    return Order(
+        user_name=user_name,
+        market=market,
+        token=token,
+        side=side,
+        order_type=OrderType.MARKET,
+        status=OrderStatus.FILLED,
+        amount_usdc=amount_usdc,
+        shares=shares,
+        filled_shares=shares,
+        fills=[OrderFill(fill_price=fill["fill_price"], fill_shares=fill["fill_shares"]) for fill in fills],
     )
 
-    # 6. If exceeds liquidity
-    if result.get("status") == "exceeds_liquidity":
-        raise HTTPException(
-            status_code=400,
-            detail=f"Order exceeds liquidity. "
-                   f"Max amount you can buy is {result['max_amount']} USDC and Max shares is {result['max_shares']}."
-        )
 
-    total_cost = result.get("total_cost")
-    total_shares = result.get("shares_filled")
-    fills = result.get("fills")
+def _insufficient_funds(db: Session, user_name: str, usdc: Decimal) -> str:
+    user = db.get(User, user_name, populate_existing=True)
+    return f"Insufficient funds. Your balance is {user.balance}, but order requires {usdc}."
 
-    # 7. Commit to db
+
+def _insufficient_shares(db: Session, user_name: str, market: str, token: str, shares: Decimal) -> str:
+    position = db.get(UserPosition, (user_name, market, token), populate_existing=True)
+    have = position.shares if position else Decimal("0")
+    return f"Insufficient shares: you have {have}, tried to sell {shares}."
+
+
+def _record_buy(db: Session, user_name: str, market: str, token: str, result: dict) -> Order | None:
+    """
+    Debit the user and credit the position for a simulated buy, and build
+    its order; the caller adds the order and commits. Returns None, having
+    changed nothing, when the balance no longer covers the cost: it was
+    checked before the book was fetched, and other orders may have spent it.
+    """
+    total_cost = result["total_cost"]
+    total_shares = result["shares_filled"]
+    if not LedgerService.debit_balance(db, user_name, total_cost):
+        return None
+    LedgerService.credit_shares(db, user_name, market, token, total_shares)
+    return _market_order(user_name, market, token, OrderSide.BUY, total_cost, total_shares, result["fills"])
+
+
+def _persist_buy(db: Session, order: OrderBuyCreate, result: dict) -> dict:
+    """Step 7 of a buy: debit the user, credit the position, record order and fills."""
     try:
-        # 7a. Update user_profile balance
-        user.balance -= total_cost
-
-        # 7b. Upsert UserPosition table
-        user_position_statement = select(UserPosition).where(
-            UserPosition.user_name == user.name,
-            UserPosition.market == order.market,
-            UserPosition.token == order.token
-        )
-        existing_position = db.exec(user_position_statement).one_or_none()
-
-        if existing_position:
-            existing_position.shares += total_shares
-        else:
-            new_position = UserPosition(
-                user_name=user.name,
-                market=order.market,
-                token=order.token,
-                shares=total_shares
-            )
-            db.add(new_position)
-
-        # 7c. Create Order
-        new_order = Order(
-            user_name=user.name,
-            market=order.market,
-            token=order.token,
-            side=OrderSide.BUY,
-            order_type=OrderType.MARKET,
-            status=OrderStatus.FILLED,
-            amount_usdc=total_cost,
-            shares=total_shares,
-        )
-        db.add(new_order)
-        db.flush()
-
-        # 7d. Create OrderFill
-        for fill in fills:
-            order_fill = OrderFill(
-                order_id=new_order.order_id,
-                fill_price=fill['fill_price'],
-                fill_shares=fill['fill_shares'],
-            )
-            db.add(order_fill)
-        db.commit()
+        new_order = _record_buy(db, order.user_name, order.market, order.token, result)
+        if new_order is not None:
+            db.add(new_order)
+            db.commit()
 
     except Exception as e:
         db.rollback()
@@ -142,27 +129,60 @@ async def create_buy_order(
             detail=f"An error occurred while processing the order: {str(e)}"
         )
 
-
+    if new_order is None:
+        raise HTTPException(
+            status_code=400,
+            detail=_insufficient_funds(db, order.user_name, result["total_cost"])
+        )
     return {
         "status": "success",
-        "details": {
-            "amount_usdc": total_cost,
-            "shares": total_shares,
-            "average_price": total_cost / total_shares,
-            "fills": len(fills)
-        }
+        "details": _order_details(result["total_cost"], result["shares_filled"], result["fills"]),
     }
 
 
-@router.post(
-    "/sell",
-    status_code=status.HTTP_201_CREATED,
-    description="Create a new sell order.",
-)
-def create_sell_order(
-    order: OrderSellCreate,
-    db: Session = Depends(get_session),
+def _order_details(amount_usdc: Decimal, shares: Decimal, fills: list[dict]) -> dict:
+    return {
+        "amount_usdc": amount_usdc,
+        "shares": shares,
+        "average_price": (amount_usdc / shares) if shares else None,
+        "fills": len(fills),
+    }
+
+
+@router.post("/buy",
+                status_code=status.HTTP_201_CREATED,
+                description="Create a new buy order.")
+async def create_buy_order(
+        order: OrderBuyCreate,
+        db: AsyncDbSession = Depends(get_async_session),
 ) -> dict:
+    # DB work goes through the async session and the book comes from the async
+    # CLOB client, so a slow upstream never stalls the event loop.
+
+    # 1-4. Validate market, user and balance
+    await db.run_sync(_load_buy_user, order)
+
+    # 5. Simulate the order
+    asks_book = await ClobService.get_book_by_token_id_async(order.token, side="BUY")
+    result = OrderService.simulate_buy_transaction(
+        amount=order.amount_usdc,
+        book=asks_book,
+    )
+
+    # 6. If exceeds liquidity
+    if result.get("status") == "exceeds_liquidity":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Order exceeds liquidity. "
+                   f"Max amount you can buy is {result['max_amount']} USDC and Max shares is {result['max_shares']}."
+        )
+
+    # 7. Commit to db
+    return await db.run_sync(_persist_buy, order, result)
+
+
+def _load_sell_position(db: Session, order: OrderSellCreate) -> tuple[User, UserPosition]:
+    """Steps 1-3 of a sell: validate the market/token, the user and their shares."""
     # 1. Verify market/token exists
     mo_stmt = (
         select(MarketOutcome)
@@ -215,8 +235,62 @@ def create_sell_order(
             ),
         )
 
+    return user, user_pos
+
+
+def _record_sell(db: Session, user_name: str, market: str, token: str, result: dict) -> Order | None:
+    """
+    Debit the position and credit the user for a simulated sell, and build
+    its order; the caller adds the order and commits. Returns None, having
+    changed nothing, when the position no longer holds the shares.
+    """
+    proceeds = result["total_proceeds"]
+    sold = result["shares_sold"]
+    if not LedgerService.debit_shares(db, user_name, market, token, sold):
+        return None
+    LedgerService.credit_balance(db, user_name, proceeds)
+    return _market_order(user_name, market, token, OrderSide.SELL, proceeds, sold, result["fills"])
+
+
+def _persist_sell(db: Session, order: OrderSellCreate, result: dict) -> dict:
+    """Step 6 of a sell: debit the position, credit the user, record order and fills."""
+    try:
+        new_order = _record_sell(db, order.user_name, order.market, order.token, result)
+        if new_order is not None:
+            db.add(new_order)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing sell: {e}"
+        )
+
+    if new_order is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_insufficient_shares(db, order.user_name, order.market, order.token, result["shares_sold"])
+        )
+    return {
+        "status":   "success",
+        "details": _order_details(result["total_proceeds"], result["shares_sold"], result["fills"]),
+    }
+
+
+@router.post(
+    "/sell",
+    status_code=status.HTTP_201_CREATED,
+    description="Create a new sell order.",
+)
+async def create_sell_order(
+    order: OrderSellCreate,
+    db: AsyncDbSession = Depends(get_async_session),
+) -> dict:
+    # 1-3. Validate market, user and position
+    await db.run_sync(_load_sell_position, order)
+
     # 4. Simulate
-    bids = ClobService.get_book_by_token_id(order.token, side="SELL")
+    bids = await ClobService.get_book_by_token_id_async(order.token, side="SELL")
     result = OrderService.simulate_sell_transaction(
         shares=order.shares,
         book=bids,
@@ -232,59 +306,367 @@ def create_sell_order(
             ),
         )
 
-    proceeds = result["total_proceeds"]
-    sold = result["shares_sold"]
-    fills = result["fills"]
-
     # 6. Persist
-    try:
-        # a) credit user balance
-        user.balance += proceeds
-
-        # b) debit their position
-        user_pos.shares -= sold
-
-        # c) create Order
-        new_order = Order(
-            user_name=user.name,
-            market=order.market,
-            token=order.token,
-            side=OrderSide.SELL,
-            order_type=OrderType.MARKET,
-            status=OrderStatus.FILLED,
-            amount_usdc=proceeds,
-            shares=sold,
-        )
-        db.add(new_order)
-        db.flush()  # populate new_order.order_id
+    return await db.run_sync(_persist_sell, order, result)
+
+
+def _batch_book_side(books: dict[str, dict | None], token: str, side: OrderSide) -> list[dict] | None:
+    """One side of a token's book as mutable levels, already in walk order."""
+    book = books.get(token)
+    if book is None:
+        return None
+    if side == OrderSide.BUY:
+        curve = DepthCurve.for_buy(book["asks"])
+    else:
+        curve = DepthCurve.for_sell(book["bids"])
+    return [{"price": price, "size": size} for price, size in zip(curve.prices, curve.sizes)]
+
+
+def _deplete(levels: list[dict], fills: list[dict]) -> None:
+    # The walk fills levels front to back, so fill i came out of level i
+    for level, fill in zip(levels, fills):
+        level["size"] -= fill["fill_shares"]
+    exhausted = 0
+    while exhausted < len(levels) and levels[exhausted]["size"] <= 0:
+        exhausted += 1
+    del levels[:exhausted]
+
+
+def _simulate_batch_order(item: OrderBatchItem,
+                          outcomes: dict[tuple[str, str], MarketOutcome],
+                          users: set[str],
+                          levels: list[dict] | None) -> tuple[dict | None, str | None]:
+    """Check one batch order and simulate it against the book so far: (result, rejection)."""
+    outcome = outcomes.get((item.market, item.token))
+    if not outcome:
+        return None, f"Invalid market/token combination. Market '{item.market}' with token '{item.token}' not found."
+    if not outcome.market_obj.is_tradable:
+        return None, f"Market '{item.market}' is not tradable at this time."
+    if item.user_name not in users:
+        return None, "User user_profile not found"
+    if levels is None:
+        return None, f"Order book for token '{item.token}' not available."
+
+    if item.side == OrderSide.BUY:
+        if item.amount_usdc is None:
+            return None, "BUY orders need amount_usdc."
+        result = OrderService.simulate_buy_transaction(amount=item.amount_usdc, book=levels)
+    else:
+        if item.shares is None:
+            return None, "SELL orders need shares."
+        result = OrderService.simulate_sell_transaction(shares=item.shares, book=levels)
 
-        # d) record fills
-        for f in fills:
-            db.add(OrderFill(
-                order_id=new_order.order_id,
-                fill_price = f["fill_price"],
-                fill_shares= f["fill_shares"],
-            ))
+    if result.get("status") == "exceeds_liquidity":
+        return None, (f"Order exceeds liquidity: max shares {result['max_shares']}, "
+                      f"max amount {result['max_amount']} USDC.")
+    return result, None
+
+
+def _persist_batch(db: Session, items: list[OrderBatchItem], books: dict[str, dict | None]) -> dict:
+    """
+    Run `items` in order and commit every accepted order in one transaction.
+    Markets and users are loaded up front in two queries. Each token's book
+    is walked as a depleting copy, so later orders see the liquidity earlier
+    ones used. Balances and positions change through atomic conditional
+    updates, so an order that no longer fits, after earlier orders in the
+    batch or concurrent requests, is rejected without touching anything.
+    A rejected order doesn't stop the rest.
+    """
+    pairs = list(dict.fromkeys((item.market, item.token) for item in items))
+    names = list(dict.fromkeys(item.user_name for item in items))
+
+    outcomes = {
+        (mo.market, mo.token): mo
+        for mo in db.exec(
+            select(MarketOutcome)
+            .options(selectinload(MarketOutcome.market_obj))
+            .where(tuple_(MarketOutcome.market, MarketOutcome.token).in_(pairs))
+        ).all()
+    }
+    users = set(db.exec(select(User.name).where(User.name.in_(names))).all())
 
+    sides: dict[tuple[str, OrderSide], list[dict] | None] = {}
+    results = []
+    accepted: list[tuple[dict, Order]] = []
+    try:
+        for index, item in enumerate(items):
+            key = (item.token, item.side)
+            if key not in sides:
+                sides[key] = _batch_book_side(books, item.token, item.side)
+
+            result, rejection = _simulate_batch_order(item, outcomes, users, sides[key])
+            if rejection is None and item.side == OrderSide.BUY:
+                new_order = _record_buy(db, item.user_name, item.market, item.token, result)
+                if new_order is None:
+                    rejection = _insufficient_funds(db, item.user_name, result["total_cost"])
+            elif rejection is None:
+                new_order = _record_sell(db, item.user_name, item.market, item.token, result)
+                if new_order is None:
+                    rejection = _insufficient_shares(db, item.user_name, item.market, item.token,
+                                                     result["shares_sold"])
+            if rejection:
+                results.append({"index": index, "status": "rejected", "detail": rejection})
+                continue
+            _deplete(sides[key], result["fills"])
+
+            details = _order_details(new_order.amount_usdc, new_order.shares, result["fills"])
+            entry = {"index": index, "status": "success", "order_id": None, "details": details}
+            results.append(entry)
+            accepted.append((entry, new_order))
+
+        # Orders and fills go in with one flush at commit
+        db.add_all([new_order for _, new_order in accepted])
         db.commit()
+
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing sell: {e}"
+            detail=f"An error occurred while processing the batch: {str(e)}"
         )
 
+    for entry, new_order in accepted:
+        entry["order_id"] = new_order.order_id
     return {
-        "status":   "success",
-        "details": {
-            "amount_usdc":  proceeds,
-            "shares":       sold,
-            "average_price": (proceeds / sold) if sold else None,
-            "fills":         len(fills),
-        },
+        "status": "success",
+        "accepted": len(accepted),
+        "rejected": len(results) - len(accepted),
+        "results": results,
     }
 
 
+@router.post(
+    "/batch",
+    status_code=status.HTTP_201_CREATED,
+    description="Submit many market orders at once; accepted orders commit together.",
+)
+async def create_batch_orders(
+    batch: OrderBatchCreate,
+    db: AsyncDbSession = Depends(get_async_session),
+) -> dict:
+    # One book fetch per token, all at once
+    tokens = list(dict.fromkeys(item.token for item in batch.orders))
+    fetched = await asyncio.gather(
+        *(ClobService.get_book_by_token_id_async(token) for token in tokens),
+        return_exceptions=True,
+    )
+    books = {}
+    for token, book in zip(tokens, fetched):
+        if isinstance(book, Exception):
+            logger.warning(f"Order book fetch for token {token} failed: {book}")
+            book = None
+        books[token] = book
+
+    return await db.run_sync(_persist_batch, batch.orders, books)
+
+
+@router.post(
+    "/quote",
+    status_code=status.HTTP_200_OK,
+    description="Quote many order sizes for one token against a single order book.",
+)
+async def quote_orders(quote: OrderQuoteRequest) -> dict:
+    # One book fetch (usually a cache hit) and one depth curve answer every size
+    book = await ClobService.get_book_by_token_id_async(quote.token, side=quote.side.value)
+    if book is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Order book for token '{quote.token}' not found.",
+        )
+
+    curve = DepthCurve.for_buy(book) if quote.side == OrderSide.BUY else DepthCurve.for_sell(book)
+    return {
+        "token": quote.token,
+        "side": quote.side,
+        "best_price": curve.best_price,
+        "depth_shares": curve.depth_shares,
+        "depth_usdc": curve.depth_cost,
+        "quotes": [curve.quote(size) for size in quote.sizes],
+    }
+
+
+def _check_tradable(db: Session, market: str, token: str) -> None:
+    market_outcome = db.exec(
+        select(MarketOutcome)
+        .options(selectinload(MarketOutcome.market_obj))
+        .where(MarketOutcome.market == market, MarketOutcome.token == token)
+    ).one_or_none()
+    if not market_outcome:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Invalid market/token combination. Market '{market}' with token '{token}' not found."
+        )
+    if not market_outcome.market_obj.is_tradable:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Market '{market}' is not tradable at this time."
+        )
+
+
+def _hold_for_limit(db: Session, side: OrderSide, user_name: str, market: str, token: str,
+                    usdc: Decimal, shares: Decimal) -> None:
+    """
+    Take `usdc` from the balance (buy) or `shares` from the position (sell)
+    for a limit order; raises before changing anything if there isn't enough.
+    """
+    if side == OrderSide.BUY:
+        if not LedgerService.debit_balance(db, user_name, usdc):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=_insufficient_funds(db, user_name, usdc)
+            )
+    elif not LedgerService.debit_shares(db, user_name, market, token, shares):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_insufficient_shares(db, user_name, market, token, shares)
+        )
+
+
+def _commit_limit(db: Session) -> None:
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while processing the order: {str(e)}"
+        )
+
+
+def _changed_concurrently(order_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Order {order_id} was changed by another request; fetch it and try again."
+    )
+
+
+def _place_limit(db: Session, order: OrderLimitCreate) -> OrderRead:
+    """Validate a LIMIT order, hold its funds or shares and add it to the resting index."""
+    _check_tradable(db, order.market, order.token)
+    if not db.get(User, order.user_name):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User user_profile not found"
+        )
+
+    reservation = LimitOrderService.reservation(order.limit_price, order.shares)
+    _hold_for_limit(db, order.side, order.user_name, order.market, order.token, reservation, order.shares)
+    new_order = Order(
+        user_name=order.user_name,
+        market=order.market,
+        token=order.token,
+        side=order.side,
+        order_type=OrderType.LIMIT,
+        status=OrderStatus.OPEN,
+        shares=order.shares,
+        limit_price=order.limit_price,
+        reserved_usdc=reservation if order.side == OrderSide.BUY else Decimal("0"),
+    )
+    db.add(new_order)
+    _commit_limit(db)
+    limit_order_index.add(new_order)
+    return OrderRead.model_validate(new_order)
+
+
+def _load_resting(db: Session, order_id: int) -> Order:
+    order = db.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found.")
+    if order.order_type != OrderType.LIMIT or order.status not in RESTING_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only open LIMIT orders can be changed; order {order_id} is a {order.status.value} "
+                   f"{order.order_type.value} order."
+        )
+    return order
+
+
+def _cancel_limit(db: Session, order_id: int) -> OrderRead:
+    """Cancel a resting LIMIT order and release what it still holds."""
+    order = _load_resting(db, order_id)
+    if not LimitOrderService.cancel(db, order):
+        raise _changed_concurrently(order_id)
+    _commit_limit(db)
+    limit_order_index.remove(order_id)
+    return OrderRead.model_validate(order)
+
+
+def _replace_limit(db: Session, order_id: int, change: OrderReplace) -> OrderRead:
+    """
+    Change the price and/or size of a resting LIMIT order in place. The
+    order keeps its id and fills but goes to the back of its new price level.
+    """
+    order = _load_resting(db, order_id)
+    limit_price = change.limit_price or order.limit_price
+    shares = change.shares or order.shares
+    if shares <= order.filled_shares:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"New size {shares} must be above the {order.filled_shares} shares already filled."
+        )
+
+    # Hold any increase first, then claim the order as read; give back any
+    # decrease only once the claim has gone through
+    changes = {"limit_price": limit_price, "shares": shares}
+    usdc = shares_delta = Decimal("0")
+    if order.side == OrderSide.BUY:
+        # Re-reserve the rest of the order at the new price
+        changes["reserved_usdc"] = LimitOrderService.reservation(limit_price, shares - order.filled_shares)
+        usdc = changes["reserved_usdc"] - order.reserved_usdc
+    else:
+        shares_delta = shares - order.shares
+    if usdc > 0 or shares_delta > 0:
+        _hold_for_limit(db, order.side, order.user_name, order.market, order.token, usdc, shares_delta)
+
+    if not LimitOrderService.claim(db, order, **changes):
+        db.rollback()
+        raise _changed_concurrently(order_id)
+    LimitOrderService.release(db, order, -usdc, -shares_delta)
+    _commit_limit(db)
+    limit_order_index.add(order)
+    return OrderRead.model_validate(order)
+
+
+@router.post(
+    "/limit",
+    response_model=OrderRead,
+    status_code=status.HTTP_201_CREATED,
+    description="Place a resting LIMIT order, filled by the matcher as the book crosses its price.",
+)
+async def create_limit_order(
+    order: OrderLimitCreate,
+    db: AsyncDbSession = Depends(get_async_session),
+):
+    return await db.run_sync(_place_limit, order)
+
+
+@router.post(
+    "/{order_id}/cancel",
+    response_model=OrderRead,
+    status_code=status.HTTP_200_OK,
+    description="Cancel an open LIMIT order.",
+)
+async def cancel_limit_order(
+    order_id: int,
+    db: AsyncDbSession = Depends(get_async_session),
+):
+    return await db.run_sync(_cancel_limit, order_id)
+
+
+@router.post(
+    "/{order_id}/replace",
+    response_model=OrderRead,
+    status_code=status.HTTP_200_OK,
+    description="Change the price and/or size of an open LIMIT order.",
+)
+async def replace_limit_order(
+    order_id: int,
+    change: OrderReplace,
+    db: AsyncDbSession = Depends(get_async_session),
+):
+    return await db.run_sync(_replace_limit, order_id, change)
+
+
 @router.get(
     "/",
     response_model=list[OrderRead],
@@ -292,10 +674,10 @@ def create_sell_order(
     description="Get all the orders.",
 )
 async def get_all_orders(
-    db: Session = Depends(get_session),
+    db: AsyncDbSession = Depends(get_async_session),
 ):
     try:
-        orders = db.exec(select(Order).options(selectinload(Order.fills))).all()
+        orders = (await db.exec(select(Order).options(selectinload(Order.fills)))).all()
         return orders
     except Exception as e:
         logger.error(f"Failed to fetch orders: {e}")
@@ -313,10 +695,10 @@ async def get_all_orders(
 )
 async def get_user_orders(
     user_name: str,
-    db: Session = Depends(get_session),
+    db: AsyncDbSession = Depends(get_async_session),
 ):
     # Optionally check if user exists
-    if not db.exec(select(User).where(User.name == user_name)).one_or_none():
+    if not (await db.exec(select(User).where(User.name == user_name))).one_or_none():
         raise HTTPException(404, "user not found")
-    orders = db.exec(select(Order).where(Order.user_name == user_name)).all()
+    orders = (await db.exec(select(Order).where(Order.user_name == user_name))).all()
     return orders
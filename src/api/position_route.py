@@ -1,11 +1,11 @@
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import select
 
 from src.models.user import User
 from src.models.user_position import UserPositionRead, UserPosition
-from src.sessions import get_session
+from src.sessions import AsyncDbSession, get_async_session
 
 
 logger = logging.getLogger(__name__)
@@ -25,18 +25,18 @@ router = APIRouter(prefix="/positions",
 )
 async def get_user_positions(
     user_name: str,
-    db: Session = Depends(get_session),
+    db: AsyncDbSession = Depends(get_async_session),
 ):
-    user = db.exec(select(User).where(User.name == user_name)).one_or_none()
+    user = (await db.exec(select(User).where(User.name == user_name))).one_or_none()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User '{user_name}' not found"
         )
 
-    positions = db.exec(
+    positions = (await db.exec(
         select(UserPosition).where(UserPosition.user_name == user_name)
-    ).all()
+    )).all()
 
     return positions
 
@@ -48,7 +48,7 @@ async def get_user_positions(
     description="Get all user positions in the system.",
 )
 async def get_all_positions(
-    db: Session = Depends(get_session),
+    db: AsyncDbSession = Depends(get_async_session),
 ):
-    positions = db.exec(select(UserPosition)).all()
+    positions = (await db.exec(select(UserPosition))).all()
     return positions
\ No newline at end of file
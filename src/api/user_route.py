@@ -3,9 +3,9 @@ from decimal import Decimal
 
 from sqlalchemy.exc import IntegrityError
 from fastapi import APIRouter, Depends, HTTPException, status, Body
-from sqlmodel import Session, select
+from sqlmodel import select
 
-from src.sessions import get_session
+from src.sessions import AsyncDbSession, get_async_session
 from src.security import require_l1
 from src.models.user import User, UserCreate, UserRead, BalanceUpdate
 from src.models.reset_log import ResetLog
@@ -28,26 +28,26 @@ router = APIRouter(prefix="/users",
 )
 async def create_user(
         user: UserCreate,
-        db: Session = Depends(get_session),
+        db: AsyncDbSession = Depends(get_async_session),
 ):
     try:
         created_user = User(
             ** user.model_dump()
         )
         db.add(created_user)
-        db.commit()
-        db.refresh(created_user)
+        await db.commit()
+        await db.refresh(created_user)
         return created_user
 
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User already exists"
         )
     except Exception as e:
         logger.exception(f"Failed to create user {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred."
@@ -70,12 +70,12 @@ async def create_user(
 async def reset_user_balance(
     user_name: str,
     user_input: BalanceUpdate = Body(default=BalanceUpdate()),
-    db: Session = Depends(get_session),
+    db: AsyncDbSession = Depends(get_async_session),
 ):
     try:
-        user_db = db.exec(
+        user_db = (await db.exec(
             select(User).where(User.name == user_name)
-        ).one_or_none()
+        )).one_or_none()
         logger.debug(f"Resetting user {user_name} with balance {user_input.balance}")
         if not user_db:
             raise HTTPException(
@@ -99,9 +99,9 @@ async def reset_user_balance(
         db.add(reset_log)
 
         logger.debug(f"Committing changes for user {user_name}")
-        db.commit()
+        await db.commit()
         logger.debug(f"Refreshing user {user_name} after commit")
-        db.refresh(user_db)
+        await db.refresh(user_db)
         logger.debug(f"User {user_name} reset successfully")
         return user_db
 
@@ -110,7 +110,7 @@ async def reset_user_balance(
 
     except Exception as e:
         logger.exception(f"Failed to reset user {user_name}: {e}"),
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred."
@@ -130,12 +130,12 @@ async def reset_user_balance(
 )
 async def get_user(
     user_name: str,
-    db: Session = Depends(get_session),
+    db: AsyncDbSession = Depends(get_async_session),
 ):
     try:
-        user_db = db.exec(
+        user_db = (await db.exec(
             select(User).where(User.name == user_name)
-        ).one_or_none()
+        )).one_or_none()
 
         if not user_db:
             raise HTTPException(
@@ -7,6 +7,10 @@ from fastapi import FastAPI
 
 from src.api import user_route, order_route, position_route, admin_route
 from src.background_task import run_market_sync
+from src.clob_sessions import close_clob_clients, aclose_clob_clients
+from src.market_event_webhook import run_outbox_dispatch, close_webhook_clients, outbox_poll_seconds
+from src.services.limit_order_service import load_limit_order_index, run_limit_order_matching, limit_match_seconds
+from src.sessions import async_engine
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,9 +30,25 @@ async def lifespan(app: FastAPI):
                       max_instances=1,
                       coalesce=True,
                       next_run_time=datetime.now() + timedelta(seconds=10))
+    scheduler.add_job(run_outbox_dispatch,
+                      'interval',
+                      seconds=outbox_poll_seconds,
+                      max_instances=1,
+                      coalesce=True)
+    load_limit_order_index()
+    scheduler.add_job(run_limit_order_matching,
+                      'interval',
+                      seconds=limit_match_seconds,
+                      max_instances=1,
+                      coalesce=True)
     scheduler.start()
     yield
     scheduler.shutdown()
+    await aclose_clob_clients()
+    close_clob_clients()
+    close_webhook_clients()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
 
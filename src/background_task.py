@@ -1,53 +1,123 @@
 import logging
+import uuid
+from itertools import islice
+from typing import Iterable, Iterator
+
+from sqlmodel import Session
 
 from src.sessions import get_session_context
-from src.market_event_webhook import emit_market_event, MarketEventType
+from src.market_event_webhook import enqueue_market_event, MarketEventType, payout_emit_chunk_size
 from src.services.market_sync_service import MarketSyncService, MarketSyncError
 from src.services.resolution_service import ResolutionService, ResolutionError
+from src.services.limit_order_service import LimitOrderService, limit_order_index
 
 
 logger = logging.getLogger(__name__)
 
 
+def _chunked(items: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def enqueue_payout_logs(db: Session,
+                        payout_logs: Iterable[dict],
+                        chunk_size: int = payout_emit_chunk_size) -> int:
+    """
+    Queue payout logs as a sequence of PAYOUT_LOGS events of at most
+    `chunk_size` logs each, consuming `payout_logs` lazily and flushing each
+    event so memory stays bounded by one chunk. Every event carries the batch
+    id, its sequence number and whether it is the last one; an empty batch
+    still queues one (empty, last) event. Returns the number of events.
+    """
+    batch_id = uuid.uuid4().hex
+    chunks = _chunked(payout_logs, chunk_size)
+    current = next(chunks, [])
+    sequence = 0
+    while True:
+        following = next(chunks, None)
+        row = enqueue_market_event(
+            db,
+            MarketEventType.PAYOUT_LOGS.value,
+            {
+                "payout_logs": current,
+                "batch_id": batch_id,
+                "sequence": sequence,
+                "last": following is None,
+            }
+        )
+        db.flush()
+        db.expunge(row)
+        sequence += 1
+        if following is None:
+            return sequence
+        current = following
+
+
 def run_market_sync():
     """
     Entry point for the background market synchronization task.
     Opens a session, runs the full sync pipeline, and commits or rolls back.
+    Webhook events are queued in the outbox within the same transactions and
+    delivered by the outbox dispatcher, so a slow subscriber never blocks here.
     """
     logger.info("Market sync job started")
     with get_session_context() as session:
         try:
             # 1) sync markets
             result = MarketSyncService.sync_markets(session)
-            session.commit()
-            logger.debug(f"Market sync succeeded: {result}", )
 
-            # 1.1) Emit added markets to webhook
+            # 1.1) Queue added markets for the webhook, committed with the sync
             added_markets = result.get("added_dict_model", [])
-            emit_market_event(
+            enqueue_market_event(
+                session,
                 MarketEventType.MARKET_ADDED.value,
                 {"markets": added_markets}
             )
+            session.commit()
+            logger.debug(f"Market sync succeeded: {result}", )
 
-            # 2) resolve payouts for any removed/untradable markets
+            # 2) resolve payouts for any removed/untradable markets in one batch
             markets_with_winning_tokens = result.get("markets_with_winning_tokens", [])
-            payout_logs = []
+            resolution_summaries = []
+            cancelled_orders = []
             if markets_with_winning_tokens:
-                payout_logs = ResolutionService.resolve_market_winners(session, markets_with_winning_tokens)
-                session.commit()
-                logger.debug(f"Payouts resolved: {payout_logs}", )
+                # Resting limit orders give back their funds and shares before positions are paid
+                cancelled_orders = LimitOrderService.cancel_market_orders(
+                    session, [m["condition_id"] for m in markets_with_winning_tokens], commit=False
+                )
+                resolution_summaries = ResolutionService.resolve_markets_batch(session, markets_with_winning_tokens)
+                logger.debug(f"Payouts resolved: {resolution_summaries}", )
 
-            # 2.1) Emit resolved markets to webhook
-            emit_market_event(
+            # 2.1) Queue resolved markets
+            enqueue_market_event(
+                session,
                 MarketEventType.MARKET_RESOLVED.value,
                 {"markets": markets_with_winning_tokens}
             )
 
-            # 2.2) Emit payout logs to webhook
-            emit_market_event(
-                MarketEventType.PAYOUT_LOGS.value,
-                {"payout_logs": payout_logs}
+            # 2.2) Stream payout logs into bounded, sequenced events
+            payout_logs = (
+                log
+                for summary in resolution_summaries
+                if summary["positions"]
+                for log in ResolutionService.iter_payout_logs(session, summary["condition_id"])
             )
+            enqueue_payout_logs(session, payout_logs)
+
+            # 2.3) Queue per-market resolution summaries once everything is paid out
+            if resolution_summaries:
+                enqueue_market_event(
+                    session,
+                    MarketEventType.RESOLUTION_SUMMARY.value,
+                    {"markets": resolution_summaries}
+                )
+
+            # Cancellations, resolution and its events commit together
+            session.commit()
+            for order_id in cancelled_orders:
+                limit_order_index.remove(order_id)
 
         except MarketSyncError as e:
             session.rollback()
@@ -204,6 +204,99 @@ class Client(BaseClient):
         }
         return self._request("POST", "/orders/sell", json=payload).json()
 
+    def submit_batch(self, orders: Iterable[Dict[str, Any]]):
+        """
+        Submit many market orders in one call. Each order is a dict with
+        user_name, market, token, side ("BUY"/"SELL") and amount_usdc (BUY)
+        or shares (SELL). Orders run in sequence against one book per token;
+        accepted ones commit together and the reply has one result per order.
+        Server route: POST /orders/batch
+        """
+        payload = {
+            "orders": [
+                {key: str(value) if isinstance(value, (Decimal, float)) else value for key, value in order.items()}
+                for order in orders
+            ],
+        }
+        return self._request("POST", "/orders/batch", json=payload).json()
+
+
+    def limit_order(
+            self,
+            *,
+            user_name: str,
+            market: str,
+            token: str,
+            side: str,
+            limit_price: Decimal | float | str,
+            shares: Decimal | float | str,
+    ):
+        """
+        Place a resting LIMIT order; it fills as the book crosses `limit_price`.
+        Server route: POST /orders/limit
+        """
+        payload = {
+            "user_name": user_name,
+            "market": market,
+            "token": token,
+            "side": side,
+            "limit_price": str(limit_price),
+            "shares": str(shares),
+        }
+        return self._request("POST", "/orders/limit", json=payload).json()
+
+
+    def replace_order(
+            self,
+            order_id: int,
+            *,
+            limit_price: Decimal | float | str | None = None,
+            shares: Decimal | float | str | None = None,
+    ):
+        """
+        Change the price and/or size of an open LIMIT order.
+        Server route: POST /orders/{order_id}/replace
+        """
+        payload = {}
+        if limit_price is not None:
+            payload["limit_price"] = str(limit_price)
+        if shares is not None:
+            payload["shares"] = str(shares)
+        return self._request("POST", f"/orders/{order_id}/replace", json=payload).json()
+
+
+    def cancel_order(self, order_id: int):
+        """
+        Cancel an open LIMIT order.
+        Server route: POST /orders/{order_id}/cancel
+        """
+        return self._request("POST", f"/orders/{order_id}/cancel").json()
+
+
+    def quote_many(
+            self,
+            *,
+            token: str,
+            amounts_usdc: Iterable[Decimal | float | str] | None = None,
+            shares: Iterable[Decimal | float | str] | None = None,
+    ):
+        """
+        Quote many order sizes for one token in a single call: pass
+        `amounts_usdc` to quote buys or `shares` to quote sells. Returns one
+        quote per size with shares, amount, fill price, average price and
+        slippage.
+        Server route: POST /orders/quote
+        """
+        if (amounts_usdc is None) == (shares is None):
+            raise ValueError("Pass exactly one of amounts_usdc (buy) or shares (sell).")
+        side, sizes = ("BUY", amounts_usdc) if shares is None else ("SELL", shares)
+        payload = {
+            "token": token,
+            "side": side,
+            "sizes": [str(size) for size in sizes],
+        }
+        return self._request("POST", "/orders/quote", json=payload).json()["quotes"]
+
     def list_orders(self):
         """
         GET /orders/ — returns all orders (with fills included by the server).
@@ -247,6 +340,7 @@ class Client(BaseClient):
         Executes arbitrary SQL.
         - SELECT: returns {"columns": [...], "rows": [...], "truncated": bool}
         - DML/DDL: returns {"affected_rows": int}
+        Amount columns (balances, shares, prices) hold integer millionths here.
         """
         payload = {"sql": sql, "limit": limit}
         if params and ":" in sql:
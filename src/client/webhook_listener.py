@@ -1,26 +1,200 @@
+import asyncio
+import gzip
+import heapq
 import json
+import sqlite3
 import threading
-from typing import Callable, Dict, List, Optional
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from abc import ABC, abstractmethod
 
+try:
+    import msgpack
+except ImportError:  # only needed when the server sends msgpack
+    msgpack = None
+
 Handler = Callable[[dict], None]
+Ready = List[Tuple[str, dict]]
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
 
 
+def decode_events(body: bytes, content_type: str = "", content_encoding: str = "") -> List[dict]:
+    """
+    Decode a webhook body into its event envelopes ({"event", "sequence", "data"}).
+    Handles a single JSON event, NDJSON and msgpack batches, gzip-compressed or not.
+    """
+    if "gzip" in content_encoding.lower():
+        body = gzip.decompress(body)
+    ctype = content_type.split(";")[0].strip().lower()
+
+    if ctype in NDJSON_TYPES:
+        events = [json.loads(line) for line in body.splitlines() if line.strip()]
+    elif ctype in MSGPACK_TYPES:
+        if msgpack is None:
+            raise ValueError("msgpack payload received but msgpack is not installed")
+        events = msgpack.unpackb(body)
+    else:
+        events = json.loads(body or b"{}")
+
+    if isinstance(events, dict):
+        events = [events]
+    for envelope in events:
+        if not envelope.get("event"):
+            raise ValueError("Missing 'event'")
+    return events
+
+
+
+def _call_handler(handler: Handler, event: str, data: dict) -> None:
+    # Module level so it can be shipped to a process pool
+    try:
+        handler(data)
+    except Exception as e:
+        print(f"[handler error] {event}: {e}")
+
+
+class SeenSet:
+    """Bounded in-memory set of delivered event keys; the least recently seen are forgotten first."""
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max(1, max_size)
+        self._keys: OrderedDict = OrderedDict()
+
+    def add(self, key: str) -> bool:
+        """Record `key`; returns False if it was already there."""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+        return True
+
+
+class SqliteSeenSet:
+    """
+    SeenSet kept in a SQLite file, so replays are still recognised after a
+    restart. Holds roughly the `max_size` most recently added keys.
+    """
+
+    def __init__(self, path: str, max_size: int = 1_000_000):
+        self.max_size = max(1, max_size)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (n INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE NOT NULL)")
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> bool:
+        with self._lock:
+            cur = self._db.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (key,))
+            if cur.rowcount != 1:
+                return False
+            if cur.lastrowid % 1000 == 0:
+                self._db.execute("DELETE FROM seen WHERE n <= ?", (cur.lastrowid - self.max_size,))
+            return True
+
+    def close(self):
+        self._db.close()
+
 
 class EventBus:
-    def __init__(self):
+    """
+    Routes events to handlers, skipping replays and smoothing out reordering.
+
+    Events that carry a `sequence` are checked against `seen` (a SeenSet by
+    default) so a redelivered event never reaches the handlers twice. With
+    `reorder_window` > 0, out-of-order events are held back and released in
+    sequence order: immediately when they continue the last released
+    sequence, otherwise once more than `reorder_window` are waiting or the
+    oldest has waited `reorder_timeout` seconds. Sequences can have gaps
+    (a subscriber filtering on event type never sees some numbers), which is
+    what the window and timeout are for. An event older than one already
+    released is still delivered, just late.
+    """
+
+    def __init__(self, *, seen: Union[SeenSet, SqliteSeenSet, None] = None,
+                 reorder_window: int = 0, reorder_timeout: float = 2.0):
         self._subs: Dict[str, List[Handler]] = {}
+        self.seen = seen if seen is not None else SeenSet()
+        self.reorder_window = max(0, reorder_window)
+        self.reorder_timeout = reorder_timeout
+        self.duplicates = 0
+        self.late = 0
+        self._released: Optional[int] = None
+        self._pending: List[Tuple[int, float, str, dict]] = []
+        self._lock = threading.Lock()
+        self._dispatch_lock = threading.Lock()
 
     def on(self, event: str, handler: Handler):
         self._subs.setdefault(event, []).append(handler)
 
-    def emit(self, event: str, data: dict):
-        for h in self._subs.get(event, []):
-            try:
-                h(data)
-            except Exception as e:
-                print(f"[handler error] {event}: {e}")
+    def handlers(self, event: str) -> List[Handler]:
+        return list(self._subs.get(event, []))
+
+    def admit(self, event: str, data: dict, sequence: Optional[int] = None) -> Ready:
+        """Accept one incoming event and return the (event, data) pairs now ready, in order."""
+        if sequence is None:
+            return [(event, data)]
+        with self._lock:
+            if not self.seen.add(str(sequence)):
+                self.duplicates += 1
+                return []
+            if self._released is not None and sequence < self._released:
+                self.late += 1
+                return [(event, data)]
+            if not self.reorder_window:
+                self._released = sequence
+                return [(event, data)]
+            heapq.heappush(self._pending, (sequence, time.monotonic(), event, data))
+            return self._release(lambda: len(self._pending) > self.reorder_window)
+
+    def release_expired(self) -> Ready:
+        """Release events that have waited longer than `reorder_timeout`."""
+        deadline = time.monotonic() - self.reorder_timeout
+        with self._lock:
+            return self._release(lambda: min(at for _, at, _, _ in self._pending) <= deadline)
+
+    def drain(self) -> Ready:
+        """Release everything still held back."""
+        with self._lock:
+            return self._release(lambda: True)
+
+    def _release(self, overflowing: Callable[[], bool]) -> Ready:
+        ready: Ready = []
+        while self._pending and (
+            (self._released is not None and self._pending[0][0] == self._released + 1) or overflowing()
+        ):
+            sequence, _, event, data = heapq.heappop(self._pending)
+            self._released = sequence
+            ready.append((event, data))
+        return ready
+
+    def dispatch(self, release: Callable[[], Ready]):
+        """Run handlers for whatever `release` (admit, release_expired, drain) hands back."""
+        if not self.reorder_window:
+            self._run(release())
+            return
+        # Releasing and running under one lock keeps concurrent requests from interleaving the order
+        with self._dispatch_lock:
+            self._run(release())
+
+    def _run(self, ready: Ready):
+        for event, data in ready:
+            for h in self.handlers(event):
+                _call_handler(h, event, data)
+
+    def emit(self, event: str, data: dict, sequence: Optional[int] = None):
+        self.dispatch(lambda: self.admit(event, data, sequence))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"duplicates": self.duplicates, "late": self.late, "buffered": len(self._pending)}
 
 
 class _Handler(BaseHTTPRequestHandler):
@@ -35,19 +209,18 @@ class _Handler(BaseHTTPRequestHandler):
 
         try:
             length = int(self.headers.get("Content-Length", "0"))
-            payload = json.loads(self.rfile.read(length) or b"{}")
-            event = payload.get("event")
-            data = payload.get("data") or {}
-            if not event:
-                raise ValueError("Missing 'event'")
+            events = decode_events(self.rfile.read(length),
+                                   self.headers.get("Content-Type", ""),
+                                   self.headers.get("Content-Encoding", ""))
         except Exception as e:
             self.send_response(400)
             self.end_headers()
             self.wfile.write(f"Bad payload: {e}".encode())
             return
 
-        # Dispatch
-        self.bus.emit(event, data)
+        # Dispatch, in the order the batch was sent
+        for envelope in events:
+            self.bus.emit(envelope["event"], envelope.get("data") or {}, envelope.get("sequence"))
 
         self.send_response(200)
         self.end_headers()
@@ -62,11 +235,22 @@ def _make_handler(bus: EventBus, path: str):
 
 
 class WebhookListener:
-    def __init__(self, *, host="0.0.0.0", port=8001, path="/market-event"):
+    """
+    Threaded webhook receiver. Redelivered events are skipped using the last
+    `dedup_size` sequences (kept in SQLite at `seen_path` if given, so they
+    survive restarts); see EventBus for `reorder_window` and `reorder_timeout`.
+    """
+
+    def __init__(self, *, host="0.0.0.0", port=8001, path="/market-event",
+                 dedup_size: int = 100_000, seen_path: Optional[str] = None,
+                 reorder_window: int = 0, reorder_timeout: float = 2.0):
         self.host, self.port, self.path = host, port, path
-        self.bus = EventBus()
+        seen = SqliteSeenSet(seen_path, dedup_size) if seen_path else SeenSet(dedup_size)
+        self.bus = EventBus(seen=seen, reorder_window=reorder_window, reorder_timeout=reorder_timeout)
         self._server = None
         self._thread = None
+        self._ticker = None
+        self._stopping = threading.Event()
         self._handler_instance: Optional[MarketEventHandler] = None
 
     def set_handler(self, handler: 'MarketEventHandler'):
@@ -86,8 +270,16 @@ class WebhookListener:
         self._server = ThreadingHTTPServer((self.host, self.port), Handler)
         self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
         self._thread.start()
+        if self.bus.reorder_window:
+            self._stopping.clear()
+            self._ticker = threading.Thread(target=self._release_expired, daemon=True)
+            self._ticker.start()
         print(f"Listening on http://{self.host}:{self.port}{self.path}")
 
+    def _release_expired(self):
+        while not self._stopping.wait(self.bus.reorder_timeout / 4):
+            self.bus.dispatch(self.bus.release_expired)
+
     def stop(self):
         if not self._server: return
         self._server.shutdown()
@@ -96,6 +288,206 @@ class WebhookListener:
         if self._thread:
             self._thread.join(timeout=2)
             self._thread = None
+        if self._ticker:
+            self._stopping.set()
+            self._ticker.join(timeout=2)
+            self._ticker = None
+        self.bus.dispatch(self.bus.drain)
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 411: "Length Required",
+            413: "Payload Too Large", 429: "Too Many Requests"}
+
+
+class AsyncWebhookListener(WebhookListener):
+    """
+    asyncio variant of WebhookListener that acknowledges before processing.
+
+    A POST is answered as soon as its events are on a bounded queue, and
+    `workers` tasks drain the queue, running handlers on a thread pool (or
+    a process pool with `executor="process"`, in which case handlers and
+    event data must be picklable). Handlers for different events run
+    concurrently, so use `workers=1` when `reorder_window` ordering must
+    carry through to the handlers. When the queue holds `queue_size` events, further POSTs
+    get 429 with `Retry-After: retry_after` so the sender backs off instead
+    of timing out.
+    """
+
+    def __init__(self, *, host="0.0.0.0", port=8001, path="/market-event",
+                 queue_size: int = 1000, workers: int = 4, executor: Union[str, Executor] = "thread",
+                 retry_after: float = 1, max_body_bytes: int = 64 * 1024 * 1024,
+                 dedup_size: int = 100_000, seen_path: Optional[str] = None,
+                 reorder_window: int = 0, reorder_timeout: float = 2.0):
+        super().__init__(host=host, port=port, path=path, dedup_size=dedup_size, seen_path=seen_path,
+                         reorder_window=reorder_window, reorder_timeout=reorder_timeout)
+        self.queue_size = max(1, queue_size)
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.retry_after = retry_after
+        self.max_body_bytes = max_body_bytes
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[Executor] = None
+        self._tasks: List[asyncio.Task] = []
+        self._connections: set = set()
+
+    def start(self):
+        ready = threading.Event()
+        failure: List[BaseException] = []
+        self._loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self._open())
+            except BaseException as e:
+                failure.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            self._loop.close()
+            self._loop = None
+            raise failure[0]
+        print(f"Listening on http://{self.host}:{self.port}{self.path} (asyncio, {self.workers} workers)")
+
+    async def _open(self):
+        if isinstance(self.executor, Executor):
+            self._pool = self.executor
+        elif self.executor == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="webhook-handler")
+        # Bounded by hand in _accept, so an oversized batch still fits an empty queue
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.bus.reorder_window:
+            self._tasks.append(asyncio.create_task(self._release_expired_async()))
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            event, data = await self._queue.get()
+            try:
+                for h in self.bus.handlers(event):
+                    await loop.run_in_executor(self._pool, _call_handler, h, event, data)
+                self.processed += 1
+            finally:
+                self._queue.task_done()
+
+    async def _release_expired_async(self):
+        while True:
+            await asyncio.sleep(self.bus.reorder_timeout / 4)
+            self._enqueue(self.bus.release_expired())
+
+    def _enqueue(self, ready: Ready):
+        for item in ready:
+            self._queue.put_nowait(item)
+
+    def _accept(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        if method != "POST" or target != self.path:
+            return 404, {}, b""
+        try:
+            events = decode_events(body, headers.get("content-type", ""), headers.get("content-encoding", ""))
+        except Exception as e:
+            return 400, {}, f"Bad payload: {e}".encode()
+
+        queued = self._queue.qsize()
+        if queued and queued + len(events) > self.queue_size:
+            self.rejected += 1
+            return 429, {"Retry-After": f"{self.retry_after:g}"}, b"Busy"
+
+        # Replays are dropped and reordering smoothed before anything is queued
+        for envelope in events:
+            self._enqueue(self.bus.admit(envelope["event"], envelope.get("data") or {}, envelope.get("sequence")))
+        self.accepted += len(events)
+        return 200, {}, b"OK"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, version = (request_line.split(" ", 2) + ["", ""])[:3]
+                headers = {}
+                for line in header_lines:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                length = int(headers.get("content-length", "0") or 0)
+                if "transfer-encoding" in headers:
+                    status, extra, text, keep_alive = 411, {}, b"", False
+                elif length > self.max_body_bytes:
+                    status, extra, text, keep_alive = 413, {}, b"", False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, extra, text = self._accept(method, target, headers, body)
+
+                lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                         f"Content-Length: {len(text)}",
+                         f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                lines += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + text)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+        }
+
+    async def _close(self, drain_timeout: float):
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        self._enqueue(self.bus.drain())
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self, drain_timeout: float = 5):
+        """Stop accepting, give queued events up to `drain_timeout` seconds to finish, then shut down."""
+        if not self._loop: return
+        asyncio.run_coroutine_threadsafe(self._close(drain_timeout), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._loop.close()
+        self._loop = None
+        self._server = None
+        if self._pool is not None and self._pool is not self.executor:
+            self._pool.shutdown(wait=True)
+        self._pool = None
 
 
 class MarketEventHandler(ABC):
@@ -150,22 +542,30 @@ class MarketEventHandler(ABC):
     @abstractmethod
     def on_payout_logs(self, data: dict) -> None:
         """
-        Called when payout logs are received.
+        Called for each chunk of payout logs received.
+
+        Large resolutions arrive as several deliveries sharing a `batch_id`,
+        numbered by `sequence`; the final one has `last` set.
 
         Args:
-            data: Dictionary containing payout information as a list
+            data: Dictionary containing one chunk of payout information
 
         Expected data structure:
-        [
-            {
-                "user_name": "alice",
-                "market": "Will it rain tomorrow?",
-                "token": "YES",
-                "shares_paid": Decimal("100.50"),
-                "is_winner": True,
-                "timestamp": datetime(2024, 1, 1, 12, 0, 0)
-            },
-            ...
-        ]
+        {
+            "payout_logs": [
+                {
+                    "user_name": "alice",
+                    "market": "Will it rain tomorrow?",
+                    "token": "YES",
+                    "shares_paid": Decimal("100.50"),
+                    "is_winner": True,
+                    "timestamp": datetime(2024, 1, 1, 12, 0, 0)
+                },
+                ...
+            ],
+            "batch_id": "3f2c...",
+            "sequence": 0,
+            "last": True
+        }
         """
         pass
\ No newline at end of file
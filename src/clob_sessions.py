@@ -0,0 +1,76 @@
+import asyncio
+import os
+import threading
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+clob_pool_size = int(os.getenv("CLOB_POOL_SIZE", "20"))
+clob_keepalive_expiry = float(os.getenv("CLOB_KEEPALIVE_EXPIRY", "30"))
+clob_timeout = float(os.getenv("CLOB_TIMEOUT", "5"))
+clob_connect_timeout = float(os.getenv("CLOB_CONNECT_TIMEOUT", "3"))
+
+
+_clients: dict[str, httpx.Client] = {}
+_async_clients: dict[tuple[str, int], httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=clob_pool_size,
+        max_keepalive_connections=clob_pool_size,
+        keepalive_expiry=clob_keepalive_expiry,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(clob_timeout, connect=clob_connect_timeout)
+
+
+def get_clob_client(host: str) -> httpx.Client:
+    """
+    Return the process-wide keep-alive client for `host`, creating it on first use.
+    """
+    client = _clients.get(host)
+    if client is not None and not client.is_closed:
+        return client
+
+    with _lock:
+        client = _clients.get(host)
+        if client is None or client.is_closed:
+            client = httpx.Client(base_url=host, limits=_limits(), timeout=_timeout())
+            _clients[host] = client
+        return client
+
+
+def close_clob_clients() -> None:
+    """Close every pooled CLOB client. Safe to call more than once."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def get_async_clob_client(host: str) -> httpx.AsyncClient:
+    """
+    Return the keep-alive async client for `host` on the running event loop.
+    Async clients can't be shared across loops, so they are keyed by loop as well.
+    """
+    key = (host, id(asyncio.get_running_loop()))
+    client = _async_clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(base_url=host, limits=_limits(), timeout=_timeout())
+        _async_clients[key] = client
+    return client
+
+
+async def aclose_clob_clients() -> None:
+    """Close the async CLOB clients owned by the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _async_clients if k[1] == loop_id]:
+        await _async_clients.pop(key).aclose()
@@ -1,40 +1,536 @@
+import gzip
+import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 from enum import Enum
+from uuid import UUID
 
 import httpx
-from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
+from pydantic import BaseModel
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from src.models.event_outbox import EventOutbox
+from src.models.webhook_dead_letter import WebhookDeadLetter
+from src.models.webhook_subscription import WebhookSubscription
+from src.sessions import get_session_context
+
+try:
+    import msgpack
+except ImportError:  # only needed by subscribers using the msgpack encoding
+    msgpack = None
 
 
 load_dotenv()
 
 subscriber_url = os.getenv("SUBSCRIBER_URL", "http://localhost:8001/market_event")
+# JSON list of {"name", "url", "events"?, "concurrency"?, "queue_size"?, "timeout"?,
+# "encoding"?, "max_batch_events"?}; when unset, SUBSCRIBER_URL is the only subscriber
+subscribers_config = os.getenv("WEBHOOK_SUBSCRIBERS", "").strip()
+webhook_concurrency = max(1, int(os.getenv("WEBHOOK_CONCURRENCY", "1")))
+# "json": one event per POST; "ndjson": gzip-compressed NDJSON batches; "msgpack": msgpack batches
+webhook_encoding = os.getenv("WEBHOOK_ENCODING", "json").strip().lower()
+webhook_max_batch_events = max(1, int(os.getenv("WEBHOOK_MAX_BATCH_EVENTS", "100")))
+webhook_gzip_level = int(os.getenv("WEBHOOK_GZIP_LEVEL", "5"))
+payout_emit_chunk_size = max(1, int(os.getenv("PAYOUT_EMIT_CHUNK_SIZE", "500")))
+webhook_timeout = float(os.getenv("WEBHOOK_TIMEOUT", "5"))
+outbox_poll_seconds = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+webhook_queue_size = max(1, int(os.getenv("WEBHOOK_QUEUE_SIZE", "100")))
+outbox_backoff_base = float(os.getenv("OUTBOX_BACKOFF_BASE", "1"))
+outbox_backoff_max = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+outbox_retention_hours = float(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+# Attempts before events a subscriber rejects with a non-retryable 4xx are dead-lettered
+outbox_max_attempts = max(1, int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5")))
 
 logger = logging.getLogger(__name__)
 
 class MarketEventType(Enum):
     MARKET_ADDED = "market_added"   # JSON payload list of {"condition_id": str, "question": str, "description": str, "tokens": list[str]}
     MARKET_RESOLVED = "market_resolved"   # JSON payload list of {"condition_id": str, "winning_token": str}
-    PAYOUT_LOGS = "payout_logs"  # JSON payload list of {"user_name": str, "market": str, "token": str, "shares_paid": Decimal, "is_winner": bool, "timestamp": datetime}
+    PAYOUT_LOGS = "payout_logs"  # JSON payload list of {"user_name": str, "market": str, "token": str, "shares_paid": Decimal, "is_winner": bool, "timestamp": datetime}, sent in chunks with "batch_id", "sequence" and "last"
+    RESOLUTION_SUMMARY = "resolution_summary"  # JSON payload list of {"condition_id": str, "winning_token_ids": list[str], "positions": int, "winners": int, "shares_paid": Decimal}
+
+
+ENCODINGS = ("json", "ndjson", "msgpack")
+
+
+def _json_default(value):
+    # Only called for values json can't serialize natively, so plain
+    # dicts/lists/strings/numbers never pay for a type walk
+    if isinstance(value, Decimal):
+        return str(value)  # money-safe string
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_data(data: dict) -> str:
+    return json.dumps(data, default=_json_default, separators=(",", ":"), ensure_ascii=False)
 
 
+def _envelope(sequence: int, event: str, payload: str) -> str:
+    # `payload` is already JSON, so it is spliced in rather than re-encoded
+    return f'{{"event":{json.dumps(event)},"sequence":{sequence},"data":{payload}}}'
 
 
-def emit_market_event(event_type: str, data: dict):
-    payload = {"event": event_type, "data": data}
-    json_payload = jsonable_encoder(
-        payload,
-        custom_encoder={
-            Decimal: lambda v: str(v),  # money-safe string
-        },
-    )
+def enqueue_market_event(db: Session, event_type: str, data: dict) -> EventOutbox:
+    """
+    Stage an event in the outbox on `db`. Nothing is sent until the caller
+    commits, so an event commits or rolls back with the changes it describes.
+    """
+    row = EventOutbox(event=event_type, payload=_encode_data(data))
+    db.add(row)
+    return row
+
+
+def _aware(dt: datetime) -> datetime:
+    # SQLite hands datetimes back naive; they are stored as UTC
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(outbox_backoff_max, outbox_backoff_base * 2 ** (attempts - 1)))
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    # Only the delay-seconds form; an HTTP-date falls back to our own backoff
     try:
-        resp = httpx.post(subscriber_url, json=json_payload, timeout=2)
-        resp.raise_for_status()
-        logger.debug(f"Emitted {event_type} to {subscriber_url}")
-    except Exception as e:
-        logger.warning(f"Failed to emit {event_type} to {subscriber_url}: {e}")
+        return max(0.0, float(resp.headers["Retry-After"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _retryable(status_code: int | None) -> bool:
+    # Transport errors, 5xx, 408 and 429 may pass on a retry; any other 4xx is about the request itself
+    return status_code is None or not 400 <= status_code < 500 or status_code in (408, 429)
+
+
+class Delivery:
+    """
+    Outcome of one batch sent to one subscriber. `rejected_upto` is set when
+    the first failed POST got a non-retryable 4xx: the last sequence it carried.
+    """
+    __slots__ = ("last_sequence", "delivered", "error", "retry_after", "rejected_upto")
+
+    def __init__(self, last_sequence: int, delivered: int, error: str | None, retry_after: float | None = None,
+                 rejected_upto: int | None = None):
+        self.last_sequence = last_sequence
+        self.delivered = delivered
+        self.error = error
+        self.retry_after = retry_after
+        self.rejected_upto = rejected_upto
+
+
+_SKIPPED = ("skipped", None)
+
+
+class Subscriber:
+    """
+    One webhook consumer: where its events go, which event types it wants
+    (`events=None` means all), how many POSTs may be in flight at once and
+    how many pending events are handed to it per batch.
+
+    `encoding` picks the wire format: "json" sends one event per POST,
+    "ndjson" (gzip-compressed) and "msgpack" send up to `max_batch_events`
+    events per POST.
+
+    With `concurrency` above 1 events can arrive out of order; every event
+    carries its `sequence` so the consumer can reorder and de-duplicate.
+    """
+
+    def __init__(self,
+                 name: str,
+                 url: str,
+                 events: list[str] | None = None,
+                 concurrency: int = webhook_concurrency,
+                 queue_size: int = webhook_queue_size,
+                 timeout: float = webhook_timeout,
+                 encoding: str = webhook_encoding,
+                 max_batch_events: int = webhook_max_batch_events):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Webhook subscriber {name} has unknown encoding {encoding!r}; expected one of {ENCODINGS}")
+        if encoding == "msgpack" and msgpack is None:
+            raise ValueError(f"Webhook subscriber {name} uses the msgpack encoding but msgpack is not installed")
+        self.name = name
+        self.url = url
+        self.events = frozenset(events) if events else None
+        self.concurrency = max(1, int(concurrency))
+        self.queue_size = max(1, int(queue_size))
+        self.timeout = float(timeout)
+        self.encoding = encoding
+        self.max_batch_events = max(1, int(max_batch_events))
+        self._client: httpx.Client | None = None
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _resources(self) -> tuple[httpx.Client, ThreadPoolExecutor]:
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.concurrency,
+                                        max_keepalive_connections=self.concurrency),
+                )
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                thread_name_prefix=f"webhook-{self.name}")
+            return self._client, self._pool
+
+    def _requests(self, batch: list[tuple[int, str, str]]) -> list[tuple[int, int, bytes, dict]]:
+        """Split a batch into (last_sequence, events, body, headers) POSTs in this subscriber's encoding."""
+        if self.encoding == "json":
+            headers = {"Content-Type": "application/json"}
+            return [(row[0], 1, _envelope(*row).encode(), headers) for row in batch]
+
+        requests = []
+        for i in range(0, len(batch), self.max_batch_events):
+            chunk = batch[i:i + self.max_batch_events]
+            if self.encoding == "ndjson":
+                lines = "".join(_envelope(*row) + "\n" for row in chunk)
+                body = gzip.compress(lines.encode(), compresslevel=webhook_gzip_level)
+                headers = {"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+            else:
+                body = msgpack.packb([
+                    {"event": event, "sequence": sequence, "data": json.loads(payload)}
+                    for sequence, event, payload in chunk
+                ])
+                headers = {"Content-Type": "application/msgpack"}
+            requests.append((chunk[-1][0], len(chunk), body, headers))
+        return requests
+
+    def deliver(self, batch: list[tuple[int, str, str]], caught_up: int) -> Delivery:
+        """
+        POST a batch of (sequence, event, payload) rows, at most `concurrency`
+        requests at a time. The subscriber's offset advances over the
+        acknowledged prefix of the batch, or to `caught_up` when every POST
+        succeeded; anything acknowledged after the first failure is sent
+        again later. A 429 with Retry-After sets when to try again.
+        """
+        client, pool = self._resources()
+        failed = threading.Event()
+        retry_after: list[float] = []
+
+        def post(request: tuple[int, int, bytes, dict]) -> tuple[str, int | None] | None:
+            _, _, body, headers = request
+            if failed.is_set():
+                return _SKIPPED
+            try:
+                resp = client.post(self.url, content=body, headers=headers)
+                if resp.status_code == 429 and (delay := _retry_after(resp)) is not None:
+                    retry_after.append(delay)
+                resp.raise_for_status()
+                return None
+            except httpx.HTTPStatusError as e:
+                failed.set()
+                return str(e)[:500], e.response.status_code
+            except Exception as e:
+                failed.set()
+                return str(e)[:500] or type(e).__name__, None
+
+        requests = self._requests(batch)
+        results = list(pool.map(post, requests))
+
+        last_sequence, delivered, rejected_upto = 0, 0, None
+        for (sequence, events, _, _), failure in zip(requests, results):
+            if failure is not None:
+                if failure is not _SKIPPED and not _retryable(failure[1]):
+                    rejected_upto = sequence
+                break
+            last_sequence, delivered = sequence, delivered + events
+        if delivered == len(batch):
+            return Delivery(max(caught_up, last_sequence), delivered, None)
+        error = next(f[0] for f in results if f is not None and f is not _SKIPPED)
+        return Delivery(last_sequence, delivered, error, max(retry_after, default=None), rejected_upto)
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        if client is not None:
+            client.close()
+
+
+def load_subscribers(raw: str = subscribers_config) -> list[Subscriber]:
+    """Build the subscriber registry from WEBHOOK_SUBSCRIBERS, or fall back to SUBSCRIBER_URL."""
+    if not raw:
+        return [Subscriber("default", subscriber_url)]
+
+    known_events = {e.value for e in MarketEventType}
+    subscribers: list[Subscriber] = []
+    for entry in json.loads(raw):
+        if not entry.get("name") or not entry.get("url"):
+            raise ValueError(f"Webhook subscriber needs a name and a url: {entry}")
+        unknown = set(entry.get("events") or []) - known_events
+        if unknown:
+            raise ValueError(f"Webhook subscriber {entry['name']} filters on unknown events: {sorted(unknown)}")
+        subscribers.append(Subscriber(
+            entry["name"],
+            entry["url"],
+            events=entry.get("events"),
+            concurrency=entry.get("concurrency", webhook_concurrency),
+            queue_size=entry.get("queue_size", webhook_queue_size),
+            timeout=entry.get("timeout", webhook_timeout),
+            encoding=entry.get("encoding", webhook_encoding),
+            max_batch_events=entry.get("max_batch_events", webhook_max_batch_events),
+        ))
+
+    names = [s.name for s in subscribers]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate webhook subscriber names: {names}")
+    return subscribers
+
+
+class OutboxDispatcher:
+    """
+    Fans outbox events out to every subscriber.
+
+    Each subscriber keeps its own offset into the outbox and is handed at most
+    `queue_size` pending events at a time. Batches for different subscribers
+    are sent concurrently, and a batch that is still in flight when a round
+    ends simply carries over to the next round, so a slow or failing
+    subscriber never holds the others back. All database work happens on the
+    caller's session; worker threads only do HTTP.
+    """
+
+    def __init__(self, subscribers: list[Subscriber]):
+        self.subscribers = subscribers
+        self._inflight: dict[str, tuple[Future, int]] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _states(self, db: Session) -> dict[str, WebhookSubscription]:
+        names = [s.name for s in self.subscribers]
+        states = {s.name: s for s in db.exec(
+            select(WebhookSubscription).where(WebhookSubscription.name.in_(names))
+        ).all()}
+        for name in names:
+            if name not in states:
+                states[name] = WebhookSubscription(name=name)
+                db.add(states[name])
+        return states
+
+    def dispatch(self, db: Session, budget: float | None = None) -> int:
+        """
+        Run one dispatch round: record finished batches, hand new batches to
+        idle subscribers whose retry time has come, and keep doing so for up
+        to `budget` seconds (default: the poll interval) while any batch is in
+        flight. Returns the number of events acknowledged during the round.
+        """
+        deadline = time.monotonic() + (outbox_poll_seconds if budget is None else budget)
+        delivered = 0
+        while True:
+            delivered += self._collect(db)
+            self._fill(db)
+            remaining = deadline - time.monotonic()
+            with self._lock:
+                pending = [f for f, _ in self._inflight.values()]
+            if not pending or remaining <= 0:
+                break
+            wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        self._purge(db)
+        return delivered
+
+    def _collect(self, db: Session) -> int:
+        with self._lock:
+            done = {name: f for name, (f, _) in self._inflight.items() if f.done()}
+            for name in done:
+                del self._inflight[name]
+        if not done:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        states = self._states(db)
+        delivered = 0
+        for name, future in done.items():
+            state = states[name]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = Delivery(0, 0, str(e)[:500])
+
+            state.last_sequence = max(state.last_sequence, result.last_sequence)
+            if result.delivered:
+                state.delivered += result.delivered
+                state.last_delivered_at = now
+                delivered += result.delivered
+            if result.error is None:
+                state.attempts = 0
+                state.last_error = None
+                state.next_attempt_at = now
+            elif result.rejected_upto is not None and state.attempts + 1 >= outbox_max_attempts:
+                # Rejected as malformed every time: park the events so the ones after them can go out
+                state.failed += 1
+                state.last_error = result.error
+                dead = self._dead_letter(db, name, state.last_sequence, result.rejected_upto, result.error)
+                state.last_sequence = result.rejected_upto
+                state.attempts = 0
+                state.next_attempt_at = now
+                logger.error(
+                    f"Subscriber {name} rejected events up to #{result.rejected_upto} "
+                    f"{outbox_max_attempts} times; dead-lettered {dead}: {result.error}"
+                )
+            else:
+                state.attempts += 1
+                state.failed += 1
+                state.last_error = result.error
+                if result.retry_after is not None:
+                    # The subscriber is shedding load; come back when it asked us to
+                    state.next_attempt_at = now + timedelta(seconds=min(outbox_backoff_max, result.retry_after))
+                else:
+                    state.next_attempt_at = now + _backoff(state.attempts)
+                logger.warning(
+                    f"Failed to deliver events after #{state.last_sequence} to subscriber {name} "
+                    f"(attempt {state.attempts}): {result.error}"
+                )
+            db.add(state)
+        db.commit()
+        return delivered
+
+    def _dead_letter(self, db: Session, name: str, after: int, upto: int, error: str) -> int:
+        """Copy the events `name` wants in (after, upto] to webhook_dead_letters; returns how many."""
+        sub = next(s for s in self.subscribers if s.name == name)
+        stmt = (select(EventOutbox.id, EventOutbox.event, EventOutbox.payload)
+                .where(EventOutbox.id > after, EventOutbox.id <= upto)
+                .order_by(EventOutbox.id))
+        if sub.events is not None:
+            stmt = stmt.where(EventOutbox.event.in_(sub.events))
+        rows = db.exec(stmt).all()
+        db.add_all([WebhookDeadLetter(subscriber=name, sequence=sequence, event=event, payload=payload, error=error)
+                    for sequence, event, payload in rows])
+        return len(rows)
+
+    def _fill(self, db: Session) -> None:
+        states = self._states(db)
+        now = datetime.now(timezone.utc)
+        head = db.exec(select(func.max(EventOutbox.id))).one() or 0
+
+        for sub in self.subscribers:
+            state = states[sub.name]
+            with self._lock:
+                busy = sub.name in self._inflight
+            if busy or _aware(state.next_attempt_at) > now or state.last_sequence >= head:
+                continue
+
+            stmt = (select(EventOutbox.id, EventOutbox.event, EventOutbox.payload)
+                    .where(EventOutbox.id > state.last_sequence)
+                    .order_by(EventOutbox.id)
+                    .limit(sub.queue_size))
+            if sub.events is not None:
+                stmt = stmt.where(EventOutbox.event.in_(sub.events))
+            batch = [tuple(row) for row in db.exec(stmt).all()]
+
+            # A short batch means everything up to `head` has been seen
+            caught_up = head if len(batch) < sub.queue_size else batch[-1][0]
+            if not batch:
+                # Nothing this subscriber wants; skip past it
+                state.last_sequence = caught_up
+                db.add(state)
+                continue
+
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.subscribers)),
+                                                        thread_name_prefix="webhook-dispatch")
+                future = self._executor.submit(sub.deliver, batch, caught_up)
+                self._inflight[sub.name] = (future, len(batch))
+        db.commit()
+
+    def _purge(self, db: Session) -> None:
+        # Events every subscriber is past are only kept around for inspection
+        states = self._states(db)
+        done_upto = min((s.last_sequence for s in states.values()), default=0)
+        db.exec(delete(EventOutbox).where(
+            EventOutbox.id <= done_upto,
+            EventOutbox.created_at < datetime.now(timezone.utc) - timedelta(hours=outbox_retention_hours),
+        ))
+        db.commit()
+
+    def stats(self, db: Session) -> list[dict]:
+        """Per-subscriber offset, lag, in-flight and failure metrics."""
+        now = datetime.now(timezone.utc)
+        head = db.exec(select(func.max(EventOutbox.id))).one() or 0
+        states = {s.name: s for s in db.exec(select(WebhookSubscription)).all()}
+        dead_letters = dict(db.exec(
+            select(WebhookDeadLetter.subscriber, func.count()).group_by(WebhookDeadLetter.subscriber)
+        ).all())
+        with self._lock:
+            inflight = {name: size for name, (_, size) in self._inflight.items()}
+
+        out = []
+        for sub in self.subscribers:
+            state = states.get(sub.name) or WebhookSubscription(name=sub.name)
+            pending = select(EventOutbox.id, EventOutbox.created_at).where(EventOutbox.id > state.last_sequence)
+            if sub.events is not None:
+                pending = pending.where(EventOutbox.event.in_(sub.events))
+            lag = db.exec(select(func.count()).select_from(pending.subquery())).one()
+            oldest = db.exec(pending.order_by(EventOutbox.id).limit(1)).first()
+            out.append({
+                "name": sub.name,
+                "url": sub.url,
+                "events": sorted(sub.events) if sub.events is not None else None,
+                "encoding": sub.encoding,
+                "concurrency": sub.concurrency,
+                "queue_size": sub.queue_size,
+                "last_sequence": state.last_sequence,
+                "head_sequence": head,
+                "lag": lag,
+                "lag_seconds": (now - _aware(oldest.created_at)).total_seconds() if oldest else 0.0,
+                "in_flight": inflight.get(sub.name, 0),
+                "delivered": state.delivered,
+                "failed": state.failed,
+                "dead_lettered": dead_letters.get(sub.name, 0),
+                "consecutive_failures": state.attempts,
+                "last_error": state.last_error,
+                "next_attempt_at": state.next_attempt_at,
+                "last_delivered_at": state.last_delivered_at,
+            })
+        return out
+
+    def close(self) -> None:
+        """Wait for in-flight batches and release every connection. Safe to call more than once."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        for sub in self.subscribers:
+            sub.close()
+
+
+subscribers = load_subscribers()
+outbox_dispatcher = OutboxDispatcher(subscribers)
+
+
+def dispatch_outbox(db: Session, budget: float | None = None) -> int:
+    """Deliver pending outbox events to every registered subscriber."""
+    return outbox_dispatcher.dispatch(db, budget)
+
+
+def close_webhook_clients() -> None:
+    """Shut down the dispatcher's workers and subscriber connections."""
+    outbox_dispatcher.close()
 
 
+def run_outbox_dispatch():
+    """Entry point for the background outbox dispatcher job."""
+    with get_session_context() as session:
+        try:
+            dispatch_outbox(session)
+        except Exception as e:
+            session.rollback()
+            logger.exception(f"Outbox dispatch failed: {e}")
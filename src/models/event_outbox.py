@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+from pydantic import ConfigDict
+from sqlmodel import SQLModel, Field
+
+
+class EventOutboxBase(SQLModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class EventOutbox(EventOutboxBase, table=True):
+    __tablename__ = "event_outbox"
+    # Never hand out an id again once purged, or subscribers past it would skip new events
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    # Monotonic id doubles as the delivery sequence number; each subscriber
+    # tracks its own progress through it in webhook_subscriptions
+    id: int | None = Field(primary_key=True)
+    event: str = Field(nullable=False)
+    payload: str = Field(nullable=False)  # JSON-encoded event data
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from enum import Enum
 
 from pydantic import ConfigDict
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 class MarketChangeType(str, Enum):
@@ -15,6 +16,10 @@ class MarketChangeLogBase(SQLModel):
 class MarketChangeLog(MarketChangeLogBase, table=True):
     __tablename__ = "market_change_logs"
 
+    __table_args__ = (
+        Index("ix_market_change_logs_condition_id_timestamp", "condition_id", "timestamp"),
+    )
+
     id: int | None = Field(primary_key=True)
     condition_id: str
     change_type: MarketChangeType
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+MICROS_PER_UNIT = 1_000_000
+
+
+def to_micros(value: Decimal | int | str) -> int:
+    """Whole millionths in `value`, truncated toward zero."""
+    return int(Decimal(value) * MICROS_PER_UNIT)
+
+
+def from_micros(micros: int, places: int = 2) -> Decimal:
+    """
+    `micros` millionths as a Decimal with at least `places` decimal places,
+    e.g. 900_000_000 -> 900.00 and 523_000 -> 0.523.
+    """
+    whole, rest = divmod(micros, 10 ** (6 - places))
+    if rest:
+        return Decimal(micros).scaleb(-6).normalize()
+    return Decimal(whole).scaleb(-places)
+
+
+class Micros(TypeDecorator):
+    """
+    Money and share amounts stored as a BIGINT count of millionths (micro-USDC,
+    micro-shares) and read back as Decimal.
+
+    SQLite has no decimal type: NUMERIC columns keep binary floats, so SUMs
+    and comparisons in SQL drift. Integers keep them exact and cheap, and
+    since a winning share pays out one USDC, micro-shares and micro-USDC add
+    up directly in SQL. Anything finer than a millionth is truncated.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def __init__(self, places: int = 2):
+        super().__init__()
+        self.places = places
+
+    @property
+    def python_type(self):
+        return Decimal
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return to_micros(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return from_micros(int(value), self.places)
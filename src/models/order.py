@@ -4,9 +4,11 @@ from enum import Enum
 from typing import Annotated, TYPE_CHECKING
 
 from pydantic import ConfigDict
-from sqlalchemy import ForeignKeyConstraint, CheckConstraint
+from sqlalchemy import ForeignKeyConstraint, CheckConstraint, Index
 from sqlmodel import SQLModel, Field, Relationship
 
+from src.models.micros import Micros
+
 if TYPE_CHECKING:
     from src.models.order_fill import OrderFill
 
@@ -45,6 +47,16 @@ class Order(OrderBase, table=True):
             "amount_usdc >= 0",
             name="_amount_usdc_non_negative"
         ),
+        CheckConstraint(
+            "filled_shares >= 0",
+            name="_order_filled_shares_non_negative"
+        ),
+        CheckConstraint(
+            "reserved_usdc >= 0",
+            name="_order_reserved_usdc_non_negative"
+        ),
+        Index("ix_orders_user_name_created_at", "user_name", "created_at"),
+        Index("ix_orders_order_type_status", "order_type", "status"),
     )
 
     order_id: int | None = Field(primary_key=True)
@@ -57,11 +69,30 @@ class Order(OrderBase, table=True):
     amount_usdc: Annotated[Decimal, Field(ge=0,
                                      max_digits=14,
                                      decimal_places=2,
+                                     sa_type=Micros(2),
                                      nullable=False)] = Decimal('0')
     shares: Annotated[Decimal, Field(ge=0,
                                      max_digits=14,
                                      decimal_places=2,
+                                     sa_type=Micros(2),
                                      nullable=False)] = Decimal('0')
+    # LIMIT orders: `shares` is the order size, `amount_usdc` what has traded so far
+    limit_price: Annotated[Decimal | None, Field(gt=0,
+                                                 max_digits=6,
+                                                 decimal_places=4,
+                                                 sa_type=Micros(4),
+                                                 nullable=True)] = None
+    filled_shares: Annotated[Decimal, Field(ge=0,
+                                            max_digits=14,
+                                            decimal_places=2,
+                                            sa_type=Micros(2),
+                                            nullable=False)] = Decimal('0')
+    # USDC still held back from the balance for an open LIMIT buy
+    reserved_usdc: Annotated[Decimal, Field(ge=0,
+                                            max_digits=14,
+                                            decimal_places=2,
+                                            sa_type=Micros(2),
+                                            nullable=False)] = Decimal('0')
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     fills: list["OrderFill"] | None = Relationship(back_populates="order_obj")
@@ -87,7 +118,55 @@ class OrderSellCreate(OrderBase):
                                 decimal_places=2,
                                 nullable=False)] = Decimal('0')
 
+class OrderLimitCreate(OrderBase):
+    user_name: str
+    market: str
+    token: str
+    side: OrderSide
+    limit_price: Annotated[Decimal, Field(gt=0,
+                                          le=1,
+                                          max_digits=6,
+                                          decimal_places=4)]
+    shares: Annotated[Decimal, Field(gt=0,
+                                     max_digits=14,
+                                     decimal_places=2)]
+
+class OrderReplace(OrderBase):
+    # Either may be left out to keep the current value; `shares` is the new order size
+    limit_price: Annotated[Decimal | None, Field(gt=0,
+                                                 le=1,
+                                                 max_digits=6,
+                                                 decimal_places=4)] = None
+    shares: Annotated[Decimal | None, Field(gt=0,
+                                            max_digits=14,
+                                            decimal_places=2)] = None
+
+class OrderBatchItem(OrderBase):
+    user_name: str
+    market: str
+    token: str
+    side: OrderSide
+    # USDC to spend for BUY, shares to sell for SELL
+    amount_usdc: Annotated[Decimal | None, Field(ge=0,
+                                                 max_digits=14,
+                                                 decimal_places=2)] = None
+    shares: Annotated[Decimal | None, Field(ge=0,
+                                            max_digits=14,
+                                            decimal_places=2)] = None
+
+class OrderBatchCreate(OrderBase):
+    orders: list[OrderBatchItem] = Field(min_length=1, max_length=1000)
+
+class OrderQuoteRequest(OrderBase):
+    token: str
+    side: OrderSide
+    # USDC amounts for BUY, share counts for SELL
+    sizes: list[Annotated[Decimal, Field(ge=0,
+                                         max_digits=14,
+                                         decimal_places=2)]] = Field(min_length=1, max_length=1000)
+
 class OrderRead(OrderBase):
+    order_id: int
     user_name: str
     market: str
     token: str
@@ -96,5 +175,8 @@ class OrderRead(OrderBase):
     status: OrderStatus
     amount_usdc: Decimal = Field(ge=0, max_digits=14, decimal_places=2)
     shares: Decimal = Field(ge=0, max_digits=14, decimal_places=2)
+    limit_price: Decimal | None = None
+    filled_shares: Decimal = Decimal('0')
+    reserved_usdc: Decimal = Decimal('0')
     created_at: datetime
     updated_at: datetime
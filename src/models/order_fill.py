@@ -3,9 +3,11 @@ from datetime import datetime, timezone
 from typing import Annotated, TYPE_CHECKING, Optional
 
 from pydantic import ConfigDict
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, Index
 from sqlmodel import SQLModel, Field, Relationship
 
+from src.models.micros import Micros
+
 if TYPE_CHECKING:
     from src.models.order import Order
 
@@ -25,6 +27,7 @@ class OrderFill(OrderFillBase, table=True):
             "fill_price >= 0",
             name="_fill_price_non_negative"
         ),
+        Index("ix_order_fills_order_id", "order_id"),
     )
 
     fill_id: int | None = Field(primary_key=True)
@@ -32,10 +35,12 @@ class OrderFill(OrderFillBase, table=True):
     fill_price: Annotated[Decimal, Field(ge=0,
                                      max_digits=14,
                                      decimal_places=2,
+                                     sa_type=Micros(2),
                                      nullable=False)] = Decimal('0')
     fill_shares: Annotated[Decimal, Field(ge=0,
                                      max_digits=14,
                                      decimal_places=2,
+                                     sa_type=Micros(2),
                                      nullable=False)] = Decimal('0')
     filled_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     order_obj: Optional["Order"] = Relationship(back_populates="fills")
\ No newline at end of file
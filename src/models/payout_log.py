@@ -3,9 +3,11 @@ from decimal import Decimal
 from typing import Annotated
 
 from pydantic import ConfigDict
-from sqlalchemy import ForeignKeyConstraint
+from sqlalchemy import ForeignKeyConstraint, Index
 from sqlmodel import SQLModel, Field
 
+from src.models.micros import Micros
+
 
 class PayoutLogBase(SQLModel):
     model_config = ConfigDict(from_attributes=True)
@@ -19,6 +21,7 @@ class PayoutLog(PayoutLogBase, table=True):
             ["market", "token"],
             ["market_outcomes.market", "market_outcomes.token"]
         ),
+        Index("ix_payout_logs_market", "market"),
     )
 
     user_name: int = Field(foreign_key="users.name", primary_key=True)
@@ -27,6 +30,7 @@ class PayoutLog(PayoutLogBase, table=True):
     shares_paid: Annotated[Decimal, Field(ge=0,
                                       max_digits=14,
                                       decimal_places=2,
+                                      sa_type=Micros(2),
                                       nullable=False)]
     is_winner: bool = Field(nullable=True, default=False)
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -3,8 +3,11 @@ from decimal import Decimal
 from typing import Annotated
 
 from pydantic import ConfigDict
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
+from src.models.micros import Micros
+
 
 class ResetLogBase(SQLModel):
     model_config = ConfigDict(from_attributes=True)
@@ -13,10 +16,15 @@ class ResetLogBase(SQLModel):
 class ResetLog(ResetLogBase, table=True):
     __tablename__ = "reset_logs"
 
+    __table_args__ = (
+        Index("ix_reset_logs_user_name", "user_name"),
+    )
+
     id: int | None = Field( primary_key=True)
     user_name: str = Field(foreign_key="users.name")
     balance_reset: Annotated[Decimal, Field(ge=0,
                                             max_digits=14,
                                             decimal_places=2,
+                                            sa_type=Micros(2),
                                             nullable=False)]
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
\ No newline at end of file
@@ -5,6 +5,8 @@ from pydantic import ConfigDict
 from sqlmodel import SQLModel, Field
 from sqlalchemy import CheckConstraint
 
+from src.models.micros import Micros
+
 
 class UserBase(SQLModel):
     model_config = ConfigDict(from_attributes=True)
@@ -21,6 +23,7 @@ class User(UserBase, table=True):
     balance: Annotated[Decimal, Field(ge=0,
                                       max_digits=14,
                                       decimal_places=2,
+                                      sa_type=Micros(2),
                                       nullable=True)] = Decimal("10000.00")
 
 class UserCreate(UserBase):
@@ -2,9 +2,11 @@ from decimal import Decimal
 from typing import Annotated
 
 from pydantic import ConfigDict
-from sqlalchemy import CheckConstraint, ForeignKeyConstraint
+from sqlalchemy import CheckConstraint, ForeignKeyConstraint, Index
 from sqlmodel import SQLModel, Field
 
+from src.models.micros import Micros
+
 
 
 class UserPositionBase(SQLModel):
@@ -17,7 +19,8 @@ class UserPosition(UserPositionBase, table=True):
             ["market", "token"],
             ["market_outcomes.market", "market_outcomes.token"]
         ),
-        CheckConstraint('shares >= 0', name='_user_shares_non_negative')
+        CheckConstraint('shares >= 0', name='_user_shares_non_negative'),
+        Index("ix_user_positions_market_token", "market", "token"),
     )
 
     user_name: str = Field(foreign_key="users.name", primary_key=True)
@@ -26,6 +29,7 @@ class UserPosition(UserPositionBase, table=True):
     shares: Annotated[Decimal, Field(ge=0,
                                      max_digits=14,
                                      decimal_places=2,
+                                     sa_type=Micros(2),
                                      nullable=False)] = Decimal('0')
 
 
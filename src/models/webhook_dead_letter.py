@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+
+from pydantic import ConfigDict
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+class WebhookDeadLetterBase(SQLModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class WebhookDeadLetter(WebhookDeadLetterBase, table=True):
+    __tablename__ = "webhook_dead_letters"
+    __table_args__ = (
+        Index("ix_webhook_dead_letters_subscriber_sequence", "subscriber", "sequence"),
+    )
+
+    # An outbox event a subscriber kept rejecting with a non-retryable 4xx;
+    # it was skipped so later events could go out, and is kept here to replay
+    id: int | None = Field(primary_key=True)
+    subscriber: str = Field(nullable=False)
+    sequence: int = Field(nullable=False)  # the event's outbox id
+    event: str = Field(nullable=False)
+    payload: str = Field(nullable=False)  # JSON-encoded event data
+    error: str | None = Field(default=None, nullable=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+from pydantic import ConfigDict
+from sqlmodel import SQLModel, Field
+
+
+class WebhookSubscriptionBase(SQLModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class WebhookSubscription(WebhookSubscriptionBase, table=True):
+    __tablename__ = "webhook_subscriptions"
+
+    # Delivery state of one configured subscriber, keyed by its name
+    name: str = Field(primary_key=True)
+    last_sequence: int = Field(default=0, nullable=False)  # every outbox id <= this is done
+    attempts: int = Field(default=0, nullable=False)  # consecutive failed deliveries
+    last_error: str | None = Field(default=None, nullable=True)
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    delivered: int = Field(default=0, nullable=False)
+    failed: int = Field(default=0, nullable=False)
+    last_delivered_at: datetime | None = Field(default=None, nullable=True)
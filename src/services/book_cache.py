@@ -0,0 +1,203 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+Book = dict[str, list[dict[str, str]]]
+
+
+def _estimate_book_bytes(book: Book) -> int:
+    """Rough in-memory footprint of a {"bids": [...], "asks": [...]} book."""
+    total = sys.getsizeof(book)
+    for levels in book.values():
+        total += sys.getsizeof(levels)
+        for level in levels:
+            total += sys.getsizeof(level)
+            total += sum(sys.getsizeof(v) for v in level.values())
+    return total
+
+
+class _Entry:
+    __slots__ = ("book", "fetched_at", "size")
+
+    def __init__(self, book: Book, fetched_at: float, size: int):
+        self.book = book
+        self.fetched_at = fetched_at
+        self.size = size
+
+
+class _Flight:
+    __slots__ = ("done", "book", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.book: Book | None = None
+        self.error: BaseException | None = None
+
+
+class BookCache:
+    """
+    In-process order-book cache keyed by token id.
+
+    - Entries older than `max_staleness` seconds are refetched.
+    - Concurrent misses for the same token share one upstream fetch.
+    - Least recently used entries are evicted once `max_bytes` is exceeded.
+
+    Cached books are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_staleness: float, max_bytes: int):
+        self.max_staleness = max_staleness
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, _Flight] = {}
+        self._async_inflight: dict[tuple[int, str], asyncio.Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_fetch(self, token_id: str, fetch: Callable[[str], Book | None]) -> Book | None:
+        """
+        Return a fresh cached book for `token_id`, or fetch it with `fetch`.
+        A `None` result from `fetch` is passed through and never cached.
+        """
+        with self._lock:
+            entry = self._entries.get(token_id)
+            if entry is not None and self._is_fresh(entry):
+                self._entries.move_to_end(token_id)
+                self.hits += 1
+                return entry.book
+
+            flight = self._inflight.get(token_id)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._inflight[token_id] = flight
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.book
+
+        try:
+            flight.book = fetch(token_id)
+            if flight.book is not None:
+                self._store(token_id, flight.book)
+            return flight.book
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(token_id, None)
+            flight.done.set()
+
+    async def aget_or_fetch(self,
+                            token_id: str,
+                            fetch: Callable[[str], Awaitable[Book | None]]) -> Book | None:
+        """
+        Async counterpart of `get_or_fetch`: concurrent misses on the same
+        event loop await one `fetch` coroutine instead of blocking a thread.
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), token_id)
+        with self._lock:
+            entry = self._entries.get(token_id)
+            if entry is not None and self._is_fresh(entry):
+                self._entries.move_to_end(token_id)
+                self.hits += 1
+                return entry.book
+
+            flight = self._async_inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = loop.create_future()
+                self._async_inflight[key] = flight
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            return await asyncio.shield(flight)
+
+        try:
+            book = await fetch(token_id)
+            if book is not None:
+                self._store(token_id, book)
+            flight.set_result(book)
+            return book
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            with self._lock:
+                self._async_inflight.pop(key, None)
+
+    def invalidate(self, token_id: str | None = None) -> None:
+        """Drop one token's book, or every cached book when `token_id` is None."""
+        with self._lock:
+            if token_id is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(token_id, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_staleness": self.max_staleness,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+    def _is_fresh(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.fetched_at <= self.max_staleness
+
+    def _store(self, token_id: str, book: Book) -> None:
+        size = _estimate_book_bytes(book)
+        with self._lock:
+            old = self._entries.pop(token_id, None)
+            if old is not None:
+                self._bytes -= old.size
+            if size > self.max_bytes:
+                return
+            self._entries[token_id] = _Entry(book, time.monotonic(), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+
+book_cache = BookCache(
+    max_staleness=float(os.getenv("BOOK_CACHE_MAX_STALENESS_MS", "500")) / 1000,
+    max_bytes=int(os.getenv("BOOK_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
@@ -1,40 +1,133 @@
-from py_clob_client.client import ClobClient
+import base64
+import binascii
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
-class ClobService:
-    host = "https://clob.polymarket.com"
+from dotenv import load_dotenv
+from py_clob_client.endpoints import GET_MARKETS, GET_MARKET, GET_ORDER_BOOK, PRICE
 
-    @staticmethod
-    def get_clob_markets_accepting_orders() -> list[dict]:
-        """Fetch all CLOB markets and return those who accepts orders."""
-        open_client: ClobClient = ClobClient(host=ClobService.host)
-        start_cursor = "MA=="
-        end_cursor = "LTE="
+from src.clob_sessions import get_clob_client, get_async_clob_client
+from src.services.book_cache import book_cache
+
+load_dotenv()
+
+
+START_CURSOR = "MA=="
+END_CURSOR = "LTE="
+
+
+def _decode_cursor(cursor: str) -> int | None:
+    """CLOB cursors are base64-encoded offsets; return None if this one isn't."""
+    try:
+        return int(base64.b64decode(cursor, validate=True).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.b64encode(str(offset).encode()).decode()
 
-        all_markets = []
-        next_cursor = start_cursor
-        while next_cursor != end_cursor:
-            response = open_client.get_markets(next_cursor=next_cursor)
 
-            markets = response.get("data", [])
-            all_markets.extend(markets)
+class ClobService:
+    host = "https://clob.polymarket.com"
+    page_window = int(os.getenv("CLOB_PAGE_WINDOW", "4"))
+    page_timeout = float(os.getenv("CLOB_PAGE_TIMEOUT", "10"))
+    market_timeout = float(os.getenv("CLOB_MARKET_TIMEOUT", "5"))
 
-            next_cursor = response.get("next_cursor")
+    @staticmethod
+    def iter_clob_market_pages(window: int | None = None) -> Iterator[list[dict]]:
+        """
+        Yield every page of CLOB markets in cursor order.
+
+        Up to `window` page requests are kept in flight over the shared
+        pooled CLOB client: the next cursors are predicted from the current
+        offset and page size, and speculative requests are dropped whenever
+        the server returns a cursor that doesn't match the prediction.
+        """
+        window = max(1, window or ClobService.page_window)
+        http = get_clob_client(ClobService.host)
+
+        with ThreadPoolExecutor(max_workers=window, thread_name_prefix="clob-pages") as pool:
+
+            def fetch_page(cursor: str) -> dict:
+                response = http.get(GET_MARKETS,
+                                    params={"next_cursor": cursor},
+                                    timeout=ClobService.page_timeout)
+                response.raise_for_status()
+                return response.json()
+
+            page_size: int | None = None
+            pending: deque = deque()  # (cursor, future) in cursor order
+            next_to_schedule: str | None = START_CURSOR
+
+            try:
+                while True:
+                    while next_to_schedule is not None and len(pending) < window:
+                        pending.append((next_to_schedule, pool.submit(fetch_page, next_to_schedule)))
+                        offset = _decode_cursor(next_to_schedule)
+                        if page_size and offset is not None:
+                            next_to_schedule = _encode_cursor(offset + page_size)
+                        else:
+                            next_to_schedule = None
+
+                    _, future = pending.popleft()
+                    response = future.result()
+                    markets = response.get("data", [])
+                    yield markets
+
+                    next_cursor = response.get("next_cursor")
+                    if not next_cursor or next_cursor == END_CURSOR:
+                        break
+
+                    if page_size is None:
+                        page_size = response.get("limit") or len(markets)
+
+                    if pending and pending[0][0] == next_cursor:
+                        continue
+
+                    # Prediction missed (or nothing was predicted): restart from the real cursor
+                    for _, stale in pending:
+                        stale.cancel()
+                    pending.clear()
+                    next_to_schedule = next_cursor
+            finally:
+                for _, stale in pending:
+                    stale.cancel()
 
-        filtered = [
-            m for m in all_markets
-            if m.get("enable_order_book") and m.get("accepting_orders")
-        ]
+    @staticmethod
+    def get_clob_markets_accepting_orders(market_cache: dict[str, dict] | None = None) -> list[dict]:
+        """
+        Fetch all CLOB markets and return those who accepts orders.
+        If `market_cache` is given, the condition id and tokens of every market
+        seen in the pass, accepting orders or not, are recorded in it.
+        """
+        filtered = []
+        for page in ClobService.iter_clob_market_pages():
+            filtered.extend(
+                m for m in page
+                if m.get("enable_order_book") and m.get("accepting_orders")
+            )
+            if market_cache is not None:
+                for m in page:
+                    if m.get("condition_id"):
+                        market_cache[m["condition_id"]] = {
+                            "condition_id": m["condition_id"],
+                            "tokens": m.get("tokens") or [],
+                        }
 
         return filtered
 
     @staticmethod
     def get_clob_market_by_condition_id(condition_id: str) -> dict | None:
         """Fetch a single CLOB market by its condition ID."""
-        open_client: ClobClient = ClobClient(host=ClobService.host)
+        http = get_clob_client(ClobService.host)
 
         try:
-            response = open_client.get_market(condition_id)
-            return response
+            response = http.get(f"{GET_MARKET}{condition_id}", timeout=ClobService.market_timeout)
+            response.raise_for_status()
+            return response.json()
         except Exception as e:
             print(f"Error fetching market for condition_id {condition_id}: {e}")
             return None
@@ -43,11 +136,14 @@ class ClobService:
     @staticmethod
     def get_market_price_by_token_id(token_id: str) -> dict[str, str] | None:
         """Fetch the market price for a given token ID."""
-        open_client: ClobClient = ClobClient(host=ClobService.host)
+        http = get_clob_client(ClobService.host)
 
         try:
-            response_buy = open_client.get_price(token_id, side="BUY")
-            response_sell = open_client.get_price(token_id, side="SELL")
+            response_buy = http.get(PRICE, params={"token_id": token_id, "side": "BUY"})
+            response_sell = http.get(PRICE, params={"token_id": token_id, "side": "SELL"})
+            response_buy.raise_for_status()
+            response_sell.raise_for_status()
+            response_buy, response_sell = response_buy.json(), response_sell.json()
             if not response_buy or not response_sell:
                 print(f"No price data found for token_id {token_id}")
                 return None
@@ -62,25 +158,34 @@ class ClobService:
 
 
     @staticmethod
-    def get_book_by_token_id(token_id: str,
-                             side: str | None = None) -> (dict[str, list[dict[str, str]]] |
-                                                          list[dict[str, str]]| None):
-        """Fetch the order book for a given token ID."""
-        open_client: ClobClient = ClobClient(host=ClobService.host)
+    def fetch_book_by_token_id(token_id: str) -> dict[str, list[dict[str, str]]] | None:
+        """Fetch the full order book for a given token ID straight from the CLOB."""
+        http = get_clob_client(ClobService.host)
 
         try:
-            response = open_client.get_order_book(token_id)
-            bids = [{"price": bid.price, "size": bid.size} for bid in response.bids]
-            asks = [{"price": ask.price, "size": ask.size} for ask in response.asks]
-
-            if side is not None:
-                if side == "BUY":
-                    return asks
-                elif side == "SELL":
-                    return bids
-                else:
-                    raise ValueError(f"Invalid side: {side}. Use 'BUY' or 'SELL'.")
+            response = http.get(GET_ORDER_BOOK, params={"token_id": token_id})
+            response.raise_for_status()
+            raw_book = response.json()
+            bids = [{"price": bid["price"], "size": bid["size"]} for bid in raw_book.get("bids", [])]
+            asks = [{"price": ask["price"], "size": ask["size"]} for ask in raw_book.get("asks", [])]
+            return {"bids": bids, "asks": asks}
 
+        except Exception as e:
+            print(f"Error fetching order book for token_id {token_id}: {e}")
+            return None
+
+
+    @staticmethod
+    async def fetch_book_by_token_id_async(token_id: str) -> dict[str, list[dict[str, str]]] | None:
+        """Async variant of `fetch_book_by_token_id` that doesn't block the event loop."""
+        http = get_async_clob_client(ClobService.host)
+
+        try:
+            response = await http.get(GET_ORDER_BOOK, params={"token_id": token_id})
+            response.raise_for_status()
+            raw_book = response.json()
+            bids = [{"price": bid["price"], "size": bid["size"]} for bid in raw_book.get("bids", [])]
+            asks = [{"price": ask["price"], "size": ask["size"]} for ask in raw_book.get("asks", [])]
             return {"bids": bids, "asks": asks}
 
         except Exception as e:
@@ -88,3 +193,41 @@ class ClobService:
             return None
 
 
+    @staticmethod
+    def get_book_by_token_id(token_id: str,
+                             side: str | None = None) -> (dict[str, list[dict[str, str]]] |
+                                                          list[dict[str, str]]| None):
+        """
+        Fetch the order book for a given token ID.
+        Served from the shared book cache while fresh; the result is read-only.
+        """
+        book = book_cache.get_or_fetch(token_id, ClobService.fetch_book_by_token_id)
+        return ClobService._select_book_side(token_id, book, side)
+
+
+    @staticmethod
+    async def get_book_by_token_id_async(token_id: str,
+                                         side: str | None = None) -> (dict[str, list[dict[str, str]]] |
+                                                                      list[dict[str, str]] | None):
+        """Async variant of `get_book_by_token_id`, sharing the same book cache."""
+        book = await book_cache.aget_or_fetch(token_id, ClobService.fetch_book_by_token_id_async)
+        return ClobService._select_book_side(token_id, book, side)
+
+
+    @staticmethod
+    def _select_book_side(token_id: str,
+                          book: dict[str, list[dict[str, str]]] | None,
+                          side: str | None) -> (dict[str, list[dict[str, str]]] |
+                                                list[dict[str, str]] | None):
+        if book is None:
+            return None
+
+        if side is None:
+            return book
+        if side == "BUY":
+            return book["asks"]
+        if side == "SELL":
+            return book["bids"]
+
+        print(f"Error fetching order book for token_id {token_id}: Invalid side: {side}. Use 'BUY' or 'SELL'.")
+        return None
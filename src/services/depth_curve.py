@@ -0,0 +1,266 @@
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, Inexact, ROUND_DOWN, getcontext
+
+CENT = Decimal("0.01")
+TICK = Decimal("0.0001")
+
+
+class DepthCurve:
+    """
+    One side of an order book pre-walked into sorted price/size arrays with
+    running totals, so any order size is answered with a bisect and at most
+    one partial level instead of a fresh sort and walk.
+
+    A "buy" curve walks asks from the lowest price up, a "sell" curve walks
+    bids from the highest price down; equal prices keep book order, exactly
+    like OrderService's level-by-level walk, whose results (statuses,
+    quantised totals, fills and Decimal rounding) are reproduced exactly.
+
+    Running totals only differ from the walk's step-by-step subtraction when
+    the Decimal context has to round; curves and orders where that could
+    happen fall back to the walk itself.
+    """
+
+    __slots__ = ("side", "prices", "sizes", "cum_shares", "cum_cost", "exact", "_min_exp", "_fills")
+
+    def __init__(self, book: list[dict], side: str):
+        if side not in ("buy", "sell"):
+            raise ValueError(f"side must be 'buy' or 'sell', not {side!r}")
+        self.side = side
+
+        levels = [(Decimal(level["price"]), Decimal(level["size"])) for level in book]
+        # Sort on the parsed prices; stable, so ties keep book order like the walk
+        levels.sort(key=lambda level: level[0], reverse=(side == "sell"))
+        self.prices = [price for price, _ in levels]
+        self.sizes = [size for _, size in levels]
+
+        ctx = getcontext().copy()
+        ctx.clear_flags()
+        cum_shares = [Decimal("0")]
+        cum_cost = [Decimal("0")]
+        for price, size in levels:
+            cum_shares.append(ctx.add(cum_shares[-1], size))
+            cum_cost.append(ctx.add(cum_cost[-1], ctx.multiply(price, size)))
+        self.cum_shares = cum_shares
+        self.cum_cost = cum_cost
+        # Running totals must be exact and non-decreasing for the bisect to stand in for the walk
+        self.exact = not ctx.flags[Inexact] and all(
+            price.is_finite() and size.is_finite() and price >= 0 and size >= 0 for price, size in levels
+        )
+        totals = cum_cost if side == "buy" else cum_shares
+        self._min_exp = min(total.as_tuple().exponent for total in totals) if self.exact else 0
+        self._fills = None
+
+    @classmethod
+    def for_buy(cls, asks: list[dict]) -> "DepthCurve":
+        return cls(asks, "buy")
+
+    @classmethod
+    def for_sell(cls, bids: list[dict]) -> "DepthCurve":
+        return cls(bids, "sell")
+
+    @property
+    def depth_shares(self) -> Decimal:
+        """Shares available on this side of the book."""
+        return self.cum_shares[-1]
+
+    @property
+    def depth_cost(self) -> Decimal:
+        """USDC it takes to sweep this side of the book."""
+        return self.cum_cost[-1]
+
+    @property
+    def best_price(self) -> Decimal | None:
+        """Price of the first level an order takes, if the side has any."""
+        return self.prices[0] if self.prices else None
+
+    def _full_fills(self, n: int) -> list[dict]:
+        if self._fills is None:
+            self._fills = [{"fill_price": p, "fill_shares": s} for p, s in zip(self.prices, self.sizes)]
+        return [dict(fill) for fill in self._fills[:n]]
+
+    def _fits(self, total: Decimal) -> bool:
+        """
+        Whether the walk's running remainder (`total` minus the levels taken
+        so far) is exact at every step. Each remainder lies between 0 and
+        `total` and has no finer exponent than `total` or the running totals,
+        so it fits the context whenever that whole span does.
+        """
+        if not self.exact or not total.is_finite() or total < 0:
+            return False
+        finest = min(total.as_tuple().exponent, self._min_exp)
+        return total.adjusted() - finest + 1 <= getcontext().prec
+
+    def buy(self, amount: Decimal, fills: bool = True) -> dict:
+        """
+        Spend `amount` USDC up the asks; same result as
+        OrderService.simulate_buy_transaction. `fills=False` leaves the
+        per-level fills out, for sweeps that only need the totals.
+        """
+        if self.side != "buy":
+            raise ValueError("buy() needs a buy curve built from the asks")
+        amount = Decimal(amount)
+
+        # Levels the walk takes whole: their running cost stays within the budget
+        if not self._fits(amount):
+            return self._walk_buy(amount, fills)
+        k = bisect_right(self.cum_cost, amount) - 1
+        amount_left = amount - self.cum_cost[k]
+
+        total_shares = self.cum_shares[k]
+        total_cost = self.cum_cost[k]
+        result_fills = self._full_fills(k) if fills else None
+        if k < len(self.prices):
+            price = self.prices[k]
+            shares_affordable = amount_left / price
+            if shares_affordable > 0:
+                total_shares += shares_affordable
+                total_cost += shares_affordable * price
+                if fills:
+                    result_fills.append({"fill_price": price, "fill_shares": shares_affordable})
+
+        return self._buy_result(amount, total_shares, total_cost, result_fills)
+
+    def sell(self, shares: Decimal, fills: bool = True) -> dict:
+        """
+        Sell `shares` down the bids; same result as
+        OrderService.simulate_sell_transaction. `fills=False` leaves the
+        per-level fills out, for sweeps that only need the totals.
+        """
+        if self.side != "sell":
+            raise ValueError("sell() needs a sell curve built from the bids")
+        shares = Decimal(shares)
+
+        if not self._fits(shares):
+            return self._walk_sell(shares, fills)
+        k = bisect_right(self.cum_shares, shares) - 1
+        shares_left = shares - self.cum_shares[k]
+
+        total_shares = self.cum_shares[k]
+        total_proceeds = self.cum_cost[k]
+        result_fills = self._full_fills(k) if fills else None
+        if k < len(self.prices) and shares_left > 0:
+            price = self.prices[k]
+            total_shares += shares_left
+            total_proceeds += shares_left * price
+            if fills:
+                result_fills.append({"fill_price": price, "fill_shares": shares_left})
+
+        return self._sell_result(shares, total_shares, total_proceeds, result_fills)
+
+    def quote(self, size: Decimal) -> dict:
+        """
+        What `size` (USDC on a buy curve, shares on a sell curve) would get:
+        the buy()/sell() totals, the price of the last level reached, the
+        average price and its slippage from the best price, as a fraction.
+        """
+        size = Decimal(size)
+        if self.side == "buy":
+            result = self.buy(size, fills=False)
+            filled = result["status"] == "filled"
+            shares = result["shares_filled" if filled else "max_shares"]
+            amount = result["total_cost" if filled else "max_amount"]
+            reached = self.cum_cost
+        else:
+            result = self.sell(size, fills=False)
+            filled = result["status"] == "filled"
+            shares = result["shares_sold" if filled else "max_shares"]
+            amount = result["total_proceeds" if filled else "max_amount"]
+            reached = self.cum_shares
+
+        quote = {
+            "size": size,
+            "status": result["status"],
+            "shares": shares,
+            "amount_usdc": amount,
+            "fill_price": None,
+            "average_price": None,
+            "slippage": None,
+        }
+        if shares > 0:
+            # Level i spans reached[i]..reached[i + 1]; past the depth, the last level
+            level = min(bisect_left(reached, size), len(self.prices)) - 1
+            quote["fill_price"] = self.prices[level]
+            average = amount / shares
+            quote["average_price"] = average.quantize(TICK)
+            best = self.best_price
+            if best > 0:
+                slippage = (average - best) if self.side == "buy" else (best - average)
+                quote["slippage"] = (slippage / best).quantize(TICK)
+        return quote
+
+    @staticmethod
+    def _buy_result(amount: Decimal, total_shares: Decimal, total_cost: Decimal, fills: list | None) -> dict:
+        if total_cost < amount:
+            result = {
+                "status": "exceeds_liquidity",
+                "max_amount": total_cost.quantize(CENT, rounding=ROUND_DOWN),
+                "max_shares": total_shares.quantize(CENT, rounding=ROUND_DOWN),
+            }
+        else:
+            result = {
+                "status": "filled",
+                "shares_filled": total_shares.quantize(CENT, rounding=ROUND_DOWN),
+                "total_cost": total_cost.quantize(CENT, rounding=ROUND_DOWN),
+            }
+        if fills is not None:
+            result["fills"] = fills
+        return result
+
+    @staticmethod
+    def _sell_result(shares: Decimal, total_shares: Decimal, total_proceeds: Decimal, fills: list | None) -> dict:
+        if total_shares < shares:
+            result = {
+                "status": "exceeds_liquidity",
+                "max_shares": total_shares.quantize(CENT, rounding=ROUND_DOWN),
+                "max_amount": total_proceeds.quantize(CENT, rounding=ROUND_DOWN),
+            }
+        else:
+            result = {
+                "status": "filled",
+                "shares_sold": total_shares.quantize(CENT, rounding=ROUND_DOWN),
+                "total_proceeds": total_proceeds.quantize(CENT, rounding=ROUND_DOWN),
+            }
+        if fills is not None:
+            result["fills"] = fills
+        return result
+
+    def _walk_buy(self, amount: Decimal, fills: bool) -> dict:
+        amount_left = amount
+        total_shares = Decimal("0")
+        total_cost = Decimal("0")
+        result_fills = []
+        for price, size in zip(self.prices, self.sizes):
+            possible_cost = price * size
+            if possible_cost <= amount_left:
+                total_shares += size
+                total_cost += possible_cost
+                result_fills.append({"fill_price": price, "fill_shares": size})
+                amount_left -= possible_cost
+            else:
+                shares_affordable = amount_left / price
+                if shares_affordable > 0:
+                    total_shares += shares_affordable
+                    total_cost += shares_affordable * price
+                    result_fills.append({"fill_price": price, "fill_shares": shares_affordable})
+                break
+        return self._buy_result(amount, total_shares, total_cost, result_fills if fills else None)
+
+    def _walk_sell(self, shares: Decimal, fills: bool) -> dict:
+        shares_left = shares
+        total_shares = Decimal("0")
+        total_proceeds = Decimal("0")
+        result_fills = []
+        for price, size in zip(self.prices, self.sizes):
+            if size <= shares_left:
+                total_shares += size
+                total_proceeds += size * price
+                result_fills.append({"fill_price": price, "fill_shares": size})
+                shares_left -= size
+            else:
+                if shares_left > 0:
+                    total_shares += shares_left
+                    total_proceeds += shares_left * price
+                    result_fills.append({"fill_price": price, "fill_shares": shares_left})
+                break
+        return self._sell_result(shares, total_shares, total_proceeds, result_fills if fills else None)
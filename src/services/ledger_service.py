@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, update
+
+from src.models.user import User
+from src.models.user_position import UserPosition
+
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+class LedgerService:
+    """
+    Balance and position changes as single SQL statements
+    (`balance = balance - :usdc WHERE balance >= :usdc`), never as a Python
+    read-modify-write. Two requests for the same user may both have read the
+    row before either writes; each statement applies on top of whatever the
+    other committed, and a debit that no longer fits matches no row.
+    Objects already loaded in `db` are refreshed with the new values.
+    """
+
+    @staticmethod
+    def debit_balance(db: Session, user_name: str, usdc: Decimal) -> bool:
+        """Take `usdc` from the user's balance; False, changing nothing, if it doesn't cover it."""
+        result = db.exec(
+            update(User)
+            .where(User.name == user_name, User.balance >= usdc)
+            .values(balance=User.balance - usdc)
+            .execution_options(synchronize_session="fetch")
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def credit_balance(db: Session, user_name: str, usdc: Decimal) -> None:
+        db.exec(
+            update(User)
+            .where(User.name == user_name)
+            .values(balance=User.balance + usdc)
+            .execution_options(synchronize_session="fetch")
+        )
+
+    @staticmethod
+    def debit_shares(db: Session, user_name: str, market: str, token: str, shares: Decimal) -> bool:
+        """Take `shares` from the position; False, changing nothing, if it holds fewer."""
+        result = db.exec(
+            update(UserPosition)
+            .where(
+                UserPosition.user_name == user_name,
+                UserPosition.market == market,
+                UserPosition.token == token,
+                UserPosition.shares >= shares,
+            )
+            .values(shares=UserPosition.shares - shares)
+            .execution_options(synchronize_session="fetch")
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def credit_shares(db: Session, user_name: str, market: str, token: str, shares: Decimal) -> None:
+        """Add `shares` to the position, creating it if the user has none yet."""
+        result = db.exec(
+            update(UserPosition)
+            .where(
+                UserPosition.user_name == user_name,
+                UserPosition.market == market,
+                UserPosition.token == token,
+            )
+            .values(shares=UserPosition.shares + shares)
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount:
+            return
+
+        insert = _UPSERTS.get(db.get_bind().dialect.name)
+        if insert is None:
+            db.add(UserPosition(user_name=user_name, market=market, token=token, shares=shares))
+            db.flush()
+            return
+        # Another transaction may create the position first; add to it instead of failing
+        stmt = insert(UserPosition).values(user_name=user_name, market=market, token=token, shares=shares)
+        db.exec(stmt.on_conflict_do_update(
+            index_elements=["user_name", "market", "token"],
+            set_={"shares": UserPosition.shares + stmt.excluded.shares},
+        ))
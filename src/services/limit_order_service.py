@@ -0,0 +1,369 @@
+import logging
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_DOWN, ROUND_UP
+from itertools import count
+from typing import Iterable, Iterator
+
+from dotenv import load_dotenv
+from sqlmodel import Session, select, update
+
+from src.models.order import Order, OrderSide, OrderStatus, OrderType
+from src.models.order_fill import OrderFill
+from src.services.clob_service import ClobService
+from src.services.depth_curve import CENT, DepthCurve
+from src.services.ledger_service import LedgerService
+from src.sessions import get_session_context
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+limit_match_seconds = float(os.getenv("LIMIT_MATCH_SECONDS", "2"))
+
+RESTING_STATUSES = (OrderStatus.OPEN, OrderStatus.PARTIAL)
+
+
+class RestingOrder:
+    __slots__ = ("order_id", "token", "side", "limit_price", "remaining", "key")
+
+    def __init__(self, order_id: int, token: str, side: OrderSide, limit_price: Decimal, remaining: Decimal):
+        self.order_id = order_id
+        self.token = token
+        self.side = side
+        self.limit_price = limit_price
+        self.remaining = remaining
+        self.key: tuple | None = None
+
+
+class _TokenOrders:
+    __slots__ = ("buys", "sells", "matched_book")
+
+    def __init__(self):
+        # Sorted best-first: buys by highest limit, sells by lowest; then time priority
+        self.buys: list[tuple[Decimal, int, int]] = []
+        self.sells: list[tuple[Decimal, int, int]] = []
+        # The book snapshot last matched against; None once orders change
+        self.matched_book = None
+
+
+class LimitOrderIndex:
+    """
+    In-memory index of resting LIMIT orders, per token and price.
+
+    Each side of a token is a sorted list of (price key, priority, order id)
+    so the orders able to trade against a book are always a prefix: finding
+    them costs O(log n) plus the number of orders that cross, however many
+    are resting. The database stays the source of truth; the index is
+    rebuilt from it with `load` at startup and only changed after commits.
+
+    `lock` guards the index itself and is never held across database work:
+    with DB_ASYNC=true every request runs on the event loop thread, where a
+    thread lock neither excludes other requests nor may block. Concurrent
+    changes to one order are settled in the database by
+    `LimitOrderService.claim` instead.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._tokens: dict[str, _TokenOrders] = {}
+        self._orders: dict[int, RestingOrder] = {}
+        self._priority = count()
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._orders
+
+    def get(self, order_id: int) -> RestingOrder | None:
+        return self._orders.get(order_id)
+
+    def tokens(self) -> list[str]:
+        with self.lock:
+            return list(self._tokens)
+
+    def clear(self) -> None:
+        with self.lock:
+            self._tokens.clear()
+            self._orders.clear()
+
+    def load(self, db: Session) -> int:
+        """Rebuild the index from the open LIMIT orders in the database."""
+        rows = db.exec(
+            select(Order)
+            .where(Order.order_type == OrderType.LIMIT, Order.status.in_(RESTING_STATUSES))
+            .order_by(Order.updated_at, Order.order_id)
+        ).all()
+        with self.lock:
+            self.clear()
+            for order in rows:
+                self.add(order)
+        return len(rows)
+
+    def add(self, order: Order) -> RestingOrder:
+        """Index `order`, or re-index it with fresh time priority."""
+        with self.lock:
+            self.remove(order.order_id)
+            resting = RestingOrder(order.order_id, order.token, order.side,
+                                   order.limit_price, order.shares - order.filled_shares)
+            price_key = -resting.limit_price if resting.side == OrderSide.BUY else resting.limit_price
+            resting.key = (price_key, next(self._priority), resting.order_id)
+
+            book = self._tokens.setdefault(resting.token, _TokenOrders())
+            insort(self._side(book, resting.side), resting.key)
+            book.matched_book = None
+            self._orders[resting.order_id] = resting
+            return resting
+
+    def remove(self, order_id: int) -> RestingOrder | None:
+        with self.lock:
+            resting = self._orders.pop(order_id, None)
+            if resting is None:
+                return None
+            book = self._tokens[resting.token]
+            side = self._side(book, resting.side)
+            del side[bisect_left(side, resting.key)]
+            if not book.buys and not book.sells:
+                del self._tokens[resting.token]
+            return resting
+
+    def discard(self, resting: RestingOrder) -> None:
+        """Remove `resting` unless its order was re-indexed (replaced) since."""
+        with self.lock:
+            if self._orders.get(resting.order_id) is resting:
+                self.remove(resting.order_id)
+
+    def crossing(self, token: str, side: OrderSide, best_price: Decimal | None) -> Iterator[RestingOrder]:
+        """
+        Resting `side` orders on `token` that the opposite side's best price
+        reaches, best first. Call with `lock` held.
+        """
+        book = self._tokens.get(token)
+        if book is None or best_price is None:
+            return
+        for price_key, _, order_id in self._side(book, side):
+            limit_price = -price_key if side == OrderSide.BUY else price_key
+            if (limit_price < best_price) if side == OrderSide.BUY else (limit_price > best_price):
+                return
+            yield self._orders[order_id]
+
+    def is_matched(self, token: str, book) -> bool:
+        """Whether `token`'s orders were already matched against this exact snapshot."""
+        orders = self._tokens.get(token)
+        return orders is None or orders.matched_book is book
+
+    def mark_matched(self, token: str, book) -> None:
+        orders = self._tokens.get(token)
+        if orders is not None:
+            orders.matched_book = book
+
+    @staticmethod
+    def _side(book: _TokenOrders, side: OrderSide) -> list:
+        return book.buys if side == OrderSide.BUY else book.sells
+
+
+limit_order_index = LimitOrderIndex()
+
+
+class LimitOrderService:
+
+    @staticmethod
+    def reservation(limit_price: Decimal, shares: Decimal) -> Decimal:
+        """USDC a LIMIT buy of `shares` at `limit_price` holds back; fills never cost more."""
+        return (limit_price * shares).quantize(CENT, rounding=ROUND_UP)
+
+    @staticmethod
+    def claim(db: Session, order: Order, **changes) -> bool:
+        """
+        Apply `changes` to `order` in one conditional UPDATE that only matches
+        while the row is still resting and unchanged since `order` was read,
+        so two requests that read the same open order can't both cancel,
+        replace or fill it. Returns False, changing nothing, if another
+        transaction got there first; on success `order` carries the new
+        values. Claim before moving funds or shares.
+        """
+        result = db.exec(
+            update(Order)
+            .where(
+                Order.order_id == order.order_id,
+                Order.status.in_(RESTING_STATUSES),
+                Order.limit_price == order.limit_price,
+                Order.shares == order.shares,
+                Order.filled_shares == order.filled_shares,
+                Order.reserved_usdc == order.reserved_usdc,
+            )
+            .values(updated_at=datetime.now(timezone.utc), **changes)
+            .execution_options(synchronize_session="fetch")
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def release(db: Session, order: Order, usdc: Decimal, shares: Decimal) -> None:
+        """Give back what a resting order held: `usdc` for a buy, `shares` for a sell."""
+        if order.side == OrderSide.BUY:
+            if usdc > 0:
+                LedgerService.credit_balance(db, order.user_name, usdc)
+        elif shares > 0:
+            LedgerService.credit_shares(db, order.user_name, order.market, order.token, shares)
+
+    @staticmethod
+    def cancel(db: Session, order: Order) -> bool:
+        """
+        Cancel `order` and release what it holds, unless it changed since it
+        was read. The caller commits, then removes the order from the index.
+        """
+        usdc, shares = order.reserved_usdc, order.shares - order.filled_shares
+        if not LimitOrderService.claim(db, order, status=OrderStatus.CANCELLED, reserved_usdc=Decimal("0")):
+            return False
+        LimitOrderService.release(db, order, usdc, shares)
+        return True
+
+    @staticmethod
+    def plan_fills(token: str, book: dict) -> list[tuple[RestingOrder, list[tuple[Decimal, Decimal]]]]:
+        """
+        Decide which resting orders on `token` trade against `book` and at
+        which (price, shares) levels. Orders are taken best price first, then
+        oldest first, and share the snapshot's liquidity: a level taken by
+        one order is not offered to the next. Call with the index lock held.
+        """
+        plan = []
+        for side, curve in ((OrderSide.BUY, DepthCurve.for_buy(book.get("asks", []))),
+                            (OrderSide.SELL, DepthCurve.for_sell(book.get("bids", [])))):
+            left = list(curve.sizes)
+            level = 0
+            for resting in limit_order_index.crossing(token, side, curve.best_price):
+                fills = []
+                remaining = resting.remaining
+                while remaining > 0 and level < len(left):
+                    price = curve.prices[level]
+                    if (price > resting.limit_price) if side == OrderSide.BUY else (price < resting.limit_price):
+                        break
+                    take = min(remaining, left[level]).quantize(CENT, rounding=ROUND_DOWN)
+                    if take > 0:
+                        fills.append((price, take))
+                        left[level] -= take
+                        remaining -= take
+                    if left[level] < CENT:
+                        level += 1
+                if fills:
+                    plan.append((resting, fills))
+                if level == len(left):
+                    break
+        return plan
+
+    @staticmethod
+    def match_token(db: Session, token: str, book: dict | None) -> int:
+        """
+        Fill the resting orders on `token` that `book` crosses, in one
+        transaction. Returns the number of orders that traded. A snapshot
+        already matched, with no order changes since, is skipped. An order
+        cancelled or replaced after the plan was made is left alone.
+        """
+        if book is None:
+            return 0
+        with limit_order_index.lock:
+            if limit_order_index.is_matched(token, book):
+                return 0
+            plan = [(resting, resting.limit_price, resting.remaining, fills)
+                    for resting, fills in LimitOrderService.plan_fills(token, book)]
+
+        traded, stale = [], []
+        now = datetime.now(timezone.utc)
+        for resting, limit_price, remaining, fills in plan:
+            order = db.get(Order, resting.order_id)
+            if order is None or order.status not in RESTING_STATUSES:
+                stale.append(resting)
+                continue
+            if order.limit_price != limit_price or order.shares - order.filled_shares != remaining:
+                continue  # replaced since the plan; the route re-indexed it
+
+            shares = sum((take for _, take in fills), Decimal("0"))
+            usdc = sum(((price * take).quantize(CENT, rounding=ROUND_DOWN) for price, take in fills), Decimal("0"))
+            filled = order.filled_shares + shares >= order.shares
+            changes = {
+                "filled_shares": order.filled_shares + shares,
+                "amount_usdc": order.amount_usdc + usdc,
+                "status": OrderStatus.FILLED if filled else OrderStatus.PARTIAL,
+            }
+            left_over = Decimal("0")
+            if order.side == OrderSide.BUY:
+                # A filled buy gives back whatever its fills left reserved
+                left_over = order.reserved_usdc - usdc if filled else Decimal("0")
+                changes["reserved_usdc"] = order.reserved_usdc - usdc - left_over
+            if not LimitOrderService.claim(db, order, **changes):
+                continue
+
+            db.add_all([OrderFill(order_id=order.order_id, fill_price=price, fill_shares=take, filled_at=now)
+                        for price, take in fills])
+            if order.side == OrderSide.BUY:
+                LedgerService.credit_shares(db, order.user_name, order.market, order.token, shares)
+                LimitOrderService.release(db, order, left_over, Decimal("0"))
+            else:
+                LedgerService.credit_balance(db, order.user_name, usdc)
+            traded.append((resting, shares))
+
+        db.commit()
+
+        with limit_order_index.lock:
+            for resting in stale:
+                limit_order_index.discard(resting)
+            for resting, shares in traded:
+                resting.remaining -= shares
+                if resting.remaining <= 0:
+                    limit_order_index.discard(resting)
+            limit_order_index.mark_matched(token, book)
+        return len(traded)
+
+    @staticmethod
+    def cancel_market_orders(db: Session, markets: Iterable[str], commit: bool = True) -> list[int]:
+        """
+        Cancel every resting LIMIT order on `markets` and release what they
+        hold. Used before markets resolve, so reserved shares are back in the
+        positions that get paid out. With `commit=False` the cancellations
+        join the caller's transaction; the caller removes the returned ids
+        from the index once it has committed.
+        """
+        markets = list(markets)
+        if not markets:
+            return []
+        orders = db.exec(
+            select(Order).where(
+                Order.order_type == OrderType.LIMIT,
+                Order.status.in_(RESTING_STATUSES),
+                Order.market.in_(markets),
+            )
+        ).all()
+        cancelled = [order.order_id for order in orders if LimitOrderService.cancel(db, order)]
+        if commit:
+            db.commit()
+            for order_id in cancelled:
+                limit_order_index.remove(order_id)
+        return cancelled
+
+
+def load_limit_order_index() -> None:
+    """Rebuild the resting LIMIT order index from the database at startup."""
+    with get_session_context() as session:
+        try:
+            loaded = limit_order_index.load(session)
+            logger.info(f"Loaded {loaded} resting limit orders")
+        except Exception as e:
+            logger.exception(f"Loading resting limit orders failed: {e}")
+
+
+def run_limit_order_matching():
+    """Entry point for the background limit order matcher job."""
+    tokens = limit_order_index.tokens()
+    if not tokens:
+        return
+    with get_session_context() as session:
+        for token in tokens:
+            try:
+                book = ClobService.get_book_by_token_id(token)
+                LimitOrderService.match_token(session, token, book)
+            except Exception as e:
+                session.rollback()
+                logger.exception(f"Limit order matching failed for token {token}: {e}")
@@ -1,18 +1,52 @@
 import json
 import logging
-from collections import defaultdict
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
+from dotenv import load_dotenv
 from sqlmodel import Session
+from sqlalchemy import Column, MetaData, String, Table, and_, delete, exists, false, insert, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.future import select
 
 from src.models.market import Market
 from src.models.market_change_log import MarketChangeLog, MarketChangeType
 from src.models.market_outcome import MarketOutcome
 from src.models.sync_hot_market import SyncHotMarket
+from src.models.user_position import UserPosition
 from src.services.clob_service import ClobService
 
+load_dotenv()
+
 logger = logging.getLogger(__name__)
 
+sync_chunk_size = max(1, int(os.getenv("MARKET_SYNC_CHUNK_SIZE", "500")))
+winner_lookup_workers = max(1, int(os.getenv("WINNER_LOOKUP_WORKERS", "8")))
+winner_lookup_retries = max(0, int(os.getenv("WINNER_LOOKUP_RETRIES", "2")))
+winner_lookup_backoff = float(os.getenv("WINNER_LOOKUP_BACKOFF", "0.5"))
+
+
+# Per-connection scratch tables holding one CLOB snapshot, so the sync can
+# diff it against the DB with joins instead of Python sets or per-row queries.
+# They live in their own MetaData so create_all/Alembic never see them.
+_staging_metadata = MetaData()
+incoming_markets = Table(
+    "incoming_markets",
+    _staging_metadata,
+    Column("condition_id", String, primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+incoming_outcomes = Table(
+    "incoming_outcomes",
+    _staging_metadata,
+    Column("market", String, primary_key=True),
+    Column("token", String, primary_key=True),
+    Column("outcome_text", String, nullable=True),
+    prefixes=["TEMPORARY"],
+)
+
 
 class MarketSyncError(Exception):
     def __init__(self, stage: str, original: Exception):
@@ -22,6 +56,95 @@ class MarketSyncError(Exception):
 
 
 
+def _chunks(items: list, size: int = 0):
+    size = size or sync_chunk_size
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _insert_ignoring_conflicts(db: Session, table: Table, rows: list[dict]) -> None:
+    """
+    Bulk insert `rows` into `table` in executemany batches of `sync_chunk_size`,
+    skipping rows whose primary key already exists (SQLite / PostgreSQL).
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(table).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(table).on_conflict_do_nothing()
+    else:
+        stmt = insert(table)
+    for chunk in _chunks(rows):
+        db.exec(stmt, params=chunk)
+
+
+def _restage(db: Session, table: Table, rows: list[dict]) -> None:
+    """Replace the contents of a staging table on the session's connection with `rows`."""
+    conn = db.connection()
+    table.create(conn, checkfirst=True)
+    conn.execute(delete(table))
+    for chunk in _chunks(rows):
+        conn.execute(insert(table), chunk)
+
+
+def _log_market_changes(db: Session, condition_ids: list[str], change_type: MarketChangeType) -> None:
+    """Bulk insert one MarketChangeLog row per condition id, all with the same timestamp."""
+    now = datetime.now(timezone.utc)
+    rows = [{"condition_id": cid, "change_type": change_type, "timestamp": now} for cid in condition_ids]
+    for chunk in _chunks(rows):
+        db.exec(insert(MarketChangeLog.__table__), params=chunk)
+
+
+def _lookup_market(condition_id: str) -> dict | None:
+    """Fetch one CLOB market, retrying with exponential backoff; None if every attempt fails."""
+    for attempt in range(winner_lookup_retries + 1):
+        if attempt:
+            time.sleep(winner_lookup_backoff * 2 ** (attempt - 1))
+        market_info = ClobService.get_clob_market_by_condition_id(condition_id)
+        if market_info is not None:
+            return market_info
+    return None
+
+
+def _lookup_winners(condition_ids: list[str],
+                    market_cache: dict[str, dict] | None = None) -> tuple[dict[str, list[str]], list[str]]:
+    """
+    Look up the winning token ids of `condition_ids`. Payloads already in
+    `market_cache` are used as-is; misses are fetched on a bounded worker pool.
+    Returns ({condition_id: winning_token_ids}, failed_condition_ids); markets
+    without a winner yet map to an empty list.
+    """
+    market_cache = market_cache or {}
+    payloads = {cid: market_cache[cid] for cid in condition_ids if cid in market_cache}
+    misses = [cid for cid in condition_ids if cid not in payloads]
+
+    if misses:
+        workers = min(winner_lookup_workers, len(misses))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="winner-lookup") as pool:
+            payloads.update(zip(misses, pool.map(_lookup_market, misses)))
+
+    winners: dict[str, list[str]] = {}
+    failed: list[str] = []
+    for cid in condition_ids:
+        market_info = payloads.get(cid)
+        if market_info is None:
+            failed.append(cid)
+            continue
+        tokens = market_info.get("tokens") or []
+        winners[cid] = [t["token_id"] for t in tokens if t.get("winner")]
+    return winners, failed
+
+
+def _existing_ids(db: Session, column, ids: list[str]) -> set[str]:
+    """Return which of `ids` are already present in `column`, querying in chunks."""
+    existing: set[str] = set()
+    for chunk in _chunks(ids):
+        existing.update(db.exec(select(column).where(column.in_(chunk))).scalars())
+    return existing
+
+
 class MarketSyncService:
 
     @staticmethod
@@ -55,69 +178,57 @@ class MarketSyncService:
     @staticmethod
     def add_hot_sync_markets(db: Session, markets: list[dict]) -> tuple[list[str], list[dict]]:
         """
-        Stage new SyncHotMarket rows + change logs, skipping any
+        Bulk insert new SyncHotMarket rows + change logs, skipping any
         condition_ids that already exist.
+        Raises MarketSyncError on failure.
         """
-        added_ids: list[str] = []
-        added_dicts: list[dict] = []
-        existing = {m.condition_id for m in db.exec(select(SyncHotMarket)).scalars()}
-
-        for mkt in markets:
-            cid = mkt["condition_id"]
-            if cid in existing:
-                continue
+        try:
+            existing = _existing_ids(db, SyncHotMarket.condition_id, [m["condition_id"] for m in markets])
 
-            try:
+            added_dicts: list[dict] = []
+            seen: set[str] = set()
+            for mkt in markets:
+                cid = mkt["condition_id"]
+                if cid in existing or cid in seen:
+                    continue
+                seen.add(cid)
                 outcome_texts = [t.get("outcome") for t in mkt.get("tokens", [])]
+                added_dicts.append({
+                    "condition_id": cid,
+                    "question": mkt["question"],
+                    "description": mkt["description"],
+                    "tokens": json.dumps(outcome_texts),
+                })
 
-                model_obj = SyncHotMarket(
-                    condition_id=cid,
-                    question=mkt["question"],
-                    description=mkt["description"],
-                    tokens=json.dumps(outcome_texts),
-                )
-                db.add(model_obj)
-
-                db.add(
-                    MarketChangeLog(
-                        condition_id=cid,
-                        change_type=MarketChangeType.ADDED
-                    )
-                )
-
-                added_ids.append(cid)
-                added_dicts.append(model_obj.model_dump())
-
-            except Exception as e:
-                logger.exception(f"Unexpected error in add_hot_sync_markets for {cid}")
-                raise MarketSyncError("add_hot_sync_markets", e)
+            added_ids = [d["condition_id"] for d in added_dicts]
+            _insert_ignoring_conflicts(db, SyncHotMarket.__table__, added_dicts)
+            _log_market_changes(db, added_ids, MarketChangeType.ADDED)
+            return added_ids, added_dicts
 
-        return added_ids, added_dicts
+        except Exception as e:
+            logger.exception("Error in add_hot_sync_markets")
+            raise MarketSyncError("add_hot_sync_markets", e)
 
 
 
     @staticmethod
-    def remove_hot_sync_markets(
-            db: Session,
-            tracked_markets: list[SyncHotMarket],
-            removed_ids: list[str]
-    ) -> list[str]:
+    def remove_hot_sync_markets(db: Session, removed_ids: list[str]) -> list[str]:
         """
-        Stage deletions of SyncHotMarket rows and their change logs.
+        Delete SyncHotMarket rows for `removed_ids` in bulk and stage their change logs.
+        Ids that aren't tracked are ignored.
         Raises MarketSyncError on failure.
         """
         removed_list: list[str] = []
         try:
-            for m in tracked_markets:
-                if m.condition_id in removed_ids:
-                    db.delete(m)
-                    db.add(
-                        MarketChangeLog(
-                            condition_id=m.condition_id,
-                            change_type=MarketChangeType.DELETED
-                        )
-                    )
-                    removed_list.append(m.condition_id)
+            for chunk in _chunks(removed_ids):
+                present = set(db.exec(
+                    select(SyncHotMarket.condition_id).where(SyncHotMarket.condition_id.in_(chunk))
+                ).scalars())
+                if not present:
+                    continue
+                db.exec(delete(SyncHotMarket).where(SyncHotMarket.condition_id.in_(present)))
+                removed_list.extend(cid for cid in chunk if cid in present)
+            _log_market_changes(db, removed_list, MarketChangeType.DELETED)
             return removed_list
 
         except Exception as e:
@@ -129,16 +240,18 @@ class MarketSyncService:
     @staticmethod
     def add_stable_markets(db: Session, markets: list[dict]) -> list[str]:
         """
-        Stage new Market rows in the session.
+        Bulk insert new tradable Market rows, skipping any that already exist.
         Raises MarketSyncError on failure.
         """
         try:
-            added_ids: list[str] = []
-            for mkt in markets:
-                cid = mkt["condition_id"]
-                model = Market(**mkt)
-                db.add(model)
-                added_ids.append(cid)
+            ids = list(dict.fromkeys(m["condition_id"] for m in markets))
+            existing = _existing_ids(db, Market.condition_id, ids)
+            added_ids = [cid for cid in ids if cid not in existing]
+            _insert_ignoring_conflicts(
+                db,
+                Market.__table__,
+                [{"condition_id": cid, "is_tradable": True} for cid in added_ids],
+            )
             return added_ids
 
         except Exception as e:
@@ -170,6 +283,12 @@ class MarketSyncService:
 
     @staticmethod
     def add_stable_market_outcomes(db: Session, markets: list[dict]) -> list[str]:
+        """
+        Insert the MarketOutcome rows of `markets` that don't exist yet.
+        The existence check is one anti-join against a staging table, so the
+        number of statements doesn't grow with the number of markets.
+        Raises MarketSyncError on failure.
+        """
         try:
             with db.no_autoflush:
                 desired = []  # list[(cid, token_id, outcome_text)]
@@ -186,28 +305,30 @@ class MarketSyncService:
                 if not desired:
                     return []
 
-                by_market = defaultdict(list)
-                for cid, tok, _ in desired:
-                    by_market[cid].append(tok)
-
-                existing: set[tuple[str, str]] = set()
-                for cid, toks in by_market.items():
-                    if not toks:
-                        continue
-                    rows = db.exec(
-                        select(MarketOutcome.market, MarketOutcome.token)
-                        .where(MarketOutcome.market == cid, MarketOutcome.token.in_(toks))
-                    ).all()
-                    existing.update(rows)
-
-                to_insert = [(cid, tok, text) for (cid, tok, text) in desired if (cid, tok) not in existing]
+                by_key = {(cid, tok): text for cid, tok, text in desired}
+                _restage(
+                    db,
+                    incoming_outcomes,
+                    [{"market": cid, "token": tok, "outcome_text": text}
+                     for (cid, tok), text in by_key.items()],
+                )
 
-                inserted_keys: list[str] = []
-                for cid, tok, text in to_insert:
-                    db.add(MarketOutcome(market=cid, token=tok, outcome_text=text))
-                    inserted_keys.append(f"{cid}:{tok}")
+                staged = incoming_outcomes.c
+                missing = (
+                    select(staged.market, staged.token, staged.outcome_text, false())
+                    .outerjoin(MarketOutcome, and_(MarketOutcome.market == staged.market,
+                                                   MarketOutcome.token == staged.token))
+                    .where(MarketOutcome.market.is_(None))
+                )
+                new_keys = {(cid, tok) for cid, tok, _, _ in db.exec(missing).all()}
+                if new_keys:
+                    outcomes = MarketOutcome.__table__
+                    db.exec(insert(outcomes).from_select(
+                        [outcomes.c.market, outcomes.c.token, outcomes.c.outcome_text, outcomes.c.is_winner],
+                        missing,
+                    ))
 
-                return inserted_keys
+                return [f"{cid}:{tok}" for cid, tok in by_key if (cid, tok) in new_keys]
 
         except Exception as e:
             logger.exception("Error in add_market_outcomes")
@@ -216,35 +337,34 @@ class MarketSyncService:
 
 
     @staticmethod
-    def mark_market_outcome_winner(db: Session, resolved_markets: list[str]) -> list[dict]:
+    def mark_market_outcome_winner(db: Session,
+                                   resolved_markets: list[str],
+                                   market_cache: dict[str, dict] | None = None) -> list[dict]:
         """
-        Stage marking winners on MarketOutcome entries in the session.
+        Look up winners for `resolved_markets` and mark them on MarketOutcome
+        in bulk. Payloads from this run's pagination (`market_cache`) are
+        reused; only misses are fetched, concurrently. Markets whose lookup
+        fails or that have no winner yet are skipped;
+        `get_pending_resolution_markets` picks them up again on a later sync.
         Raises MarketSyncError on failure.
         """
         try:
-            updated: list[dict] = []
-            for cid in resolved_markets:
-                market_info = ClobService.get_clob_market_by_condition_id(cid)
-                tokens = market_info.get("tokens", [])
-                winning_token_ids = [t["token_id"] for t in tokens if t.get("winner")]
-
-                if not winning_token_ids:
-                    continue
-
-                result = db.exec(
-                    select(MarketOutcome).where(
-                        MarketOutcome.market == cid,
-                        MarketOutcome.token.in_(winning_token_ids)
-                    )
+            winners, failed = _lookup_winners(list(dict.fromkeys(resolved_markets)), market_cache)
+            if failed:
+                logger.warning(f"Winner lookup failed for {len(failed)} markets, will retry next sync: {failed}")
+
+            updated = [
+                {"condition_id": cid, "winning_token_ids": token_ids}
+                for cid, token_ids in winners.items() if token_ids
+            ]
+            pairs = [(u["condition_id"], tok) for u in updated for tok in u["winning_token_ids"]]
+            for chunk in _chunks(pairs):
+                db.exec(
+                    update(MarketOutcome)
+                    .where(tuple_(MarketOutcome.market, MarketOutcome.token).in_(chunk))
+                    .values(is_winner=True)
+                    .execution_options(synchronize_session="fetch")
                 )
-                for outcome in result.scalars():
-                    outcome.is_winner = True
-                    db.add(outcome)
-
-                updated.append({
-                    "condition_id": cid,
-                    "winning_token_ids": winning_token_ids,
-                })
 
             return updated
 
@@ -253,6 +373,72 @@ class MarketSyncService:
             raise MarketSyncError("mark_market_outcome_winner", e)
 
 
+    @staticmethod
+    def get_pending_resolution_markets(db: Session) -> list[str]:
+        """
+        Untradable markets that still hold positions but have no winning
+        outcome recorded, i.e. a previous winner lookup failed or the market
+        hadn't resolved yet when it stopped accepting orders.
+        Raises MarketSyncError on failure.
+        """
+        try:
+            has_winner = exists().where(
+                MarketOutcome.market == Market.condition_id,
+                MarketOutcome.is_winner.is_(True),
+            )
+            has_positions = exists().where(UserPosition.market == Market.condition_id)
+            return list(db.exec(
+                select(Market.condition_id)
+                .where(Market.is_tradable.is_(False), has_positions, ~has_winner)
+                .order_by(Market.condition_id)
+            ).scalars())
+        except Exception as e:
+            logger.exception("Error fetching markets pending resolution")
+            raise MarketSyncError("get_pending_resolution_markets", e)
+
+    @staticmethod
+    def stage_incoming_markets(db: Session, condition_ids: list[str]) -> None:
+        """
+        Load one CLOB snapshot's condition ids into the `incoming_markets`
+        temp table on the session's connection, replacing any previous snapshot.
+        Raises MarketSyncError on failure.
+        """
+        try:
+            _restage(db, incoming_markets, [{"condition_id": cid} for cid in condition_ids])
+        except Exception as e:
+            logger.exception("Error staging incoming markets")
+            raise MarketSyncError("stage_incoming_markets", e)
+
+    @staticmethod
+    def diff_incoming_markets(db: Session) -> tuple[set[str], set[str], set[str]]:
+        """
+        Diff the staged snapshot against the DB with anti-joins.
+        Returns (new_hot_ids, removed_hot_ids, new_stable_ids).
+        Raises MarketSyncError on failure.
+        """
+        staged = incoming_markets.c.condition_id
+        try:
+            new_hot = set(db.exec(
+                select(staged)
+                .outerjoin(SyncHotMarket, SyncHotMarket.condition_id == staged)
+                .where(SyncHotMarket.condition_id.is_(None))
+            ).scalars())
+            removed_hot = set(db.exec(
+                select(SyncHotMarket.condition_id)
+                .outerjoin(incoming_markets, staged == SyncHotMarket.condition_id)
+                .where(staged.is_(None))
+            ).scalars())
+            new_stable = set(db.exec(
+                select(staged)
+                .outerjoin(SyncHotMarket, SyncHotMarket.condition_id == staged)
+                .outerjoin(Market, Market.condition_id == staged)
+                .where(SyncHotMarket.condition_id.is_(None), Market.condition_id.is_(None))
+            ).scalars())
+            return new_hot, removed_hot, new_stable
+        except Exception as e:
+            logger.exception("Error diffing incoming markets")
+            raise MarketSyncError("diff_incoming_markets", e)
+
     @staticmethod
     def sync_markets(db: Session) -> dict:
         """
@@ -261,33 +447,39 @@ class MarketSyncService:
         """
         # 1. Fetch live CLOB markets
         try:
-            clob_markets = ClobService().get_clob_markets_accepting_orders()
+            # Every market seen while paginating, accepting orders or not,
+            # so winner detection below doesn't have to fetch them again
+            market_cache: dict[str, dict] = {}
+            clob_markets = ClobService().get_clob_markets_accepting_orders(market_cache=market_cache)
         except Exception as e:
             logger.exception("Error fetching live CLOB markets")
             raise MarketSyncError("get_clob_markets_accepting_orders", e)
-        clob_ids = {m["condition_id"] for m in clob_markets}
+        clob_by_id = {m["condition_id"]: m for m in clob_markets}
 
-        # 2. Load tracked and stable from DB
-        tracked = MarketSyncService.get_hot_sync_markets(db)
-        tracked_ids = {m.condition_id for m in tracked}
-        stable = MarketSyncService.get_stable_markets(db)
-        stable_ids = {m.condition_id for m in stable}
+        # 2. Stage the snapshot and diff it against tracked/stable markets in SQL
+        MarketSyncService.stage_incoming_markets(db, list(clob_by_id))
+        new_hot_ids, removed_hot_ids, new_stable_ids = MarketSyncService.diff_incoming_markets(db)
 
-        # 3. Compute diffs
-        to_add = [m for m in clob_markets if m["condition_id"] not in tracked_ids]
-        to_remove = [cid for cid in tracked_ids if cid not in clob_ids]
+        # 3. Keep the CLOB order for anything we add
+        to_add = [m for cid, m in clob_by_id.items() if cid in new_hot_ids]
+        to_remove = sorted(removed_hot_ids)
 
         # 4. Stage all changes
         added_tracked, added_dicts = MarketSyncService.add_hot_sync_markets(db, to_add)
-        removed_tracked = MarketSyncService.remove_hot_sync_markets(db, tracked, to_remove)
+        removed_tracked = MarketSyncService.remove_hot_sync_markets(db, to_remove)
         added_stable = MarketSyncService.add_stable_markets(
-            db, [m for m in to_add if m["condition_id"] not in stable_ids]
+            db, [m for m in to_add if m["condition_id"] in new_stable_ids]
         )
+        added_stable_ids = set(added_stable)
         outcomes_inserted = MarketSyncService.add_stable_market_outcomes(
-            db, [m for m in clob_markets if m["condition_id"] in added_stable]
+            db, [m for cid, m in clob_by_id.items() if cid in added_stable_ids]
         )
         marked_untradable = MarketSyncService.mark_stable_markets_untradable(db, removed_tracked)
-        markets_with_winning_tokens = MarketSyncService.mark_market_outcome_winner(db, marked_untradable)
+        # Retry markets whose winner couldn't be recorded on an earlier sync
+        pending = MarketSyncService.get_pending_resolution_markets(db)
+        markets_with_winning_tokens = MarketSyncService.mark_market_outcome_winner(
+            db, list(dict.fromkeys(marked_untradable + pending)), market_cache
+        )
 
         return {
             "added_tracked": added_tracked,
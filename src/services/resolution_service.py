@@ -1,5 +1,11 @@
 import logging
+import os
+from datetime import datetime, timezone
 from decimal import Decimal
+from typing import Iterator
+
+from dotenv import load_dotenv
+from sqlalchemy import case, delete, false, func, insert, literal, tuple_, update
 from sqlalchemy.future import select
 from sqlmodel import Session
 
@@ -7,8 +13,15 @@ from src.models.user_position import UserPosition
 from src.models.user import User
 from src.models.payout_log import PayoutLog
 
+load_dotenv()
+
 logger = logging.getLogger(__name__)
 
+# "bulk" resolves each market with a fixed handful of set-based statements;
+# "orm" walks the positions one by one (the original path).
+resolution_mode = os.getenv("RESOLUTION_MODE", "bulk").strip().lower()
+payout_stream_batch = int(os.getenv("PAYOUT_STREAM_BATCH", "1000"))
+
 
 class ResolutionError(Exception):
     def __init__(self, stage: str, original: Exception):
@@ -16,8 +29,6 @@ class ResolutionError(Exception):
         self.stage = stage
         self.original = original
 
-# TODO: Covert to bulk operations where possible
-
 class ResolutionService:
     @staticmethod
     def resolve_market_winners(
@@ -28,11 +39,13 @@ class ResolutionService:
         Orchestrate resolution of multiple markets: fetch data, process each position,
         and collect per-market summaries. Raises ResolutionError on any fatal error.
         """
+        process = (ResolutionService._process_single_market if resolution_mode == "orm"
+                   else ResolutionService._resolve_single_market_bulk)
         all_logs: list[dict] = []
         for wm in winning_markets:
             condition_id = wm.get("condition_id")
             try:
-                logs  = ResolutionService._process_single_market(db, wm)
+                logs  = process(db, wm)
                 all_logs.extend(logs)
             except Exception as e:
                 logger.exception(f"Error resolving market {condition_id}")
@@ -40,6 +53,111 @@ class ResolutionService:
         return all_logs
 
 
+    @staticmethod
+    def resolve_markets_batch(
+        db: Session,
+        winning_markets: list[dict]
+    ) -> list[dict]:
+        """
+        Resolve every market in `winning_markets` in one pass and return one
+        summary per market, in input order:
+        {"condition_id", "winning_token_ids", "positions", "winners", "shares_paid"}.
+
+        Payout logs for all markets are written with one INSERT ... SELECT,
+        each winner's balance is credited once from a single aggregation
+        over all resolving markets, and the positions are deleted together.
+        The logs themselves can be read back with `iter_payout_logs`.
+        Raises ResolutionError on any fatal error.
+        """
+        markets = {wm["condition_id"]: list(dict.fromkeys(wm.get("winning_token_ids", [])))
+                   for wm in winning_markets}
+        if not markets:
+            return []
+
+        if resolution_mode == "orm":
+            logs = ResolutionService.resolve_market_winners(db, winning_markets)
+            return ResolutionService._summarize(markets, [
+                (l["market"], 1, int(bool(l["is_winner"])), l["shares_paid"]) for l in logs
+            ])
+
+        try:
+            now = datetime.now(timezone.utc)
+            positions = UserPosition.__table__.c
+            market_ids = list(markets)
+            winning_pairs = [(cid, tok) for cid, toks in markets.items() for tok in toks]
+            in_markets = positions.market.in_(market_ids)
+
+            def is_winner():
+                # A fresh expression per use: expanding tuple-IN parameters can't be shared
+                if not winning_pairs:
+                    return false()
+                return tuple_(positions.market, positions.token).in_(winning_pairs)
+
+            # 1. Payout logs for every resolving position
+            db.exec(
+                insert(PayoutLog.__table__).from_select(
+                    ["user_name", "market", "token", "shares_paid", "is_winner", "timestamp"],
+                    select(
+                        positions.user_name,
+                        positions.market,
+                        positions.token,
+                        case((is_winner(), positions.shares),
+                             else_=literal(Decimal("0"), PayoutLog.__table__.c.shares_paid.type)),
+                        is_winner(),
+                        literal(now, PayoutLog.__table__.c.timestamp.type),
+                    ).where(in_markets)
+                )
+            )
+
+            # 2. One balance update per winning user, summed across all markets
+            if winning_pairs:
+                users = User.__table__.c
+                won = (
+                    select(func.sum(positions.shares))
+                    .where(positions.user_name == users.name, in_markets, is_winner())
+                    .scalar_subquery()
+                )
+                db.exec(
+                    update(User.__table__)
+                    .where(users.name.in_(select(positions.user_name).where(in_markets, is_winner())))
+                    .values(balance=users.balance + won)
+                )
+
+            # 3. Per-market summaries, then drop the resolved positions
+            logs = PayoutLog.__table__.c
+            rows = db.exec(
+                select(
+                    logs.market,
+                    func.count(),
+                    func.sum(case((logs.is_winner, 1), else_=0)),
+                    func.sum(logs.shares_paid),
+                )
+                .where(logs.market.in_(market_ids))
+                .group_by(logs.market)
+            ).all()
+            db.exec(delete(UserPosition.__table__).where(in_markets))
+
+            return ResolutionService._summarize(markets, rows)
+
+        except Exception as e:
+            logger.exception("Error in batched market resolution")
+            raise ResolutionError("resolve_markets_batch", e)
+
+    @staticmethod
+    def _summarize(markets: dict[str, list[str]], rows) -> list[dict]:
+        """Fold (market, positions, winners, shares_paid) rows into per-market summaries."""
+        summaries = {
+            cid: {"condition_id": cid, "winning_token_ids": toks,
+                  "positions": 0, "winners": 0, "shares_paid": Decimal("0")}
+            for cid, toks in markets.items()
+        }
+        for cid, n_positions, n_winners, shares_paid in rows:
+            summary = summaries[cid]
+            summary["positions"] += n_positions
+            summary["winners"] += int(n_winners or 0)
+            summary["shares_paid"] += Decimal(str(shares_paid or 0))
+        return list(summaries.values())
+
     @staticmethod
     def _process_single_market(
         db: Session,
@@ -69,6 +187,79 @@ class ResolutionService:
 
         return payout_logs
 
+    @staticmethod
+    def _resolve_single_market_bulk(
+        db: Session,
+        wm: dict
+    ) -> list[dict]:
+        """
+        Set-based resolution of a single market:
+          1. INSERT ... SELECT one PayoutLog per position of the market
+          2. one UPDATE crediting every winner's balance with their summed shares
+          3. one DELETE of the market's positions
+        The new payout logs are then streamed back with a select.
+        """
+        condition_id = wm["condition_id"]
+        winning_tokens = list(dict.fromkeys(wm.get("winning_token_ids", [])))
+        now = datetime.now(timezone.utc)
+
+        positions = UserPosition.__table__.c
+        is_winner = positions.token.in_(winning_tokens)
+
+        # 1. Payout logs straight from the positions
+        db.exec(
+            insert(PayoutLog.__table__).from_select(
+                ["user_name", "market", "token", "shares_paid", "is_winner", "timestamp"],
+                select(
+                    positions.user_name,
+                    positions.market,
+                    positions.token,
+                    case((is_winner, positions.shares),
+                         else_=literal(Decimal("0"), PayoutLog.__table__.c.shares_paid.type)),
+                    is_winner,
+                    literal(now, PayoutLog.__table__.c.timestamp.type),
+                ).where(positions.market == condition_id)
+            )
+        )
+
+        # 2. Credit winners in one statement
+        if winning_tokens:
+            users = User.__table__.c
+            won = (
+                select(func.sum(positions.shares))
+                .where(
+                    positions.user_name == users.name,
+                    positions.market == condition_id,
+                    is_winner,
+                )
+                .scalar_subquery()
+            )
+            db.exec(
+                update(User.__table__)
+                .where(users.name.in_(
+                    select(positions.user_name).where(positions.market == condition_id, is_winner)
+                ))
+                .values(balance=users.balance + won)
+            )
+
+        # 3. Drop the resolved positions
+        db.exec(delete(UserPosition.__table__).where(positions.market == condition_id))
+
+        return list(ResolutionService.iter_payout_logs(db, condition_id))
+
+    @staticmethod
+    def iter_payout_logs(db: Session, condition_id: str) -> Iterator[dict]:
+        """Stream the PayoutLog rows of a market as dicts, `payout_stream_batch` rows at a time."""
+        logs = PayoutLog.__table__.c
+        result = db.exec(
+            select(logs.user_name, logs.market, logs.token, logs.shares_paid, logs.is_winner, logs.timestamp)
+            .where(logs.market == condition_id)
+            .order_by(logs.user_name, logs.token)
+            .execution_options(yield_per=payout_stream_batch)
+        )
+        for row in result.mappings():
+            yield dict(row)
+
     @staticmethod
     def _fetch_positions(
         db: Session,
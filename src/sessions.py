@@ -1,18 +1,94 @@
 import os
-from typing import Generator
+from typing import Any, AsyncGenerator, Callable, Generator, TypeVar
 from contextlib import contextmanager
 
 from dotenv import load_dotenv
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 load_dotenv()
 
 
 db_path = os.getenv("DB_PATH", "db/polymarket_playground.db")
-db_url = f"sqlite:///{db_path}"
+db_url = os.getenv("DB_URL", f"sqlite:///{db_path}")
+db_async = os.getenv("DB_ASYNC", "false").strip().lower() in ("1", "true", "yes", "on")
+
+sqlite_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+sqlite_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, positive values are pages (SQLite semantics)
+sqlite_cache_size = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+sqlite_temp_store = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Map a sync database URL onto its async driver, e.g.
+    sqlite:///x.db -> sqlite+aiosqlite:///x.db and
+    postgresql+psycopg2://... -> postgresql+asyncpg://...
+    URLs that already name an async driver are returned unchanged.
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        raise ValueError(f"Invalid database URL: {url!r}")
+    dialect, _, driver = scheme.partition("+")
+    if driver in ("aiosqlite", "asyncpg", "asyncmy", "aiomysql", "psycopg_async"):
+        return url
+    if dialect not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database dialect {dialect!r}")
+    return f"{_ASYNC_DRIVERS[dialect]}://{rest}"
+
+
+def sqlite_pragmas() -> dict[str, str | int]:
+    """PRAGMAs applied to every new SQLite connection, in execution order."""
+    return {
+        "journal_mode": sqlite_journal_mode,
+        "synchronous": sqlite_synchronous,
+        "busy_timeout": sqlite_busy_timeout_ms,
+        "mmap_size": sqlite_mmap_size,
+        "cache_size": sqlite_cache_size,
+        "temp_store": sqlite_temp_store,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install_sqlite_pragmas(target: Engine) -> None:
+    """
+    Tune every connection `target` opens when it points at SQLite.
+
+    WAL lets readers keep going while a writer commits, and synchronous=NORMAL
+    is durable in WAL mode apart from the last transactions on power loss.
+    """
+    if target.dialect.name == "sqlite":
+        event.listen(target, "connect", _set_sqlite_pragmas)
 
 
 engine = create_engine(db_url, echo=False)
+install_sqlite_pragmas(engine)
+
+async_engine = create_async_engine(to_async_url(db_url), echo=False) if db_async else None
+if async_engine is not None:
+    install_sqlite_pragmas(async_engine.sync_engine)
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -23,4 +99,70 @@ def get_session() -> Generator[Session, None, None]:
 @contextmanager
 def get_session_context() -> Generator[Session, None, None]:
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+T = TypeVar("T")
+
+
+class ThreadedSession:
+    """
+    Awaitable facade over a sync Session that runs each call in the threadpool.
+
+    It exposes the subset of the AsyncSession API the routers use, so route
+    code is identical whether DB_ASYNC is on or off.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def exec(self, statement, **kwargs):
+        kwargs.setdefault("execution_options", {"prebuffer_rows": True})
+        return await run_in_threadpool(self.sync_session.exec, statement, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, **kwargs) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, **kwargs)
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+AsyncDbSession = AsyncSession | ThreadedSession
+
+
+async def get_engine_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """A native AsyncSession on `async_engine` (DB_ASYNC=true)."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_threaded_session(
+    session: Session = Depends(get_session),
+) -> AsyncGenerator[ThreadedSession, None]:
+    """The sync Session behind an awaitable facade (DB_ASYNC=false)."""
+    yield ThreadedSession(session)
+
+
+get_async_session = get_engine_async_session if async_engine is not None else get_threaded_session
+
@@ -31,4 +31,22 @@ def test_clear_all_data_deletes_users(client, db_session):
 
     # Now check user table is empty
     users_after = db_session.exec(select(User)).all()
-    assert users_after == []
\ No newline at end of file
+    assert users_after == []
+
+def test_webhook_stats_report_each_subscriber(client, db_session, monkeypatch):
+    import src.api.admin_route as admin_route
+    from src.market_event_webhook import OutboxDispatcher, Subscriber
+
+    dispatcher = OutboxDispatcher([
+        Subscriber("stats_all", "http://127.0.0.1:9/all"),
+        Subscriber("stats_payouts", "http://127.0.0.1:9/payouts", events=["payout_logs"]),
+    ])
+    monkeypatch.setattr(admin_route, "outbox_dispatcher", dispatcher)
+
+    response = client.get("/admin/webhooks", headers={"X-API-Key": L2_KEY})
+    assert response.status_code == 200
+    stats = {s["name"]: s for s in response.json()}
+    assert set(stats) == {"stats_all", "stats_payouts"}
+    assert stats["stats_payouts"]["events"] == ["payout_logs"]
+    assert stats["stats_all"]["in_flight"] == 0
+    assert stats["stats_all"]["lag"] >= 0
@@ -86,10 +86,13 @@ def seed_after_buy(db_session):
 def test_create_market_buy_order_new_share_success(
     client, db_session, setup_data, monkeypatch
 ):
+    async def no_book(token, side):
+        return []
+
     monkeypatch.setattr(
         ClobService,
-        "get_book_by_token_id",
-        staticmethod(lambda token, side: [])
+        "get_book_by_token_id_async",
+        staticmethod(no_book)
     )
     monkeypatch.setattr(
         OrderService,
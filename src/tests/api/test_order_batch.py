@@ -0,0 +1,155 @@
+import asyncio
+from decimal import Decimal
+
+import httpx
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from src.app import app
+
+from src.client.client import Client
+from src.models.market import Market
+from src.models.market_outcome import MarketOutcome
+from src.models.order import Order
+from src.models.order_fill import OrderFill
+from src.models.user import User
+from src.models.user_position import UserPosition
+from src.services.clob_service import ClobService
+from src.sessions import get_session
+
+
+BOOKS = {
+    "bt_yes": {"asks": [{"price": "0.60", "size": "50"}, {"price": "0.50", "size": "100"}],
+               "bids": [{"price": "0.45", "size": "200"}]},
+    "bt_no": {"asks": [{"price": "0.55", "size": "1000"}], "bids": []},
+}
+
+
+@pytest.fixture()
+def batch_books(monkeypatch):
+    fetched = []
+
+    async def book(token, side=None):
+        fetched.append(token)
+        return BOOKS.get(token)
+
+    monkeypatch.setattr(ClobService, "get_book_by_token_id_async", staticmethod(book))
+    return fetched
+
+
+def _seed(db, prefix: str) -> None:
+    """Two users, a tradable market on the bt_yes/bt_no books and a closed one."""
+    db.add_all([User(name=f"{prefix}_ann", balance=Decimal("100.00")),
+                User(name=f"{prefix}_ben", balance=Decimal("100.00")),
+                Market(condition_id=f"{prefix}_m", is_tradable=True),
+                Market(condition_id=f"{prefix}_closed", is_tradable=False)])
+    db.flush()
+    db.add_all([MarketOutcome(market=f"{prefix}_m", token="bt_yes"),
+                MarketOutcome(market=f"{prefix}_m", token="bt_no"),
+                MarketOutcome(market=f"{prefix}_closed", token="bt_closed")])
+    db.flush()
+    db.add(UserPosition(user_name=f"{prefix}_ben", market=f"{prefix}_m", token="bt_yes", shares=Decimal("10")))
+    db.commit()
+
+
+def _order(user, market, token, side, **size):
+    return {"user_name": user, "market": market, "token": token, "side": side, **size}
+
+
+def test_batch_shares_a_depleting_book(client, db_session, batch_books):
+    _seed(db_session, "bd")
+    orders = [
+        _order("bd_ann", "bd_m", "bt_yes", "BUY", amount_usdc="40"),   # 80 of the 100 shares at 0.50
+        _order("bd_ben", "bd_m", "bt_yes", "BUY", amount_usdc="40"),   # the last 20 at 0.50, then 50 at 0.60
+        _order("bd_ann", "bd_m", "bt_no", "BUY", amount_usdc="11"),
+        _order("bd_ben", "bd_m", "bt_yes", "SELL", shares="15"),       # out of 10 held + 70 just bought
+        _order("bd_ann", "bd_m", "bt_no", "BUY", amount_usdc="80"),    # only 49 USDC left
+        _order("bd_ann", "bd_closed", "bt_closed", "BUY", amount_usdc="1"),
+        _order("bd_nobody", "bd_m", "bt_yes", "BUY", amount_usdc="1"),
+        _order("bd_ben", "bd_m", "bt_yes", "SELL"),
+    ]
+    response = client.post("/orders/batch", json={"orders": orders})
+    assert response.status_code == 201, response.text
+    body = response.json()
+
+    assert sorted(batch_books) == ["bt_closed", "bt_no", "bt_yes"]
+    assert [r["status"] for r in body["results"]] == ["success"] * 4 + ["rejected"] * 4
+    assert (body["accepted"], body["rejected"]) == (4, 4)
+    first, second, _, sell = (r["details"] for r in body["results"][:4])
+    assert Decimal(str(first["shares"])) == Decimal("80")
+    assert Decimal(str(second["shares"])) == Decimal("70") and second["fills"] == 2
+    assert Decimal(str(sell["amount_usdc"])) == Decimal("6.75")
+    assert "Insufficient funds" in body["results"][4]["detail"]
+    assert "not tradable" in body["results"][5]["detail"]
+    assert "not found" in body["results"][6]["detail"]
+    assert "need shares" in body["results"][7]["detail"]
+
+    db_session.expire_all()
+    assert db_session.get(User, "bd_ann").balance == Decimal("49.00")
+    assert db_session.get(User, "bd_ben").balance == Decimal("66.75")
+    assert db_session.get(UserPosition, ("bd_ben", "bd_m", "bt_yes")).shares == Decimal("65")
+    order_ids = [r["order_id"] for r in body["results"][:4]]
+    assert len(db_session.exec(select(Order).where(Order.order_id.in_(order_ids))).all()) == 4
+    assert len(db_session.exec(select(OrderFill).where(OrderFill.order_id == order_ids[1])).all()) == 2
+
+
+def test_client_submit_batch(client, db_session, batch_books):
+    _seed(db_session, "bc")
+    api = Client(url="http://testserver")
+    api.close()
+    api._client = client
+    body = api.submit_batch([
+        _order("bc_ann", "bc_m", "bt_no", "BUY", amount_usdc=Decimal("5.50")),
+    ])
+    assert body["accepted"] == 1
+    assert Decimal(str(body["results"][0]["details"]["shares"])) == Decimal("10")
+
+    assert client.post("/orders/batch", json={"orders": []}).status_code == 422
+
+
+def test_concurrent_batches_cannot_overspend(tmp_path, monkeypatch):
+    # Each request gets its own session, as in production
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch_race.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        _seed(db, "br")
+
+    arrived = []
+
+    async def book(token, side=None):
+        # Hold each batch after its book fetch until the other one has fetched too
+        arrived.append(token)
+        while len(arrived) < 2:
+            await asyncio.sleep(0.01)
+        return BOOKS.get(token)
+
+    def per_request_session():
+        with Session(engine) as session:
+            yield session
+
+    async def twice(payload):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await asyncio.gather(c.post("/orders/batch", json=payload), c.post("/orders/batch", json=payload))
+
+    monkeypatch.setattr(ClobService, "get_book_by_token_id_async", staticmethod(book))
+    app.dependency_overrides[get_session] = per_request_session
+    try:
+        # 60 USDC each from a 100 USDC balance, 8 of ben's 10 shares each
+        batches = asyncio.run(twice({"orders": [
+            _order("br_ann", "br_m", "bt_no", "BUY", amount_usdc="60"),
+            _order("br_ben", "br_m", "bt_yes", "SELL", shares="8"),
+        ]}))
+    finally:
+        app.dependency_overrides.clear()
+
+    statuses = sorted([r["status"] for r in batch.json()["results"]] for batch in batches)
+    assert [batch.status_code for batch in batches] == [201, 201]
+    assert statuses == [["rejected", "rejected"], ["success", "success"]]
+
+    with Session(engine) as db:
+        assert db.get(User, "br_ann").balance == Decimal("40.00")
+        assert db.get(UserPosition, ("br_ann", "br_m", "bt_no")).shares == Decimal("109.09")
+        assert db.get(User, "br_ben").balance == Decimal("103.60")
+        assert db.get(UserPosition, ("br_ben", "br_m", "bt_yes")).shares == Decimal("2")
+    engine.dispose()
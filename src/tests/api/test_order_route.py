@@ -1,7 +1,16 @@
+import asyncio
+import threading
 import pytest
 from decimal import Decimal
 
-from sqlmodel import select
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, Session, create_engine, select
+
+import src.api.order_route as order_route
+import src.sessions as sessions
+from src.app import app
+from src.sessions import get_async_session, get_session, to_async_url
 
 from src.models.user import User
 from src.models.market import Market
@@ -11,16 +20,25 @@ from src.models.order import Order, OrderStatus, OrderType, OrderSide
 from src.models.order_fill import OrderFill
 from src.services.clob_service import ClobService
 from src.services.order_service import OrderService
+from src.services.limit_order_service import limit_order_index
 
 
 @pytest.fixture(autouse=True)
 def stub_clob_and_order(monkeypatch):
     # stub CLOB lookup
+    async def no_book(token, side):
+        return []
+
     monkeypatch.setattr(
         ClobService,
         "get_book_by_token_id",
         staticmethod(lambda token, side: []),
     )
+    monkeypatch.setattr(
+        ClobService,
+        "get_book_by_token_id_async",
+        staticmethod(no_book),
+    )
     # stub buy simulation
     monkeypatch.setattr(
         OrderService,
@@ -279,3 +297,349 @@ def test_get_all_orders_happy_path(client, db_session):
     user_names = {d["user_name"] for d in data}
     assert "alicee22" in user_names
     assert "bobb22" in user_names
+
+
+@pytest.fixture
+def quote_book(monkeypatch):
+    """Serve the same two-level book for every side and record each fetch."""
+    calls = []
+
+    async def one_book(token, side):
+        calls.append((token, side))
+        return [{"price": "0.60", "size": "100"}, {"price": "0.50", "size": "100"}]
+
+    monkeypatch.setattr(ClobService, "get_book_by_token_id_async", staticmethod(one_book))
+    return calls
+
+
+def _quote(client, side, sizes):
+    response = client.post("/orders/quote", json={"token": "tq", "side": side, "sizes": sizes})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_quote_fetches_the_book_once(client, quote_book):
+    body = _quote(client, "BUY", ["25", "80", "500"])
+    assert quote_book == [("tq", "BUY")]
+    assert len(body["quotes"]) == 3
+
+
+def test_quote_buy_sizes(client, quote_book):
+    body = _quote(client, "BUY", ["25", "80", "500"])
+    assert Decimal(str(body["best_price"])) == Decimal("0.50")
+    assert Decimal(str(body["depth_usdc"])) == Decimal("110.00")
+    assert [q["status"] for q in body["quotes"]] == ["filled", "filled", "exceeds_liquidity"]
+    assert [Decimal(str(q["fill_price"])) for q in body["quotes"]] == [Decimal("0.50"), Decimal("0.60"), Decimal("0.60")]
+    assert [Decimal(str(q["shares"])) for q in body["quotes"]] == [Decimal("50"), Decimal("150"), Decimal("200")]
+
+
+def test_quote_sell_sizes(client, quote_book):
+    # The client sends share counts as a SELL quote
+    from src.client.client import Client
+    api = Client(url="http://testserver")
+    api.close()
+    api._client = client
+
+    quotes = api.quote_many(token="tq", shares=["50", "150", "300"])
+    assert quote_book == [("tq", "SELL")]
+    assert [q["status"] for q in quotes] == ["filled", "filled", "exceeds_liquidity"]
+    assert [Decimal(str(q["amount_usdc"])) for q in quotes] == [Decimal("30.00"), Decimal("85.00"), Decimal("110.00")]
+
+
+def test_quote_slippage_from_the_best_price(client, quote_book):
+    buy = _quote(client, "BUY", ["25", "80"])["quotes"]
+    sell = _quote(client, "SELL", ["150"])["quotes"]
+    # Within the best level there is none; 80 USDC buys 150 shares at 0.5333 on average, 6.67% over 0.50
+    assert [Decimal(str(q["slippage"])) for q in buy] == [Decimal("0"), Decimal("0.0667")]
+    assert Decimal(str(buy[1]["average_price"])) == Decimal("0.5333")
+    # 150 shares sell for 85 USDC, 0.5667 each, 5.56% under 0.60
+    assert Decimal(str(sell[0]["average_price"])) == Decimal("0.5667")
+    assert Decimal(str(sell[0]["slippage"])) == Decimal("0.0556")
+
+
+def test_quote_rejects_bad_sizes(client, quote_book):
+    assert client.post("/orders/quote", json={"token": "tq", "side": "BUY", "sizes": []}).status_code == 422
+    assert client.post("/orders/quote", json={"token": "tq", "side": "BUY", "sizes": ["-1"]}).status_code == 422
+    assert quote_book == []
+
+
+def test_quote_unknown_book(client, monkeypatch):
+    async def no_book(token, side):
+        return None
+
+    monkeypatch.setattr(ClobService, "get_book_by_token_id_async", staticmethod(no_book))
+    response = client.post("/orders/quote", json={"token": "missing", "side": "SELL", "sizes": ["1"]})
+    assert response.status_code == 404
+
+
+def test_limit_buy_replace_and_cancel(client, db_session):
+    db_session.add_all([User(name="limit_alice", balance=Decimal("100.00")),
+                        Market(condition_id="lm_r1", is_tradable=True),
+                        MarketOutcome(market="lm_r1", token="lt1")])
+    db_session.commit()
+
+    payload = {"user_name": "limit_alice", "market": "lm_r1", "token": "lt1",
+               "side": "BUY", "limit_price": "0.333", "shares": "100"}
+    response = client.post("/orders/limit", json=payload)
+    assert response.status_code == 201, response.text
+    order = response.json()
+    assert (order["order_type"], order["status"]) == ("LIMIT", "OPEN")
+    assert Decimal(order["reserved_usdc"]) == Decimal("33.30")
+    assert order["order_id"] in limit_order_index
+
+    try:
+        # Raising the price holds more; beyond the balance is refused
+        response = client.post(f"/orders/{order['order_id']}/replace", json={"limit_price": "0.5"})
+        assert response.status_code == 200, response.text
+        assert Decimal(response.json()["reserved_usdc"]) == Decimal("50.00")
+        assert db_session.get(User, "limit_alice").balance == Decimal("50.00")
+        assert client.post(f"/orders/{order['order_id']}/replace", json={"shares": "300"}).status_code == 400
+
+        response = client.post(f"/orders/{order['order_id']}/cancel")
+        assert response.status_code == 200, response.text
+        assert response.json()["status"] == "CANCELLED"
+        db_session.expire_all()
+        assert db_session.get(User, "limit_alice").balance == Decimal("100.00")
+        assert order["order_id"] not in limit_order_index
+
+        assert client.post(f"/orders/{order['order_id']}/cancel").status_code == 400
+        assert client.post("/orders/999999/cancel").status_code == 404
+        assert client.post("/orders/limit", json={**payload, "shares": "1000"}).status_code == 400
+    finally:
+        limit_order_index.clear()
+
+
+def test_limit_sell_holds_shares(client, db_session):
+    db_session.add_all([User(name="limit_bob", balance=Decimal("0.00")),
+                        Market(condition_id="lm_r2", is_tradable=True),
+                        MarketOutcome(market="lm_r2", token="lt2")])
+    db_session.flush()
+    db_session.add(UserPosition(user_name="limit_bob", market="lm_r2", token="lt2", shares=Decimal("20")))
+    db_session.commit()
+
+    def position():
+        db_session.expire_all()
+        return db_session.get(UserPosition, ("limit_bob", "lm_r2", "lt2")).shares
+
+    payload = {"user_name": "limit_bob", "market": "lm_r2", "token": "lt2",
+               "side": "SELL", "limit_price": "0.70", "shares": "15"}
+    try:
+        order_id = client.post("/orders/limit", json=payload).json()["order_id"]
+        assert position() == Decimal("5")
+
+        assert client.post(f"/orders/{order_id}/replace", json={"shares": "10"}).status_code == 200
+        assert position() == Decimal("10")
+        assert client.post(f"/orders/{order_id}/replace", json={"shares": "25"}).status_code == 400
+
+        assert client.post(f"/orders/{order_id}/cancel").status_code == 200
+        assert position() == Decimal("20")
+        assert client.post("/orders/limit", json={**payload, "shares": "21"}).status_code == 400
+    finally:
+        limit_order_index.clear()
+
+
+def test_concurrent_market_orders_cannot_overspend(tmp_path, monkeypatch):
+    # Each request gets its own session, as in production, so both read the row before either writes
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([User(name="racer", balance=Decimal("150.00")), Market(condition_id="race_m", is_tradable=True)])
+        db.flush()
+        db.add(MarketOutcome(market="race_m", token="race_t"))
+        db.flush()
+        db.add(UserPosition(user_name="racer", market="race_m", token="race_t", shares=Decimal("5")))
+        db.commit()
+
+    arrived = []
+
+    async def book(token, side):
+        # Hold each order after its checks until the other one has passed them too
+        arrived.append(token)
+        while len(arrived) < 2:
+            await asyncio.sleep(0.01)
+        return []
+
+    def per_request_session():
+        with Session(engine) as session:
+            yield session
+
+    async def twice(path, payload):
+        arrived.clear()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await asyncio.gather(c.post(path, json=payload), c.post(path, json=payload))
+
+    monkeypatch.setattr(ClobService, "get_book_by_token_id_async", staticmethod(book))
+    app.dependency_overrides[get_session] = per_request_session
+    try:
+        # Both pass the 150 >= 100 check; only one 100 USDC debit fits
+        buys = asyncio.run(twice("/orders/buy", {"user_name": "racer", "market": "race_m",
+                                                 "token": "race_t", "order_type": "MARKET", "amount_usdc": "100"}))
+        # 15 shares after the buy: both pass the check, only one 10-share debit fits
+        sells = asyncio.run(twice("/orders/sell", {"user_name": "racer", "market": "race_m",
+                                                   "token": "race_t", "order_type": "MARKET", "shares": "10"}))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert sorted(r.status_code for r in buys) == [201, 400]
+    assert "Insufficient funds" in next(r.json()["detail"] for r in buys if r.status_code == 400)
+    assert sorted(r.status_code for r in sells) == [201, 400]
+    assert "Insufficient shares" in next(r.json()["detail"] for r in sells if r.status_code == 400)
+
+    with Session(engine) as db:
+        assert db.get(User, "racer").balance == Decimal("150.00")
+        assert db.get(UserPosition, ("racer", "race_m", "race_t")).shares == Decimal("5")
+        assert len(db.exec(select(Order).where(Order.user_name == "racer")).all()) == 2
+    engine.dispose()
+
+
+def test_concurrent_limit_changes_release_once(tmp_path, monkeypatch):
+    # Every request loads the open order before any of them changes it
+    engine = create_engine(f"sqlite:///{tmp_path / 'limit_race.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([User(name="lracer", balance=Decimal("1000.00")), Market(condition_id="lrace_m", is_tradable=True)])
+        db.flush()
+        db.add(MarketOutcome(market="lrace_m", token="lrace_t"))
+        db.commit()
+
+    barrier = None
+    load_resting = order_route._load_resting
+
+    def loaded_together(db, order_id):
+        order = load_resting(db, order_id)
+        barrier.wait()
+        return order
+
+    def per_request_session():
+        with Session(engine) as session:
+            yield session
+
+    async def race(*requests):
+        nonlocal barrier
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            order = await c.post("/orders/limit", json={"user_name": "lracer", "market": "lrace_m", "token": "lrace_t",
+                                                        "side": "BUY", "limit_price": "0.5", "shares": "200"})
+            order_id = order.json()["order_id"]
+            barrier = threading.Barrier(len(requests), timeout=5)
+            responses = await asyncio.gather(*(c.post(f"/orders/{order_id}/{path}", json=body)
+                                               for path, body in requests))
+        return order_id, responses
+
+    def state(order_id):
+        with Session(engine) as db:
+            return db.get(User, "lracer").balance, db.get(Order, order_id)
+
+    monkeypatch.setattr(order_route, "_load_resting", loaded_together)
+    app.dependency_overrides[get_session] = per_request_session
+    try:
+        # Five cancels of one order: one releases the 100 USDC reserve, the rest are refused
+        cancelled, cancels = asyncio.run(race(*[("cancel", None)] * 5))
+        # A replace that frees 50 USDC against a cancel that frees all 100: only one goes through
+        raced, replace_and_cancel = asyncio.run(race(("replace", {"limit_price": "0.25"}), ("cancel", None)))
+    finally:
+        app.dependency_overrides.clear()
+        limit_order_index.clear()
+
+    assert sorted(r.status_code for r in cancels) == [200, 409, 409, 409, 409]
+    assert sorted(r.status_code for r in replace_and_cancel) == [200, 409]
+    _, first = state(cancelled)
+    assert (first.status, first.reserved_usdc) == (OrderStatus.CANCELLED, Decimal("0"))
+    balance, second = state(raced)
+    assert second.status in (OrderStatus.OPEN, OrderStatus.CANCELLED)
+    # Whichever won, each reserve was given back once: the balance and what is still held add up
+    assert balance + second.reserved_usdc == Decimal("1000.00")
+    engine.dispose()
+
+
+def test_order_routes_on_the_async_engine(tmp_path, monkeypatch):
+    # DB_ASYNC=true: routes get a native AsyncSession and do their DB work via run_sync on aiosqlite
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([User(name="async_al", balance=Decimal("1000.00")), Market(condition_id="async_m", is_tradable=True)])
+        db.flush()
+        db.add(MarketOutcome(market="async_m", token="async_t"))
+        db.commit()
+
+    async def book(token, side=None):
+        return {"asks": [{"price": "0.50", "size": "1000"}], "bids": [{"price": "0.40", "size": "1000"}]}
+
+    monkeypatch.setattr(ClobService, "get_book_by_token_id_async", staticmethod(book))
+    monkeypatch.setattr(sessions, "async_engine", create_async_engine(to_async_url(url)))
+    app.dependency_overrides[get_async_session] = sessions.get_engine_async_session
+    order = {"user_name": "async_al", "market": "async_m", "token": "async_t", "order_type": "MARKET"}
+
+    async def place():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            buy = await c.post("/orders/buy", json={**order, "amount_usdc": "100"})
+            sell = await c.post("/orders/sell", json={**order, "shares": "10"})
+            batch = await c.post("/orders/batch", json={"orders": [{**order, "side": "BUY", "amount_usdc": "100"}]})
+            limit = await c.post("/orders/limit", json={**order, "side": "BUY", "limit_price": "0.5", "shares": "10"})
+            cancel = await c.post(f"/orders/{limit.json()['order_id']}/cancel")
+        await sessions.async_engine.dispose()
+        return buy, sell, batch, limit, cancel
+
+    try:
+        buy, sell, batch, limit, cancel = asyncio.run(place())
+    finally:
+        app.dependency_overrides.clear()
+        limit_order_index.clear()
+
+    assert [r.status_code for r in (buy, sell, batch, limit, cancel)] == [201, 201, 201, 201, 200]
+    assert batch.json()["accepted"] == 1
+    assert Decimal(limit.json()["reserved_usdc"]) == Decimal("5.00")
+    assert cancel.json()["status"] == "CANCELLED"
+    with Session(engine) as db:
+        assert db.get(User, "async_al").balance == Decimal("900.00")
+        assert db.get(UserPosition, ("async_al", "async_m", "async_t")).shares == Decimal("10")
+        assert len(db.exec(select(Order).where(Order.user_name == "async_al")).all()) == 4
+    engine.dispose()
+
+
+def test_concurrent_limit_changes_on_the_async_engine(tmp_path, monkeypatch):
+    # DB_ASYNC=true runs every request's DB work on the event loop thread, interleaved at each query
+    url = f"sqlite:///{tmp_path / 'async_race.db'}"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([User(name="async_lr", balance=Decimal("1000.00")),
+                    Market(condition_id="async_lr_m", is_tradable=True)])
+        db.flush()
+        db.add(MarketOutcome(market="async_lr_m", token="async_lr_t"))
+        db.commit()
+
+    monkeypatch.setattr(sessions, "async_engine", create_async_engine(to_async_url(url)))
+    app.dependency_overrides[get_async_session] = sessions.get_engine_async_session
+    limit = {"user_name": "async_lr", "market": "async_lr_m", "token": "async_lr_t",
+             "side": "BUY", "limit_price": "0.5", "shares": "200"}
+
+    async def race():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            order_id = (await c.post("/orders/limit", json=limit)).json()["order_id"]
+            # Five cancels of one order, alongside new orders from the same user
+            responses = await asyncio.gather(
+                *(c.post(f"/orders/{order_id}/cancel") for _ in range(5)),
+                *(c.post("/orders/limit", json=limit) for _ in range(3)),
+            )
+        await sessions.async_engine.dispose()
+        return order_id, responses[:5], responses[5:]
+
+    try:
+        order_id, cancels, places = asyncio.run(race())
+    finally:
+        app.dependency_overrides.clear()
+        limit_order_index.clear()
+
+    assert sum(r.status_code == 200 for r in cancels) == 1
+    assert all(r.status_code in (200, 400, 409) for r in cancels)
+    assert [r.status_code for r in places] == [201, 201, 201]
+    with Session(engine) as db:
+        assert db.get(Order, order_id).status == OrderStatus.CANCELLED
+        # The cancelled reserve came back once; three new orders hold 100 USDC each
+        assert db.get(User, "async_lr").balance == Decimal("700.00")
+    engine.dispose()
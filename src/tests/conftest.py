@@ -75,6 +75,9 @@ from src.models.order_fill import OrderFill
 from src.models.payout_log import PayoutLog
 from src.models.user import User
 from src.models.user_position import UserPosition
+from src.models.event_outbox import EventOutbox
+from src.models.webhook_subscription import WebhookSubscription
+from src.models.webhook_dead_letter import WebhookDeadLetter
 
 
 # In-memory SQLite engine
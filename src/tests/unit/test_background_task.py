@@ -255,3 +255,107 @@
 #
 #
 #
+
+
+from contextlib import contextmanager
+from decimal import Decimal
+
+from sqlmodel import SQLModel, Session, create_engine
+
+import src.background_task as background_task
+from src.market_event_webhook import MarketEventType, enqueue_market_event
+from src.models.event_outbox import EventOutbox
+from src.models.market import Market
+from src.models.order import Order, OrderSide, OrderStatus, OrderType
+from src.models.user import User
+from src.services.limit_order_service import limit_order_index
+from src.services.market_sync_service import MarketSyncService
+from src.services.resolution_service import ResolutionService, ResolutionError
+
+
+def _capture(monkeypatch, on_enqueue):
+    def fake(db, event_type, payload):
+        on_enqueue(event_type, payload)
+        return enqueue_market_event(db, event_type, payload)
+    monkeypatch.setattr(background_task, "enqueue_market_event", fake)
+
+
+def test_enqueue_payout_logs_chunks_and_sequences(monkeypatch, db_session):
+    emitted = []
+    _capture(monkeypatch, lambda event_type, payload: emitted.append((event_type, payload)))
+    logs = lambda: ({"user_name": f"u{i}"} for i in range(7))
+
+    sent = background_task.enqueue_payout_logs(db_session, logs(), chunk_size=3)
+    db_session.rollback()
+
+    assert sent == 3
+    assert all(event == MarketEventType.PAYOUT_LOGS.value for event, _ in emitted)
+    payloads = [p for _, p in emitted]
+    assert [len(p["payout_logs"]) for p in payloads] == [3, 3, 1]
+    assert [p["sequence"] for p in payloads] == [0, 1, 2]
+    assert [p["last"] for p in payloads] == [False, False, True]
+    assert len({p["batch_id"] for p in payloads}) == 1
+    assert [l["user_name"] for p in payloads for l in p["payout_logs"]] == [f"u{i}" for i in range(7)]
+
+
+def test_enqueue_payout_logs_reads_lazily(monkeypatch, db_session):
+    consumed = []
+    seen_at_emit = []
+
+    def logs():
+        for i in range(6):
+            consumed.append(i)
+            yield {"user_name": f"u{i}"}
+
+    _capture(monkeypatch, lambda event_type, payload: seen_at_emit.append(len(consumed)))
+
+    background_task.enqueue_payout_logs(db_session, logs(), chunk_size=2)
+
+    # Never more than the current chunk plus one lookahead chunk in memory,
+    # and flushed events are not kept in the session
+    assert seen_at_emit == [4, 6, 6]
+    assert not any(isinstance(o, EventOutbox) for o in [*db_session.new, *db_session.identity_map.values()])
+    db_session.rollback()
+
+
+def test_limit_cancellations_commit_with_resolution(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sync.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([User(name="bt_user", balance=Decimal("95.00")), Market(condition_id="bt_m", is_tradable=False)])
+        db.flush()
+        order = Order(user_name="bt_user", market="bt_m", token="bt_t", side=OrderSide.BUY,
+                      order_type=OrderType.LIMIT, status=OrderStatus.OPEN,
+                      limit_price=Decimal("0.50"), shares=Decimal("10"), reserved_usdc=Decimal("5.00"))
+        db.add(order)
+        db.commit()
+        order_id = order.order_id
+        limit_order_index.add(order)
+
+    @contextmanager
+    def session_context():
+        with Session(engine) as session:
+            yield session
+
+    def fail(db, markets):
+        raise ResolutionError("payout", RuntimeError("boom"))
+
+    def state():
+        with Session(engine) as db:
+            return db.get(Order, order_id).status, db.get(User, "bt_user").balance, order_id in limit_order_index
+
+    monkeypatch.setattr(background_task, "get_session_context", session_context)
+    monkeypatch.setattr(MarketSyncService, "sync_markets", staticmethod(
+        lambda db: {"added_dict_model": [], "markets_with_winning_tokens": [{"condition_id": "bt_m"}]}))
+    try:
+        # A failed resolution rolls the cancellation back with it; the order keeps resting
+        monkeypatch.setattr(ResolutionService, "resolve_markets_batch", staticmethod(fail))
+        background_task.run_market_sync()
+        assert state() == (OrderStatus.OPEN, Decimal("95.00"), True)
+
+        monkeypatch.setattr(ResolutionService, "resolve_markets_batch", staticmethod(lambda db, markets: []))
+        background_task.run_market_sync()
+        assert state() == (OrderStatus.CANCELLED, Decimal("100.00"), False)
+    finally:
+        limit_order_index.clear()
+    engine.dispose()
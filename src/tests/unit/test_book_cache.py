@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+from src.services.book_cache import BookCache
+
+
+def _book(n_levels: int = 1) -> dict:
+    return {
+        "bids": [{"price": "0.40", "size": "10"} for _ in range(n_levels)],
+        "asks": [{"price": "0.45", "size": "20"} for _ in range(n_levels)],
+    }
+
+
+def test_get_or_fetch_serves_fresh_entries_from_cache():
+    cache = BookCache(max_staleness=60, max_bytes=1_000_000)
+    calls = []
+
+    def fetch(token_id):
+        calls.append(token_id)
+        return _book()
+
+    first = cache.get_or_fetch("T1", fetch)
+    second = cache.get_or_fetch("T1", fetch)
+
+    assert first is second
+    assert calls == ["T1"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_get_or_fetch_refetches_stale_entries():
+    cache = BookCache(max_staleness=0.01, max_bytes=1_000_000)
+    calls = []
+
+    def fetch(token_id):
+        calls.append(token_id)
+        return _book()
+
+    cache.get_or_fetch("T1", fetch)
+    time.sleep(0.02)
+    cache.get_or_fetch("T1", fetch)
+
+    assert calls == ["T1", "T1"]
+
+
+def test_get_or_fetch_does_not_cache_failures():
+    cache = BookCache(max_staleness=60, max_bytes=1_000_000)
+    results = iter([None, _book()])
+
+    assert cache.get_or_fetch("T1", lambda _: next(results)) is None
+    assert cache.get_or_fetch("T1", lambda _: next(results)) is not None
+    assert cache.stats()["misses"] == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = BookCache(max_staleness=60, max_bytes=1_000_000)
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch(token_id):
+        calls.append(token_id)
+        release.wait(timeout=5)
+        return _book()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("T1", slow_fetch)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    while cache.stats()["coalesced"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ["T1"]
+    assert len(results) == 8
+    assert all(r is results[0] for r in results)
+
+
+def test_lru_eviction_respects_memory_budget():
+    probe = BookCache(max_staleness=60, max_bytes=10_000_000)
+    probe.get_or_fetch("probe", lambda _: _book(5))
+    one_book = probe.stats()["bytes"]
+
+    cache = BookCache(max_staleness=60, max_bytes=one_book * 2)
+    cache.get_or_fetch("T1", lambda _: _book(5))
+    cache.get_or_fetch("T2", lambda _: _book(5))
+    cache.get_or_fetch("T1", lambda _: _book(5))  # T1 becomes most recently used
+    cache.get_or_fetch("T3", lambda _: _book(5))
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= one_book * 2
+
+    calls = []
+    cache.get_or_fetch("T1", lambda t: calls.append(t) or _book(5))
+    cache.get_or_fetch("T2", lambda t: calls.append(t) or _book(5))
+    assert calls == ["T2"]
+
+
+def test_async_concurrent_misses_share_one_fetch():
+    cache = BookCache(max_staleness=60, max_bytes=1_000_000)
+    calls = []
+
+    async def slow_fetch(token_id):
+        calls.append(token_id)
+        await asyncio.sleep(0.01)
+        return _book()
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_fetch("T1", slow_fetch) for _ in range(8)))
+
+    results = asyncio.run(main())
+
+    assert calls == ["T1"]
+    assert all(r is results[0] for r in results)
+    assert cache.stats()["coalesced"] == 7
@@ -0,0 +1,191 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from src.clob_sessions import get_clob_client, close_clob_clients, aclose_clob_clients
+from src.services.book_cache import book_cache
+from src.services.clob_service import ClobService
+
+
+def _cursor(offset: int) -> str:
+    return base64.b64encode(str(offset).encode()).decode()
+
+
+class FakeClob:
+    """Tiny stand-in for the CLOB `/markets` endpoint with offset cursors."""
+
+    def __init__(self, markets: list[dict], page_size: int, delay: float = 0.0, opaque_cursors: bool = False):
+        self.markets = markets
+        self.books: dict[str, dict] = {}
+        self.page_size = page_size
+        self.delay = delay
+        self.opaque_cursors = opaque_cursors
+        self.requested: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def page(self, cursor: str) -> dict:
+        if self.opaque_cursors:
+            offset = 0 if cursor == "MA==" else int(cursor.removeprefix("page-"))
+        else:
+            offset = int(base64.b64decode(cursor).decode())
+        data = self.markets[offset:offset + self.page_size]
+        end = offset + self.page_size
+        if end >= len(self.markets):
+            next_cursor = "LTE="
+        elif self.opaque_cursors:
+            next_cursor = f"page-{end}"
+        else:
+            next_cursor = _cursor(end)
+        return {"limit": self.page_size, "count": len(data), "next_cursor": next_cursor, "data": data}
+
+
+@pytest.fixture
+def fake_clob(monkeypatch):
+    servers = []
+
+    def start(fake: FakeClob) -> FakeClob:
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/book":
+                    body = json.dumps(fake.books[query["token_id"][0]]).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                cursor = query["next_cursor"][0]
+                with fake._lock:
+                    fake.requested.append(cursor)
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                time.sleep(fake.delay)
+                body = json.dumps(fake.page(cursor)).encode()
+                with fake._lock:
+                    fake.in_flight -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_a, **_k):
+                return
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setattr(ClobService, "host", f"http://127.0.0.1:{server.server_port}")
+        return fake
+
+    yield start
+
+    book_cache.invalidate()
+    close_clob_clients()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _markets(n: int) -> list[dict]:
+    return [
+        {
+            "condition_id": f"C{i}",
+            "enable_order_book": i % 3 != 0,
+            "accepting_orders": i % 4 != 0,
+        }
+        for i in range(n)
+    ]
+
+
+def test_get_clob_markets_accepting_orders_filters_in_cursor_order(fake_clob):
+    markets = _markets(23)
+    fake_clob(FakeClob(markets, page_size=5))
+
+    result = ClobService.get_clob_markets_accepting_orders()
+
+    expected = [m for m in markets if m["enable_order_book"] and m["accepting_orders"]]
+    assert result == expected
+
+
+def test_get_clob_markets_accepting_orders_fills_market_cache(fake_clob):
+    markets = _markets(11)
+    markets[0]["tokens"] = [{"token_id": "T0", "winner": True}]
+    fake_clob(FakeClob(markets, page_size=5))
+
+    cache: dict[str, dict] = {}
+    ClobService.get_clob_markets_accepting_orders(market_cache=cache)
+
+    # Non-accepting markets are cached too, slimmed down to what resolution needs
+    assert list(cache) == [m["condition_id"] for m in markets]
+    assert cache["C0"] == {"condition_id": "C0", "tokens": [{"token_id": "T0", "winner": True}]}
+    assert cache["C1"]["tokens"] == []
+
+
+def test_iter_clob_market_pages_keeps_window_in_flight(fake_clob):
+    fake = fake_clob(FakeClob(_markets(40), page_size=4, delay=0.05))
+
+    pages = list(ClobService.iter_clob_market_pages(window=4))
+
+    assert [m["condition_id"] for page in pages for m in page] == [f"C{i}" for i in range(40)]
+    assert fake.max_in_flight > 1
+    assert fake.max_in_flight <= 4
+
+
+def test_iter_clob_market_pages_falls_back_on_opaque_cursors(fake_clob):
+    fake = fake_clob(FakeClob(_markets(10), page_size=3, opaque_cursors=True))
+
+    pages = list(ClobService.iter_clob_market_pages(window=4))
+
+    assert [m["condition_id"] for page in pages for m in page] == [f"C{i}" for i in range(10)]
+    assert fake.requested == ["MA==", "page-3", "page-6", "page-9"]
+
+
+def test_get_book_by_token_id_reuses_shared_client(fake_clob):
+    fake = fake_clob(FakeClob([], page_size=1))
+    fake.books["TKN"] = {
+        "bids": [{"price": "0.40", "size": "10"}],
+        "asks": [{"price": "0.45", "size": "20"}],
+    }
+    client = get_clob_client(ClobService.host)
+
+    assert ClobService.get_book_by_token_id("TKN", side="BUY") == [{"price": "0.45", "size": "20"}]
+    assert ClobService.get_book_by_token_id("TKN", side="SELL") == [{"price": "0.40", "size": "10"}]
+    assert get_clob_client(ClobService.host) is client
+
+    close_clob_clients()
+    assert client.is_closed
+    assert get_clob_client(ClobService.host) is not client
+
+
+def test_get_book_by_token_id_async_uses_async_client(fake_clob):
+    fake = fake_clob(FakeClob([], page_size=1))
+    fake.books["TKN"] = {
+        "bids": [{"price": "0.40", "size": "10"}],
+        "asks": [{"price": "0.45", "size": "20"}],
+    }
+
+    async def main():
+        try:
+            return await asyncio.gather(
+                ClobService.get_book_by_token_id_async("TKN", side="BUY"),
+                ClobService.get_book_by_token_id_async("TKN", side="SELL"),
+            )
+        finally:
+            await aclose_clob_clients()
+
+    asks, bids = asyncio.run(main())
+
+    assert asks == [{"price": "0.45", "size": "20"}]
+    assert bids == [{"price": "0.40", "size": "10"}]
+    assert book_cache.stats()["coalesced"] >= 1
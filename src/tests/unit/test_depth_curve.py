@@ -0,0 +1,218 @@
+import random
+from decimal import Decimal, ROUND_DOWN, localcontext
+
+import pytest
+
+from src.services.depth_curve import DepthCurve
+from src.services.order_service import OrderService
+
+
+# The level-by-level walk OrderService used before DepthCurve, kept verbatim as the oracle
+def reference_buy(amount: Decimal, book: list[dict]) -> dict:
+    amount_left = Decimal(amount)
+    total_shares = Decimal("0")
+    total_cost = Decimal("0")
+    fills = []
+
+    levels = sorted(book, key=lambda x: Decimal(x['price']))
+
+    for level in levels:
+        price = Decimal(level['price'])
+        size = Decimal(level['size'])
+        possible_cost = price * size
+
+        if possible_cost <= amount_left:
+            # Can buy all at this price
+            total_shares += size
+            total_cost += possible_cost
+            fills.append({
+                "fill_price": price,
+                "fill_shares": size
+            })
+
+            amount_left -= possible_cost
+        else:
+            # Can only buy part at this price
+            shares_affordable = amount_left / price
+            if shares_affordable > 0:
+                total_shares += shares_affordable
+                total_cost += shares_affordable * price
+                fills.append({
+                    "fill_price": price,
+                    "fill_shares": shares_affordable
+                })
+            break
+
+    if total_cost < Decimal(amount):
+        return {
+            "status": "exceeds_liquidity",
+            "max_amount": total_cost.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+            "max_shares": total_shares.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+            "fills": fills
+        }
+
+    return {
+        "status": "filled",
+        "shares_filled": total_shares.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+        "total_cost": total_cost.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+        "fills": fills
+    }
+
+def reference_sell(shares: Decimal, book: list[dict]) -> dict:
+    shares_left = Decimal(shares)
+    total_shares = Decimal("0")
+    total_proceeds = Decimal("0")
+    fills = []
+
+    levels = sorted(book, key=lambda x: Decimal(x['price']), reverse=True)
+
+    for level in levels:
+        price = Decimal(level['price'])
+        size = Decimal(level['size'])
+
+        if size <= shares_left:
+            # Can sell all at this price
+            fill_shares = size
+            total_shares += fill_shares
+            total_proceeds += fill_shares * price
+            fills.append({
+                "fill_price": price,
+                "fill_shares": fill_shares
+            })
+            shares_left -= fill_shares
+        else:
+            # Can only buy part at this price
+            fill_shares = shares_left
+            if fill_shares > 0:
+                total_shares += fill_shares
+                total_proceeds += fill_shares * price
+                fills.append({
+                    "fill_price": price,
+                    "fill_shares": fill_shares
+                })
+            shares_left = Decimal("0")
+            break
+
+    if total_shares < Decimal(shares):
+        return {
+            "status": "exceeds_liquidity",
+            "max_shares": total_shares.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+            "max_amount": total_proceeds.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+            "fills": fills
+        }
+
+    return {
+        "status": "filled",
+        "shares_sold": total_shares.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+        "total_proceeds": total_proceeds.quantize(Decimal("0.01"), rounding=ROUND_DOWN),
+        "fills": fills
+    }
+
+
+def _canon(value):
+    # str() so that Decimal('1.0') and Decimal('1.00') don't compare equal
+    if isinstance(value, dict):
+        return {k: _canon(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canon(v) for v in value]
+    return str(value)
+
+
+def _random_book(rng: random.Random) -> list[dict]:
+    book = []
+    for _ in range(rng.randint(0, 25)):
+        price = rng.choice(["0.5", "0.25", f"0.{rng.randint(1, 99):02d}", f"0.{rng.randint(1, 999):03d}"])
+        size = rng.choice(["0", f"{rng.randint(1, 5000)}", f"{rng.randint(1, 5000)}.{rng.randint(0, 99):02d}"])
+        book.append({"price": price, "size": size})
+    return book
+
+
+def _sizes(rng: random.Random, totals: list[Decimal]) -> list[Decimal]:
+    sizes = [Decimal("0"), Decimal("0.01"), Decimal("1"), totals[-1], totals[-1] + 1]
+    sizes += totals  # exactly on a level boundary
+    sizes += [t + Decimal("0.005") for t in totals]
+    sizes += [Decimal(f"{rng.uniform(0, float(totals[-1]) + 10):.6f}") for _ in range(20)]
+    sizes += [Decimal("12.3456789012345678901234567"), Decimal("1E+30"), Decimal(7)]
+    return sizes
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_depth_curve_matches_reference_walk(seed):
+    rng = random.Random(seed)
+    book = _random_book(rng)
+    buy_curve = DepthCurve.for_buy(book)
+    sell_curve = DepthCurve.for_sell(book)
+
+    for amount in _sizes(rng, buy_curve.cum_cost):
+        assert _canon(buy_curve.buy(amount)) == _canon(reference_buy(amount, book)), (book, amount)
+    for shares in _sizes(rng, sell_curve.cum_shares):
+        assert _canon(sell_curve.sell(shares)) == _canon(reference_sell(shares, book)), (book, shares)
+
+
+def test_ties_keep_book_order_and_zero_levels_are_filled():
+    book = [
+        {"price": "0.50", "size": "10"},
+        {"price": "0.5", "size": "0"},
+        {"price": "0.40", "size": "5"},
+        {"price": "0.5", "size": "20"},
+    ]
+    for amount in ("2", "7", "12", "100"):
+        assert _canon(DepthCurve.for_buy(book).buy(amount)) == _canon(reference_buy(amount, book))
+    for shares in ("5", "15", "30", "100"):
+        assert _canon(DepthCurve.for_sell(book).sell(shares)) == _canon(reference_sell(shares, book))
+
+
+def test_rounding_context_falls_back_to_walk():
+    book = [{"price": "0.333", "size": "1234.567"}, {"price": "0.777", "size": "89.01"}]
+    with localcontext() as ctx:
+        ctx.prec = 6
+        curve = DepthCurve.for_buy(book)
+        assert not curve.exact
+        for amount in ("1", "411.11", "480", "1000"):
+            assert _canon(curve.buy(amount)) == _canon(reference_buy(amount, book))
+
+
+def test_fills_can_be_skipped_for_sweeps():
+    book = [{"price": "0.5", "size": "10"}, {"price": "0.6", "size": "10"}]
+    curve = DepthCurve.for_buy(book)
+
+    full = curve.buy(Decimal("8"))
+    totals = curve.buy(Decimal("8"), fills=False)
+    assert "fills" not in totals
+    assert totals == {k: v for k, v in full.items() if k != "fills"}
+    assert full["fills"] == [
+        {"fill_price": Decimal("0.5"), "fill_shares": Decimal("10")},
+        {"fill_price": Decimal("0.6"), "fill_shares": Decimal("5")},
+    ]
+
+    with pytest.raises(ValueError):
+        curve.sell(Decimal("1"))
+
+
+def test_order_service_uses_depth_curve():
+    book = [{"price": "0.52", "size": "100"}, {"price": "0.48", "size": "50"}]
+    assert _canon(OrderService.simulate_buy_transaction(Decimal("30"), book)) == _canon(reference_buy(Decimal("30"), book))
+    assert _canon(OrderService.simulate_sell_transaction(Decimal("120"), book)) == _canon(reference_sell(Decimal("120"), book))
+
+
+def test_quote_reports_prices_and_slippage():
+    asks = [{"price": "0.50", "size": "100"}, {"price": "0.60", "size": "100"}]
+    curve = DepthCurve.for_buy(asks)
+    assert curve.best_price == Decimal("0.50")
+
+    inside, across, beyond, nothing = (curve.quote(size) for size in ("25", "80", "500", "0"))
+    assert inside["status"] == "filled"
+    assert (inside["shares"], inside["fill_price"], inside["average_price"], inside["slippage"]) == (
+        Decimal("50.00"), Decimal("0.50"), Decimal("0.5000"), Decimal("0.0000"))
+    # 50 USDC takes the first level whole, the other 30 buy 50 shares at 0.60
+    assert (across["shares"], across["fill_price"], across["average_price"], across["slippage"]) == (
+        Decimal("150.00"), Decimal("0.60"), Decimal("0.5333"), Decimal("0.0667"))
+    assert beyond["status"] == "exceeds_liquidity"
+    assert (beyond["shares"], beyond["amount_usdc"], beyond["fill_price"]) == (
+        Decimal("200.00"), Decimal("110.00"), Decimal("0.60"))
+    assert nothing["fill_price"] is nothing["average_price"] is nothing["slippage"] is None
+
+    bids = DepthCurve.for_sell(asks)
+    sold = bids.quote("150")
+    assert (sold["amount_usdc"], sold["fill_price"], sold["slippage"]) == (
+        Decimal("85.00"), Decimal("0.50"), Decimal("0.0556"))
@@ -0,0 +1,185 @@
+from decimal import Decimal
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+
+from src.models.market import Market
+from src.models.market_outcome import MarketOutcome
+from src.models.order import Order, OrderSide, OrderStatus, OrderType
+from src.models.order_fill import OrderFill
+from src.models.user import User
+from src.models.user_position import UserPosition
+from src.services.ledger_service import LedgerService
+from src.services.limit_order_service import LimitOrderIndex, LimitOrderService, limit_order_index
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    limit_order_index.clear()
+    yield
+    limit_order_index.clear()
+
+
+def _limit(order_id: int, side: OrderSide, price: str, shares: str, token: str = "tok") -> Order:
+    return Order(order_id=order_id, user_name="u", market="m", token=token, side=side,
+                 order_type=OrderType.LIMIT, status=OrderStatus.OPEN,
+                 limit_price=Decimal(price), shares=Decimal(shares))
+
+
+def _seed_limit_orders(db, prefix: str, *orders: tuple[OrderSide, str, str]) -> list[Order]:
+    """A user, a tradable market and resting LIMIT orders holding their funds/shares."""
+    user = f"{prefix}_user"
+    db.add_all([User(name=user, balance=Decimal("1000.00")),
+                Market(condition_id=f"{prefix}_m", is_tradable=True),
+                MarketOutcome(market=f"{prefix}_m", token=f"{prefix}_t")])
+    db.flush()
+    db.add(UserPosition(user_name=user, market=f"{prefix}_m", token=f"{prefix}_t", shares=Decimal("0")))
+    rows = []
+    for side, price, shares in orders:
+        row = Order(user_name=user, market=f"{prefix}_m", token=f"{prefix}_t", side=side,
+                    order_type=OrderType.LIMIT, status=OrderStatus.OPEN,
+                    limit_price=Decimal(price), shares=Decimal(shares))
+        if side == OrderSide.BUY:
+            row.reserved_usdc = LimitOrderService.reservation(row.limit_price, row.shares)
+            db.get(User, user).balance -= row.reserved_usdc
+        db.add(row)
+        rows.append(row)
+    db.commit()
+    for row in rows:
+        limit_order_index.add(row)
+    return rows
+
+
+def test_index_keeps_crossing_orders_as_a_prefix():
+    index = LimitOrderIndex()
+    for order in (_limit(1, OrderSide.BUY, "0.50", "10"), _limit(2, OrderSide.BUY, "0.55", "10"),
+                  _limit(3, OrderSide.BUY, "0.50", "10"), _limit(4, OrderSide.SELL, "0.60", "10"),
+                  _limit(5, OrderSide.SELL, "0.58", "10"), _limit(6, OrderSide.BUY, "0.70", "1", token="other")):
+        index.add(order)
+
+    # Best price first, then time priority within a price
+    assert [o.order_id for o in index.crossing("tok", OrderSide.BUY, Decimal("0.50"))] == [2, 1, 3]
+    assert [o.order_id for o in index.crossing("tok", OrderSide.BUY, Decimal("0.52"))] == [2]
+    assert [o.order_id for o in index.crossing("tok", OrderSide.SELL, Decimal("0.59"))] == [5]
+    assert list(index.crossing("tok", OrderSide.SELL, None)) == []
+
+    # Re-adding (a replace) moves the order behind its new price level
+    index.add(_limit(1, OrderSide.BUY, "0.55", "10"))
+    assert [o.order_id for o in index.crossing("tok", OrderSide.BUY, Decimal("0.50"))] == [2, 1, 3]
+    index.add(_limit(2, OrderSide.BUY, "0.55", "10"))
+    assert [o.order_id for o in index.crossing("tok", OrderSide.BUY, Decimal("0.55"))] == [1, 2]
+
+    index.remove(6)
+    assert sorted(index.tokens()) == ["tok"] and len(index) == 5
+
+
+def test_matcher_fills_in_batches_and_settles(db_session):
+    buy, sell = _seed_limit_orders(db_session, "LM1", (OrderSide.BUY, "0.50", "100"), (OrderSide.SELL, "0.70", "0.01"))
+    assert db_session.get(User, "LM1_user").balance == Decimal("950.00")
+
+    first = {"asks": [{"price": "0.55", "size": "100"}, {"price": "0.48", "size": "60"}],
+             "bids": [{"price": "0.40", "size": "100"}]}
+    assert LimitOrderService.match_token(db_session, "LM1_t", first) == 1
+    db_session.refresh(buy)
+    assert (buy.status, buy.filled_shares, buy.amount_usdc, buy.reserved_usdc) == (
+        OrderStatus.PARTIAL, Decimal("60"), Decimal("28.80"), Decimal("21.20"))
+    assert db_session.get(UserPosition, ("LM1_user", "LM1_m", "LM1_t")).shares == Decimal("60")
+
+    # The same snapshot is not matched twice
+    assert LimitOrderService.match_token(db_session, "LM1_t", first) == 0
+
+    second = {"asks": [{"price": "0.50", "size": "500"}], "bids": [{"price": "0.75", "size": "1"}]}
+    assert LimitOrderService.match_token(db_session, "LM1_t", second) == 2
+    db_session.refresh(buy)
+    db_session.refresh(sell)
+    assert (buy.status, buy.filled_shares, buy.amount_usdc, buy.reserved_usdc) == (
+        OrderStatus.FILLED, Decimal("100"), Decimal("48.80"), Decimal("0"))
+    assert sell.status == OrderStatus.FILLED
+    # 50 reserved, 48.80 paid: the 1.20 price improvement comes back; the sell pays 0.75 * 0.01 rounded down
+    assert db_session.get(User, "LM1_user").balance == Decimal("951.20")
+    assert len(db_session.query(OrderFill).filter(OrderFill.order_id == buy.order_id).all()) == 2
+    assert len(limit_order_index) == 0
+
+
+def test_orders_share_a_snapshot_s_liquidity(db_session):
+    better, worse, priced_out = _seed_limit_orders(
+        db_session, "LM2",
+        (OrderSide.BUY, "0.60", "80"), (OrderSide.BUY, "0.55", "50"), (OrderSide.BUY, "0.45", "10"))
+
+    book = {"asks": [{"price": "0.50", "size": "100"}], "bids": []}
+    assert LimitOrderService.match_token(db_session, "LM2_t", book) == 2
+    for row in (better, worse, priced_out):
+        db_session.refresh(row)
+    assert (better.filled_shares, worse.filled_shares, priced_out.filled_shares) == (
+        Decimal("80"), Decimal("20"), Decimal("0"))
+    assert limit_order_index.get(worse.order_id).remaining == Decimal("30")
+
+
+def test_resolving_markets_cancel_their_orders(db_session):
+    buy, sell = _seed_limit_orders(db_session, "LM3", (OrderSide.BUY, "0.30", "10"), (OrderSide.BUY, "0.40", "5"))
+    assert db_session.get(User, "LM3_user").balance == Decimal("995.00")
+
+    assert sorted(LimitOrderService.cancel_market_orders(db_session, ["LM3_m"])) == sorted(
+        [buy.order_id, sell.order_id])
+    assert db_session.get(User, "LM3_user").balance == Decimal("1000.00")
+    assert {db_session.get(Order, o.order_id).status for o in (buy, sell)} == {OrderStatus.CANCELLED}
+    assert len(limit_order_index) == 0
+
+
+def test_index_is_rebuilt_from_the_database(db_session):
+    rows = _seed_limit_orders(db_session, "LM4", (OrderSide.BUY, "0.20", "10"), (OrderSide.SELL, "0.90", "1"))
+    rows[1].status = OrderStatus.CANCELLED
+    db_session.commit()
+
+    index = LimitOrderIndex()
+    index.load(db_session)
+    assert rows[0].order_id in index
+    assert rows[1].order_id not in index
+
+
+def test_matcher_credits_on_top_of_concurrent_trades(tmp_path):
+    # Separate sessions, as the matcher job and a market order route have
+    engine = create_engine(f"sqlite:///{tmp_path / 'match.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        _seed_limit_orders(db, "LM6", (OrderSide.SELL, "0.50", "10"))
+
+    with Session(engine) as matcher, Session(engine) as trader:
+        # The matcher has the user loaded from an earlier round when a market buy commits
+        loaded = matcher.get(User, "LM6_user")
+        assert loaded.balance == Decimal("1000.00")
+        assert LedgerService.debit_balance(trader, "LM6_user", Decimal("100.00"))
+        trader.commit()
+
+        book = {"asks": [], "bids": [{"price": "0.60", "size": "10"}]}
+        assert LimitOrderService.match_token(matcher, "LM6_t", book) == 1
+
+        assert loaded.balance == Decimal("906.00")
+
+    with Session(engine) as db:
+        assert db.get(User, "LM6_user").balance == Decimal("906.00")
+    engine.dispose()
+
+
+def test_matcher_skips_an_order_cancelled_under_it(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cancel.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        _seed_limit_orders(db, "LM7", (OrderSide.BUY, "0.50", "10"))
+
+    with Session(engine) as matcher, Session(engine) as route:
+        # The matcher still sees the order open when the cancel commits
+        order_id = next(iter(limit_order_index.crossing("LM7_t", OrderSide.BUY, Decimal("0.40")))).order_id
+        loaded = matcher.get(Order, order_id)
+        assert LimitOrderService.cancel(route, route.get(Order, order_id))
+        route.commit()
+
+        book = {"asks": [{"price": "0.40", "size": "10"}], "bids": []}
+        assert LimitOrderService.match_token(matcher, "LM7_t", book) == 0
+        assert loaded.status == OrderStatus.CANCELLED
+
+    with Session(engine) as db:
+        assert db.get(User, "LM7_user").balance == Decimal("1000.00")
+        assert db.get(UserPosition, ("LM7_user", "LM7_m", "LM7_t")).shares == Decimal("0")
+        assert not db.exec(select(OrderFill).where(OrderFill.order_id == order_id)).all()
+    engine.dispose()
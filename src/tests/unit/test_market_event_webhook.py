@@ -0,0 +1,296 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import delete, select
+
+from src.client.webhook_listener import WebhookListener, decode_events
+import src.market_event_webhook as market_event_webhook
+from src.market_event_webhook import (
+    MarketEventType,
+    OutboxDispatcher,
+    Subscriber,
+    _encode_data,
+    _retryable,
+    enqueue_market_event,
+    load_subscribers,
+)
+from src.models.event_outbox import EventOutbox
+from src.models.market_change_log import MarketChangeType
+from src.models.sync_hot_market import SyncHotMarket
+from src.models.webhook_dead_letter import WebhookDeadLetter
+from src.models.webhook_subscription import WebhookSubscription
+
+
+@pytest.fixture()
+def subscriber_server():
+    """
+    A local endpoint recording deliveries per path. `status[path]` sets the
+    response code, or is called with the decoded body to pick one; a threading.Event in `hold[path]` stalls answers until set.
+    """
+    state = {"status": {}, "hold": {}, "received": {}}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if self.path in state["hold"]:
+                state["hold"][self.path].wait(timeout=10)
+            with lock:
+                state["received"].setdefault(self.path, []).append(json.loads(body))
+            status = state["status"].get(self.path, 200)
+            self.send_response(status(json.loads(body)) if callable(status) else status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = lambda path: f"http://127.0.0.1:{server.server_port}{path}"
+    try:
+        yield state
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _enqueue(db, prefix: str, n: int, event=MarketEventType.MARKET_RESOLVED) -> list[int]:
+    rows = [enqueue_market_event(db, event.value, {"markets": [{"condition_id": f"{prefix}{i}"}]})
+            for i in range(n)]
+    db.commit()
+    return [r.id for r in rows]
+
+
+def _ours(received: list[dict], ids: list[int]) -> list[str]:
+    # Other tests may leave outbox rows behind; only look at this test's events
+    return [e["data"]["markets"][0]["condition_id"]
+            for e in sorted(received, key=lambda e: e["sequence"]) if e["sequence"] in ids]
+
+
+def test_outbox_retries_then_delivers_in_order(subscriber_server, db_session):
+    ids = _enqueue(db_session, "RETRY", 3)
+    summary = enqueue_market_event(db_session, MarketEventType.RESOLUTION_SUMMARY.value,
+                                   {"markets": [{"condition_id": "RETRY_SUM", "shares_paid": Decimal("1.50")}]})
+    db_session.commit()
+    ids.append(summary.id)
+
+    dispatcher = OutboxDispatcher([Subscriber("retry_sub", subscriber_server["url"]("/retry"))])
+    try:
+        # Subscriber down: the failure is recorded and a retry scheduled
+        subscriber_server["status"]["/retry"] = 500
+        dispatcher.dispatch(db_session, budget=5)
+        state = db_session.get(WebhookSubscription, "retry_sub")
+        assert state.attempts == 1 and state.failed == 1
+        assert state.last_error
+        assert state.next_attempt_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+        sent = len(subscriber_server["received"]["/retry"])
+
+        # Nothing is retried before the backoff elapses
+        dispatcher.dispatch(db_session, budget=5)
+        assert len(subscriber_server["received"]["/retry"]) == sent
+
+        # Subscriber back: everything goes out in sequence order
+        subscriber_server["status"]["/retry"] = 200
+        subscriber_server["received"]["/retry"].clear()
+        state.next_attempt_at = datetime.now(timezone.utc)
+        db_session.add(state)
+        db_session.commit()
+        dispatcher.dispatch(db_session, budget=5)
+    finally:
+        dispatcher.close()
+
+    received = subscriber_server["received"]["/retry"]
+    assert _ours(received, ids) == ["RETRY0", "RETRY1", "RETRY2", "RETRY_SUM"]
+    assert received[-1]["data"]["markets"][0]["shares_paid"] == "1.50"
+    state = db_session.get(WebhookSubscription, "retry_sub")
+    assert state.last_sequence >= ids[-1]
+    assert state.attempts == 0 and state.last_error is None
+
+
+def test_slow_subscriber_does_not_delay_others(subscriber_server, db_session):
+    ids = _enqueue(db_session, "FAN", 4)
+    release_slow = subscriber_server["hold"]["/slow"] = threading.Event()
+
+    dispatcher = OutboxDispatcher([
+        Subscriber("fan_fast", subscriber_server["url"]("/fast"), queue_size=2),
+        Subscriber("fan_slow", subscriber_server["url"]("/slow"), queue_size=2),
+    ])
+    try:
+        # The fast subscriber drains every batch while the slow one is stuck on its first
+        deadline = time.monotonic() + 10
+        while (_ours(subscriber_server["received"].get("/fast", []), ids) != ["FAN0", "FAN1", "FAN2", "FAN3"]
+               and time.monotonic() < deadline):
+            dispatcher.dispatch(db_session, budget=0.1)
+        assert _ours(subscriber_server["received"]["/fast"], ids) == ["FAN0", "FAN1", "FAN2", "FAN3"]
+        assert db_session.get(WebhookSubscription, "fan_slow").last_sequence < ids[-1]
+        assert {s["name"]: s["in_flight"] for s in dispatcher.stats(db_session)}["fan_slow"] > 0
+
+        release_slow.set()
+        dispatcher.dispatch(db_session, budget=30)
+    finally:
+        dispatcher.close()
+
+    assert _ours(subscriber_server["received"]["/slow"], ids) == ["FAN0", "FAN1", "FAN2", "FAN3"]
+    stats = {s["name"]: s for s in dispatcher.stats(db_session)}
+    assert stats["fan_slow"]["lag"] == stats["fan_fast"]["lag"] == 0
+    assert stats["fan_slow"]["in_flight"] == 0
+
+
+def test_concurrent_subscriber_filters_events(subscriber_server, db_session):
+    resolved = _enqueue(db_session, "FILTER", 3)
+    payouts = _enqueue(db_session, "PAYOUT", 5, event=MarketEventType.PAYOUT_LOGS)
+
+    dispatcher = OutboxDispatcher([
+        Subscriber("filter_payouts", subscriber_server["url"]("/payouts"),
+                   events=[MarketEventType.PAYOUT_LOGS.value], concurrency=4),
+    ])
+    try:
+        dispatcher.dispatch(db_session, budget=5)
+    finally:
+        dispatcher.close()
+
+    received = subscriber_server["received"]["/payouts"]
+    assert {e["event"] for e in received} == {MarketEventType.PAYOUT_LOGS.value}
+    assert _ours(received, payouts) == [f"PAYOUT{i}" for i in range(5)]
+    assert _ours(received, resolved) == []
+    assert db_session.get(WebhookSubscription, "filter_payouts").last_sequence >= payouts[-1]
+
+
+def test_encode_data_matches_jsonable_encoder():
+    data = {
+        "markets": [SyncHotMarket(condition_id="ENC1", question="Rain?", description="é" * 3, tokens="{YES, NO}").model_dump()],
+        "payout_logs": [{"shares_paid": Decimal("10.50"), "timestamp": datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+                         "is_winner": True, "change": MarketChangeType.DELETED}],
+        "ids": ("a", "b"),
+    }
+    expected = jsonable_encoder(data, custom_encoder={Decimal: lambda v: str(v)})
+
+    assert json.loads(_encode_data(data)) == expected
+
+
+@pytest.mark.parametrize("encoding", ["json", "ndjson", "msgpack"])
+def test_encodings_round_trip_through_listener(encoding, db_session):
+    if encoding == "msgpack":
+        pytest.importorskip("msgpack")
+
+    listener = WebhookListener(host="127.0.0.1", port=0, path="/market_event")
+    seen = []
+    listener.on(MarketEventType.PAYOUT_LOGS.value, seen.append)
+    listener.start()
+
+    rows = [
+        enqueue_market_event(db_session, MarketEventType.PAYOUT_LOGS.value,
+                             {"payout_logs": [{"market": f"{encoding}_ENC{i}", "shares_paid": Decimal("2.25")}]})
+        for i in range(5)
+    ]
+    db_session.commit()
+
+    dispatcher = OutboxDispatcher([Subscriber(
+        f"enc_{encoding}", f"http://127.0.0.1:{listener._server.server_port}/market_event",
+        events=[MarketEventType.PAYOUT_LOGS.value], encoding=encoding, max_batch_events=2,
+    )])
+    try:
+        dispatcher.dispatch(db_session, budget=5)
+    finally:
+        dispatcher.close()
+        listener.stop()
+
+    ours = [d["payout_logs"][0] for d in seen if d["payout_logs"][0]["market"].startswith(f"{encoding}_ENC")]
+    assert [l["market"] for l in ours] == [f"{encoding}_ENC{i}" for i in range(5)]
+    assert {l["shares_paid"] for l in ours} == {"2.25"}
+    assert db_session.get(WebhookSubscription, f"enc_{encoding}").last_sequence >= rows[-1].id
+
+
+def test_decode_events_rejects_missing_event():
+    with pytest.raises(ValueError):
+        decode_events(b'{"data": {}}', "application/json")
+
+
+def test_load_subscribers():
+    assert [s.name for s in load_subscribers("")] == ["default"]
+
+    subs = load_subscribers(json.dumps([
+        {"name": "indexer", "url": "http://indexer/events", "events": ["market_added"], "concurrency": 4},
+        {"name": "monitor", "url": "http://monitor/events", "queue_size": 10},
+    ]))
+    assert [(s.name, s.events, s.concurrency) for s in subs] == [
+        ("indexer", frozenset({"market_added"}), 4),
+        ("monitor", None, 1),
+    ]
+    assert subs[1].queue_size == 10
+
+    with pytest.raises(ValueError):
+        load_subscribers(json.dumps([{"name": "x", "url": "http://x", "events": ["nope"]}]))
+    with pytest.raises(ValueError):
+        load_subscribers(json.dumps([{"name": "x", "url": "http://a"}, {"name": "x", "url": "http://b"}]))
+    with pytest.raises(ValueError):
+        load_subscribers(json.dumps([{"name": "x", "url": "http://x", "encoding": "xml"}]))
+
+
+def test_enqueue_rolls_back_with_the_transaction(db_session):
+    row = enqueue_market_event(db_session, MarketEventType.MARKET_ADDED.value, {"markets": []})
+    db_session.flush()
+    row_id = row.id
+    db_session.rollback()
+
+    assert db_session.get(EventOutbox, row_id) is None
+
+
+def test_purged_outbox_ids_are_not_reused(subscriber_server, db_session):
+    ids = _enqueue(db_session, "PURGE", 2)
+    dispatcher = OutboxDispatcher([Subscriber("purge_sub", subscriber_server["url"]("/purge"))])
+    try:
+        dispatcher.dispatch(db_session, budget=5)
+        # Everything delivered and purged, as _purge does once retention passes
+        db_session.exec(delete(EventOutbox))
+        db_session.commit()
+
+        later = _enqueue(db_session, "LATER", 1)
+        assert later[0] > ids[-1]
+        dispatcher.dispatch(db_session, budget=5)
+    finally:
+        dispatcher.close()
+
+    assert _ours(subscriber_server["received"]["/purge"], later) == ["LATER0"]
+
+
+def test_rejected_event_is_dead_lettered(subscriber_server, db_session, monkeypatch):
+    monkeypatch.setattr(market_event_webhook, "outbox_max_attempts", 2)
+    ids = _enqueue(db_session, "POISON", 2)
+    db_session.add(WebhookSubscription(name="poison_sub", last_sequence=ids[0] - 1))
+    db_session.commit()
+    # The subscriber can't parse POISON0 and never will
+    subscriber_server["status"]["/poison"] = (
+        lambda event: 422 if event["data"]["markets"][0]["condition_id"] == "POISON0" else 200)
+
+    dispatcher = OutboxDispatcher([Subscriber("poison_sub", subscriber_server["url"]("/poison"))])
+    try:
+        dispatcher.dispatch(db_session, budget=5)
+        state = db_session.get(WebhookSubscription, "poison_sub")
+        assert state.attempts == 1 and state.last_sequence == ids[0] - 1
+
+        state.next_attempt_at = datetime.now(timezone.utc)
+        db_session.add(state)
+        db_session.commit()
+        dispatcher.dispatch(db_session, budget=5)
+    finally:
+        dispatcher.close()
+
+    state = db_session.get(WebhookSubscription, "poison_sub")
+    assert state.last_sequence >= ids[1] and state.attempts == 0
+    assert _ours(subscriber_server["received"]["/poison"], ids) == ["POISON0", "POISON0", "POISON1"]
+    dead = db_session.exec(select(WebhookDeadLetter).where(WebhookDeadLetter.subscriber == "poison_sub")).all()
+    assert [(d.sequence, "POISON0" in d.payload) for d in dead] == [(ids[0], True)]
+    assert "422" in dead[0].error
+    assert {s["name"]: s["dead_lettered"] for s in dispatcher.stats(db_session)}["poison_sub"] == 1
+
+    assert not _retryable(400) and not _retryable(404)
+    assert _retryable(None) and _retryable(408) and _retryable(429) and _retryable(503)
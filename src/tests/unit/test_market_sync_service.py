@@ -1,14 +1,16 @@
 import json
+from contextlib import contextmanager
 
 import pytest
 from sqlalchemy.future import select
 
 from src.background_task import run_market_sync
-from src.market_event_webhook import MarketEventType
+from src.market_event_webhook import MarketEventType, enqueue_market_event
 from src.models.market_change_log import MarketChangeLog, MarketChangeType
 from src.models.market_outcome import MarketOutcome
 from src.models.sync_hot_market import SyncHotMarket
 from src.models.market import Market
+from src.models.user_position import UserPosition
 from src.services.clob_service import ClobService
 from src.services.market_sync_service import MarketSyncService
 
@@ -99,6 +101,27 @@ def test_add_tracked_markets_happy_path(db_session):
         assert log.condition_id in {"M1", "M2"}
 
 
+def test_add_hot_sync_markets_skips_existing_and_duplicates(db_session, monkeypatch):
+    monkeypatch.setattr("src.services.market_sync_service.sync_chunk_size", 2)
+    db_session.add(SyncHotMarket(condition_id="DUP0", question="Q", description="D", tokens="[]"))
+    db_session.commit()
+
+    markets = [
+        {"condition_id": f"DUP{i}", "question": f"Q{i}", "description": "D", "tokens": []}
+        for i in range(5)
+    ]
+    added, added_dicts = MarketSyncService.add_hot_sync_markets(db_session, markets + markets[3:])
+    db_session.commit()
+
+    assert added == ["DUP1", "DUP2", "DUP3", "DUP4"]
+    assert added_dicts[0] == {"condition_id": "DUP1", "question": "Q1", "description": "D", "tokens": "[]"}
+
+    logs = db_session.exec(
+        select(MarketChangeLog).where(MarketChangeLog.condition_id.like("DUP%"))
+    ).scalars().all()
+    assert sorted(log.condition_id for log in logs) == added
+
+
 def test_remove_tracked_markets_happy_path(db_session):
     # Arrange: insert two tracked markets
     m1 = SyncHotMarket(
@@ -116,13 +139,10 @@ def test_remove_tracked_markets_happy_path(db_session):
     db_session.add_all([m1, m2])
     db_session.commit()
 
-    tracked = db_session.exec(select(SyncHotMarket)).scalars().all()
-
     # Act
     removed = MarketSyncService.remove_hot_sync_markets(
         db_session,
-        tracked_markets=tracked,
-        removed_ids=["M1"],
+        removed_ids=["M1", "UNKNOWN"],
     )
     db_session.commit()
 
@@ -141,6 +161,33 @@ def test_remove_tracked_markets_happy_path(db_session):
     )
 
 
+def test_diff_incoming_markets(db_session):
+    # Arrange: H is tracked and stable, S is only stable, GONE is tracked but no longer live
+    db_session.add_all([
+        SyncHotMarket(condition_id="H", question="Q", description="D", tokens="[]"),
+        SyncHotMarket(condition_id="GONE", question="Q", description="D", tokens="[]"),
+        Market(condition_id="H"),
+        Market(condition_id="S"),
+    ])
+    db_session.commit()
+
+    ours = {"H", "S", "GONE", "FRESH"}
+
+    # Act
+    MarketSyncService.stage_incoming_markets(db_session, ["H", "S", "FRESH"])
+    new_hot, removed_hot, new_stable = MarketSyncService.diff_incoming_markets(db_session)
+
+    # Assert
+    assert new_hot == {"S", "FRESH"}
+    assert removed_hot & ours == {"GONE"}
+    assert new_stable == {"FRESH"}
+
+    # Re-staging replaces the previous snapshot
+    MarketSyncService.stage_incoming_markets(db_session, ["H"])
+    new_hot, removed_hot, new_stable = MarketSyncService.diff_incoming_markets(db_session)
+    assert (new_hot, removed_hot & ours, new_stable) == (set(), {"GONE"}, set())
+
+
 def test_add_stable_markets_happy_path(db_session):
     # Arrange: two new markets
     markets = [
@@ -216,6 +263,89 @@ def test_mark_market_outcome_winner_happy_path(db_session, monkeypatch):
 
 
 
+def test_mark_market_outcome_winner_retries_and_skips_failures(db_session, monkeypatch):
+    db_session.add_all([
+        MarketOutcome(market="R1", token="RT1", outcome_text="Yes"),
+        MarketOutcome(market="R1", token="RT2", outcome_text="No"),
+        MarketOutcome(market="R2", token="RT3", outcome_text="Yes"),
+    ])
+    db_session.commit()
+
+    calls = {"R1": 0, "R2": 0}
+    def flaky_get_clob(cid):
+        calls[cid] += 1
+        if cid == "R2" or calls[cid] == 1:
+            return None  # R1 fails once, R2 always
+        return {"tokens": [{"token_id": "RT1", "winner": True}, {"token_id": "RT2", "winner": False}]}
+
+    monkeypatch.setattr("src.services.market_sync_service.winner_lookup_backoff", 0)
+    monkeypatch.setattr(
+        "src.services.clob_service.ClobService.get_clob_market_by_condition_id",
+        staticmethod(flaky_get_clob)
+    )
+
+    # Act
+    updated = MarketSyncService.mark_market_outcome_winner(db_session, ["R1", "R2"])
+    db_session.commit()
+
+    # Assert: R1 resolved on retry, R2 skipped instead of failing the sync
+    assert updated == [{"condition_id": "R1", "winning_token_ids": ["RT1"]}]
+    assert calls == {"R1": 2, "R2": 3}
+    outcomes = db_session.exec(
+        select(MarketOutcome).where(MarketOutcome.market.in_(["R1", "R2"]))
+    ).scalars().all()
+    assert {o.token: o.is_winner for o in outcomes} == {"RT1": True, "RT2": False, "RT3": False}
+
+
+def test_mark_market_outcome_winner_uses_market_cache(db_session, monkeypatch):
+    db_session.add_all([
+        MarketOutcome(market="K1", token="KT1", outcome_text="Yes"),
+        MarketOutcome(market="K1", token="KT2", outcome_text="No"),
+        MarketOutcome(market="K2", token="KT3", outcome_text="Yes"),
+    ])
+    db_session.commit()
+
+    fetched = []
+    def fake_get_clob(cid):
+        fetched.append(cid)
+        return {"tokens": [{"token_id": "KT3", "winner": True}]}
+    monkeypatch.setattr(
+        "src.services.clob_service.ClobService.get_clob_market_by_condition_id",
+        staticmethod(fake_get_clob)
+    )
+    cache = {"K1": {"condition_id": "K1", "tokens": [{"token_id": "KT2", "winner": True}]}}
+
+    updated = MarketSyncService.mark_market_outcome_winner(db_session, ["K1", "K2"], cache)
+    db_session.commit()
+
+    # Only the cache miss goes upstream
+    assert fetched == ["K2"]
+    assert updated == [
+        {"condition_id": "K1", "winning_token_ids": ["KT2"]},
+        {"condition_id": "K2", "winning_token_ids": ["KT3"]},
+    ]
+
+
+def test_get_pending_resolution_markets(db_session):
+    db_session.add_all([
+        Market(condition_id="P_OPEN", is_tradable=False),     # no winner, has positions -> pending
+        Market(condition_id="P_WON", is_tradable=False),      # winner already recorded
+        Market(condition_id="P_EMPTY", is_tradable=False),    # nobody holds it
+        Market(condition_id="P_LIVE", is_tradable=True),      # still trading
+        MarketOutcome(market="P_OPEN", token="PO1"),
+        MarketOutcome(market="P_WON", token="PW1", is_winner=True),
+        MarketOutcome(market="P_LIVE", token="PL1"),
+        UserPosition(user_name="pending_user", market="P_OPEN", token="PO1", shares=1),
+        UserPosition(user_name="pending_user", market="P_WON", token="PW1", shares=1),
+        UserPosition(user_name="pending_user", market="P_LIVE", token="PL1", shares=1),
+    ])
+    db_session.commit()
+
+    pending = MarketSyncService.get_pending_resolution_markets(db_session)
+
+    assert [cid for cid in pending if cid.startswith("P_")] == ["P_OPEN"]
+
+
 def test_add_market_outcomes_happy_path(db_session):
     # Arrange: payload with two outcomes for a single market
     markets = [
@@ -281,7 +411,7 @@ def test_sync_markets_full_flow(db_session, monkeypatch):
     monkeypatch.setattr(
         ClobService,
         "get_clob_markets_accepting_orders",
-        lambda self: [new_mkt]
+        lambda self, market_cache=None: [new_mkt]
     )
     # Fake the per‐market fetch to say T1 is the winner for OLD
     monkeypatch.setattr(
@@ -398,7 +528,7 @@ def test_sync_markets_with_overlap(db_session, monkeypatch):
     monkeypatch.setattr(
         ClobService,
         "get_clob_markets_accepting_orders",
-        lambda self: [new_mkt, unchanged_mkt]
+        lambda self, market_cache=None: [new_mkt, unchanged_mkt]
     )
     # Only OLD gets resolved to a winner
     monkeypatch.setattr(
@@ -474,14 +604,21 @@ def test_market_added_event_emitted(monkeypatch, db_session):
     # Prepare to capture emitted events
 
     emitted = []
-    def fake_emit_market_event(event_type, payload):
+    def fake_enqueue_market_event(db, event_type, payload):
         print(f"FAKE CALLED! {event_type=}, {payload=}")
         emitted.append((event_type, payload))
+        return enqueue_market_event(db, event_type, payload)
 
     monkeypatch.setattr(
-        "src.background_task.emit_market_event", fake_emit_market_event
+        "src.background_task.enqueue_market_event", fake_enqueue_market_event
     )
 
+    # Events are queued on the job's session, so run the job on the test session
+    @contextmanager
+    def test_session_context():
+        yield db_session
+    monkeypatch.setattr("src.background_task.get_session_context", test_session_context)
+
     # Monkeypatch MarketSyncService.sync_markets to return a fake result
     monkeypatch.setattr(
         "src.services.market_sync_service.MarketSyncService.sync_markets",
@@ -499,15 +636,15 @@ def test_market_added_event_emitted(monkeypatch, db_session):
     # Act
     run_market_sync()
 
-    # Assert: Was emit_market_event called as expected?
+    # Assert: Was enqueue_market_event called as expected?
     assert emitted[0][0] == MarketEventType.MARKET_ADDED.value
     assert emitted[1][0] == MarketEventType.MARKET_RESOLVED.value
     assert emitted[2][0] == MarketEventType.PAYOUT_LOGS.value
 
     expected_added = {'markets': [mkt.model_dump()]}
     expected_resolved = {'markets': []}
-    expected_payouts = {'payout_logs': []}
+    expected_payouts = {'payout_logs': [], 'sequence': 0, 'last': True}
 
     assert emitted[0][1] == expected_added
     assert emitted[1][1] == expected_resolved
-    assert emitted[2][1] == expected_payouts
+    assert {k: v for k, v in emitted[2][1].items() if k != "batch_id"} == expected_payouts
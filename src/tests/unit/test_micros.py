@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from src.models.micros import from_micros, to_micros
+from src.models.market import Market
+from src.models.market_outcome import MarketOutcome
+from src.models.user import User
+from src.models.user_position import UserPosition
+
+
+@pytest.mark.parametrize("value, micros", [
+    ("900.00", 900_000_000),
+    ("0.523", 523_000),
+    ("0.0000019", 1),
+    ("0", 0),
+])
+def test_to_micros_truncates_below_a_millionth(value, micros):
+    assert to_micros(Decimal(value)) == micros
+
+
+def test_from_micros_keeps_the_column_scale():
+    assert str(from_micros(900_000_000)) == "900.00"
+    assert str(from_micros(523_000)) == "0.523"
+    assert str(from_micros(523_000, places=4)) == "0.5230"
+    assert str(from_micros(0)) == "0.00"
+    assert str(from_micros(1)) == "0.000001"
+
+
+def test_amounts_are_stored_as_integers_and_sum_exactly(db_session):
+    db_session.add_all([User(name="micros_user", balance=Decimal("1234.56")),
+                        Market(condition_id="micros_m", is_tradable=True)])
+    db_session.flush()
+    for i in range(10):
+        db_session.add(MarketOutcome(market="micros_m", token=f"micros_t{i}"))
+    db_session.flush()
+    db_session.add_all([UserPosition(user_name="micros_user", market="micros_m", token=f"micros_t{i}",
+                                     shares=Decimal("0.10")) for i in range(10)])
+    db_session.commit()
+
+    raw = db_session.exec(text("SELECT balance, typeof(balance) FROM users WHERE name = 'micros_user'")).one()
+    assert tuple(raw) == (1_234_560_000, "integer")
+    # Ten 0.10s add up to exactly 1 in SQL
+    total = db_session.exec(text("SELECT SUM(shares) FROM user_positions WHERE market = 'micros_m'")).scalar_one()
+    assert total == 1_000_000
+
+    db_session.expire_all()
+    assert db_session.get(User, "micros_user").balance == Decimal("1234.56")
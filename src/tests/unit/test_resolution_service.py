@@ -163,3 +163,89 @@ def test_process_position_non_winner(db_session):
     ).all()
     assert remaining == []
 
+
+
+def _seed_resolution(db_session, a, b, market, other):
+    db_session.add_all([
+        User(name=a, balance=Decimal("10.00")),
+        User(name=b, balance=Decimal("20.00")),
+        UserPosition(user_name=a, market=market, token="WIN", shares=Decimal("5.00")),
+        UserPosition(user_name=a, market=market, token="LOSE", shares=Decimal("3.00")),
+        UserPosition(user_name=b, market=market, token="LOSE", shares=Decimal("7.50")),
+        UserPosition(user_name=b, market=other, token="WIN", shares=Decimal("1.00")),
+    ])
+    db_session.commit()
+
+
+@pytest.mark.parametrize("mode", ["bulk", "orm"])
+def test_resolve_market_winners_modes_agree(db_session, monkeypatch, mode):
+    monkeypatch.setattr("src.services.resolution_service.resolution_mode", mode)
+    # Names are per mode so the two runs never share rows
+    a, b, market, other = f"{mode}_a", f"{mode}_b", f"{mode}_MKT", f"{mode}_OTHER"
+    _seed_resolution(db_session, a, b, market, other)
+
+    # Act
+    logs = ResolutionService.resolve_market_winners(
+        db_session, [{"condition_id": market, "winning_token_ids": ["WIN"]}]
+    )
+    db_session.commit()
+
+    # Assert returned payout logs
+    summary = sorted((l["user_name"], l["token"], Decimal(l["shares_paid"]), l["is_winner"]) for l in logs)
+    assert summary == [
+        (a, "LOSE", Decimal("0"), False),
+        (a, "WIN", Decimal("5.00"), True),
+        (b, "LOSE", Decimal("0"), False),
+    ]
+    assert all(l["market"] == market and l["timestamp"] is not None for l in logs)
+
+    # Assert balances: only the winning shares are credited
+    users = db_session.exec(
+        select(User).where(User.name.in_([a, b])).execution_options(populate_existing=True)
+    ).scalars().all()
+    assert {u.name: u.balance for u in users} == {a: Decimal("15.00"), b: Decimal("20.00")}
+
+    # Assert positions of the resolved market are gone, others untouched
+    remaining = db_session.exec(
+        select(UserPosition).where(UserPosition.user_name.in_([a, b]))
+    ).scalars().all()
+    assert [(p.market, p.token) for p in remaining] == [(other, "WIN")]
+
+
+def test_resolve_markets_batch_credits_each_user_once(db_session):
+    db_session.add_all([
+        User(name="batch_a", balance=Decimal("0.00")),
+        User(name="batch_b", balance=Decimal("1.00")),
+        # batch_a wins in both markets, batch_b wins in BM2 only
+        UserPosition(user_name="batch_a", market="BM1", token="Y1", shares=Decimal("2.00")),
+        UserPosition(user_name="batch_a", market="BM2", token="Y2", shares=Decimal("3.00")),
+        UserPosition(user_name="batch_b", market="BM1", token="N1", shares=Decimal("4.00")),
+        UserPosition(user_name="batch_b", market="BM2", token="Y2", shares=Decimal("1.50")),
+    ])
+    db_session.commit()
+
+    summaries = ResolutionService.resolve_markets_batch(db_session, [
+        {"condition_id": "BM1", "winning_token_ids": ["Y1"]},
+        {"condition_id": "BM2", "winning_token_ids": ["Y2"]},
+        {"condition_id": "BM3", "winning_token_ids": ["Y3"]},  # nobody holds it
+    ])
+    db_session.commit()
+
+    assert summaries == [
+        {"condition_id": "BM1", "winning_token_ids": ["Y1"], "positions": 2, "winners": 1, "shares_paid": Decimal("2.00")},
+        {"condition_id": "BM2", "winning_token_ids": ["Y2"], "positions": 2, "winners": 2, "shares_paid": Decimal("4.50")},
+        {"condition_id": "BM3", "winning_token_ids": ["Y3"], "positions": 0, "winners": 0, "shares_paid": Decimal("0")},
+    ]
+
+    users = db_session.exec(
+        select(User).where(User.name.in_(["batch_a", "batch_b"])).execution_options(populate_existing=True)
+    ).scalars().all()
+    assert {u.name: u.balance for u in users} == {"batch_a": Decimal("5.00"), "batch_b": Decimal("2.50")}
+
+    logs = list(ResolutionService.iter_payout_logs(db_session, "BM2"))
+    assert [(l["user_name"], l["shares_paid"]) for l in logs] == [
+        ("batch_a", Decimal("3.00")), ("batch_b", Decimal("1.50"))
+    ]
+    assert db_session.exec(
+        select(UserPosition).where(UserPosition.market.in_(["BM1", "BM2"]))
+    ).all() == []
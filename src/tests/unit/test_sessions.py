@@ -0,0 +1,40 @@
+import pytest
+from sqlmodel import create_engine
+
+from src.sessions import (
+    install_sqlite_pragmas,
+    sqlite_busy_timeout_ms,
+    sqlite_cache_size,
+    to_async_url,
+)
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///db/polymarket_playground.db", "sqlite+aiosqlite:///db/polymarket_playground.db"),
+    ("sqlite:///:memory:", "sqlite+aiosqlite:///:memory:"),
+    ("postgresql://u:p@host:5432/db", "postgresql+asyncpg://u:p@host:5432/db"),
+    ("postgresql+psycopg2://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+    ("postgres://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+    ("sqlite+aiosqlite:///x.db", "sqlite+aiosqlite:///x.db"),
+    ("postgresql+asyncpg://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+])
+def test_to_async_url(url, expected):
+    assert to_async_url(url) == expected
+
+
+def test_to_async_url_rejects_unknown_dialect():
+    with pytest.raises(ValueError):
+        to_async_url("oracle://u:p@host/db")
+
+
+def test_sqlite_pragmas_applied_on_connect(tmp_path):
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    install_sqlite_pragmas(test_engine)
+
+    with test_engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == sqlite_busy_timeout_ms
+        assert pragma("cache_size") == sqlite_cache_size
+        assert pragma("temp_store") == 2  # MEMORY
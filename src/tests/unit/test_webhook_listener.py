@@ -0,0 +1,205 @@
+import gzip
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from src.client.webhook_listener import AsyncWebhookListener, EventBus, SeenSet, SqliteSeenSet, WebhookListener
+from src.market_event_webhook import MarketEventType, OutboxDispatcher, Subscriber, enqueue_market_event
+from src.models.webhook_subscription import WebhookSubscription
+
+
+def _event(name: str, sequence: int) -> bytes:
+    return json.dumps({"event": MarketEventType.MARKET_ADDED.value, "sequence": sequence,
+                       "data": {"name": name}}).encode()
+
+
+def _wait_for(predicate, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+@pytest.fixture()
+def blocked_listener():
+    """An AsyncWebhookListener whose market_added handler waits on `release`."""
+    release = threading.Event()
+    started, handled = [], []
+
+    def slow_handler(data):
+        started.append(data["name"])
+        release.wait(timeout=10)
+        handled.append(data["name"])
+
+    listener = AsyncWebhookListener(host="127.0.0.1", port=0, path="/market_event",
+                                    queue_size=2, workers=1, retry_after=3)
+    listener.on(MarketEventType.MARKET_ADDED.value, slow_handler)
+    listener.start()
+    try:
+        yield listener, release, started, handled
+    finally:
+        release.set()
+        listener.stop()
+
+
+def test_ack_does_not_wait_for_handlers(blocked_listener):
+    listener, release, started, handled = blocked_listener
+    url = f"http://127.0.0.1:{listener.port}/market_event"
+
+    with httpx.Client(timeout=2) as client:
+        resp = client.post(url, content=_event("first", 1), headers={"Content-Type": "application/json"})
+        assert resp.status_code == 200
+
+        # A gzip NDJSON batch on the same keep-alive connection
+        batch = gzip.compress(_event("second", 2) + b"\n" + _event("third", 3) + b"\n")
+        resp = client.post(url, content=batch,
+                           headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert client.post(url.replace("market_event", "other"), content=_event("x", 4)).status_code == 404
+        assert client.post(url, content=b"not json").status_code == 400
+
+    _wait_for(lambda: started == ["first"])
+    assert handled == []
+    release.set()
+    _wait_for(lambda: handled == ["first", "second", "third"])
+    assert listener.stats()["processed"] == 3
+
+
+def test_full_queue_answers_429_with_retry_after(blocked_listener):
+    listener, release, started, handled = blocked_listener
+    url = f"http://127.0.0.1:{listener.port}/market_event"
+
+    with httpx.Client(timeout=2) as client:
+        assert client.post(url, content=_event("busy", 1)).status_code == 200
+        _wait_for(lambda: started == ["busy"])  # the only worker is now stuck
+
+        assert client.post(url, content=_event("q1", 2)).status_code == 200
+        assert client.post(url, content=_event("q2", 3)).status_code == 200
+        resp = client.post(url, content=_event("q3", 4))
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "3"
+
+    assert listener.stats() == {"queued": 2, "accepted": 3, "rejected": 1, "processed": 0}
+    release.set()
+    _wait_for(lambda: handled == ["busy", "q1", "q2"])
+
+
+def test_dispatcher_honours_retry_after(blocked_listener, db_session):
+    listener, release, started, handled = blocked_listener
+    url = f"http://127.0.0.1:{listener.port}/market_event"
+    with httpx.Client(timeout=2) as client:
+        # Sequences well clear of the outbox ids the dispatcher will send
+        client.post(url, content=_event("busy", 10**9))
+        _wait_for(lambda: started == ["busy"])
+        client.post(url, content=_event("q1", 10**9 + 1))
+        client.post(url, content=_event("q2", 10**9 + 2))
+
+    rows = [enqueue_market_event(db_session, MarketEventType.MARKET_ADDED.value, {"name": "late"})]
+    db_session.commit()
+    dispatcher = OutboxDispatcher([Subscriber("retry_after_sub", url, events=[MarketEventType.MARKET_ADDED.value])])
+    try:
+        before = datetime.now(timezone.utc)
+        dispatcher.dispatch(db_session, budget=5)
+    finally:
+        dispatcher.close()
+
+    state = db_session.get(WebhookSubscription, "retry_after_sub")
+    assert state.attempts == 1
+    assert state.last_sequence < rows[0].id
+    next_attempt = state.next_attempt_at.replace(tzinfo=timezone.utc)
+    assert before + timedelta(seconds=3) <= next_attempt <= datetime.now(timezone.utc) + timedelta(seconds=3)
+
+
+def _recording_bus(**kwargs):
+    bus = EventBus(**kwargs)
+    seen = []
+    bus.on("e", lambda data: seen.append(data["n"]))
+    return bus, seen
+
+
+def test_event_bus_skips_replays():
+    bus, seen = _recording_bus()
+    for sequence in (1, 2, 1, 3, 2):
+        bus.emit("e", {"n": sequence}, sequence)
+    bus.emit("e", {"n": "no-sequence"})
+    bus.emit("e", {"n": "no-sequence"})
+
+    assert seen == [1, 2, 3, "no-sequence", "no-sequence"]
+    assert bus.stats()["duplicates"] == 2
+
+
+def test_event_bus_seen_set_is_bounded():
+    bus, seen = _recording_bus(seen=SeenSet(max_size=2))
+    for sequence in (1, 2, 3, 1):
+        bus.emit("e", {"n": sequence}, sequence)
+
+    # 1 fell out of the window, so its replay gets through
+    assert seen == [1, 2, 3, 1]
+
+
+def test_event_bus_reorders_within_window():
+    bus, seen = _recording_bus(reorder_window=3)
+    for sequence in (3, 1, 2):
+        bus.emit("e", {"n": sequence}, sequence)
+    assert seen == []  # nothing released yet, so 1 isn't known to be first
+
+    for sequence in (5, 4, 8, 6, 7):
+        bus.emit("e", {"n": sequence}, sequence)
+    # the window overflowed on 5 and released 1; everything after continued the sequence
+    assert seen == [1, 2, 3, 4, 5, 6, 7, 8]
+
+    bus.emit("e", {"n": 10}, 10)
+    assert seen[-1] == 8  # held back: 9 may still come
+    bus.dispatch(bus.drain)
+    assert seen[-1] == 10
+
+    bus.emit("e", {"n": 11}, 11)  # continues the sequence: no waiting
+    bus.emit("e", {"n": 0}, 0)  # older than what was released: late but delivered
+    assert seen[-2:] == [11, 0]
+    assert bus.stats() == {"duplicates": 0, "late": 1, "buffered": 0}
+
+
+def test_event_bus_releases_gaps_after_timeout():
+    bus, seen = _recording_bus(reorder_window=10, reorder_timeout=0.05)
+    bus.emit("e", {"n": 10}, 10)
+    bus.emit("e", {"n": 12}, 12)  # 11 is filtered out upstream and never comes
+    assert seen == []
+
+    time.sleep(0.06)
+    bus.dispatch(bus.release_expired)
+    assert seen == [10, 12]
+
+
+def test_sqlite_seen_set_survives_restart(tmp_path):
+    path = str(tmp_path / "seen.db")
+    first = SqliteSeenSet(path)
+    assert first.add("1") and first.add("2")
+    assert not first.add("1")
+    first.close()
+
+    second = SqliteSeenSet(path)
+    assert not second.add("2")
+    assert second.add("3")
+    second.close()
+
+
+@pytest.mark.parametrize("listener_cls", [WebhookListener, AsyncWebhookListener])
+def test_listeners_drop_redeliveries(listener_cls):
+    handled = []
+    listener = listener_cls(host="127.0.0.1", port=0, path="/market_event", reorder_window=5, reorder_timeout=0.2)
+    listener.on(MarketEventType.MARKET_ADDED.value, lambda data: handled.append(data["name"]))
+    listener.start()
+    port = listener._server.server_port if listener_cls is WebhookListener else listener.port
+    try:
+        with httpx.Client(timeout=2) as client:
+            for name, sequence in (("b", 2), ("a", 1), ("b", 2), ("c", 4)):
+                assert client.post(f"http://127.0.0.1:{port}/market_event",
+                                   content=_event(name, sequence)).status_code == 200
+        _wait_for(lambda: handled == ["a", "b", "c"])
+    finally:
+        listener.stop()
+    assert listener.bus.stats()["duplicates"] == 1